@@ -1,5 +1,39 @@
 from mangum import Mangum
 from main import app
+from config import settings
+import os
+
+asgi_handler = Mangum(app, lifespan="off")
+
+# Lifespan is off under Mangum, so the init phase is where a warm-up can run.
+# Only provisioned containers warm up here: they initialise ahead of traffic,
+# while an on-demand cold start would make its first request wait for it. The
+# catalogue is not preloaded, since it expires long before a provisioned
+# container's first request.
+if settings.warmup_on_start and os.environ.get("AWS_LAMBDA_INITIALIZATION_TYPE") == "provisioned-concurrency":
+    from services.warmup import run_warmup
+    run_warmup(include_catalog=False)
+
+
+def _is_warmup_event(event) -> bool:
+    return isinstance(event, dict) and (event.get("warmup") is True or event.get("source") == "library.warmup")
+
 
 # AWS Lambda Handler
-handler = Mangum(app, lifespan="off")
+def handler(event, context):
+    """
+    API Gateway requests go to the FastAPI app; a warm-up event
+    ({"warmup": true}) prepares the container and returns per-step timings
+    """
+    if _is_warmup_event(event):
+        from services.warmup import run_warmup
+        return run_warmup()
+    return asgi_handler(event, context)
+
+
+def reminder_handler(event, context):
+    """
+    Scheduled Lambda handler for due-soon and overdue reminders
+    """
+    from services.reminders import run_reminder_sweep
+    return run_reminder_sweep(remaining_ms=context.get_remaining_time_in_millis)
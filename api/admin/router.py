@@ -1,11 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response
 from api.dependencies import get_admin_user
+from auth.models import SignupRequest
+from config import settings
 import re
 from database import get_supabase_client, get_service_client
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, EmailStr, Field, field_validator
+from typing import List, Optional
+from uuid import UUID
 from datetime import datetime, timedelta
-from zoneinfo import ZoneInfo
+from services.availability import fan_out_availability
+from services.book_copies import dedupe_tags, register_copies, tag_range
+from services.book_import import IMPORT_FORMATS, import_books as run_book_import
+from services.catalog_cache import invalidate_book
+from services.dashboard import dashboard_cache, invalidate_dashboard
+from services.fines import LIBRARY_TZ, compute_fines
+from services.notification_bus import notification_bus
+from services.notifications import broadcast_as_notification
+from services.reminders import run_reminder_sweep
+from services.student_import import import_students as run_student_import
+from services.system_config import VERSION_KEY, config_service, get_system_config, new_config_version
+import json
 import logging
 
 logger = logging.getLogger(__name__)
@@ -38,6 +54,44 @@ class BookUpdate(BaseModel):
     description: Optional[str] = None
 
 
+class CopyTag(BaseModel):
+    book_id: UUID
+    rfid_uid: str = Field(..., min_length=1)
+
+
+class CopyTagRange(BaseModel):
+    book_id: UUID
+    prefix: str = ""
+    start: int = Field(..., ge=0)
+    count: int = Field(..., ge=1)
+    width: int = Field(0, ge=0, le=32)  # zero-pad the number to this many digits
+
+
+class BulkCopiesCreate(BaseModel):
+    copies: List[CopyTag] = []
+    ranges: List[CopyTagRange] = []
+    # False when the copies are already included in the books' total_copies
+    count_as_new: bool = True
+
+
+class RosterStudent(BaseModel):
+    email: EmailStr
+    name: str = Field(..., min_length=2)
+    student_id: Optional[str] = None  # generated (STU<year><number>) when missing
+    department: Optional[str] = None
+    password: Optional[str] = Field(None, min_length=8)  # random when missing
+
+    @field_validator('email')
+    @classmethod
+    def normalize_email(cls, v):
+        return v.lower()
+
+    @field_validator('password')
+    @classmethod
+    def validate_password(cls, v):
+        return SignupRequest.validate_password(v) if v else v
+
+
 class FineConfigUpdate(BaseModel):
     fine_per_day: Optional[float] = None
     grace_period_days: Optional[int] = None
@@ -315,6 +369,8 @@ async def add_book(book: BookCreate, current_user: dict = Depends(get_admin_user
         if not response.data:
             raise HTTPException(status_code=500, detail="Failed to add book")
         
+        invalidate_book(response.data[0]["id"])
+        
         return {
     "message": "Book added successfully",
     "book": response.data[0]
@@ -326,10 +382,108 @@ async def add_book(book: BookCreate, current_user: dict = Depends(get_admin_user
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/books/import")
+async def import_books(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    format: Optional[str] = Query(None, description="csv or jsonl (default: from Content-Type)"),
+    errors_only: bool = Query(False, description="Only report rows that failed"),
+    current_user: dict = Depends(get_admin_user)
+):
+    """
+    Bulk add/update books from a CSV (with a header row) or JSONL request body.
+    Rows are validated like POST /admin/books and upserted by ISBN in chunks
+    while the body is still arriving. Answers with one JSON result per row,
+    then a summary line (NDJSON).
+    """
+    content_type = request.headers.get("content-type", "")
+    format = format or ("jsonl" if "json" in content_type else "csv")
+    if format not in IMPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Invalid format. Must be one of: {', '.join(IMPORT_FORMATS)}")
+    
+    # The body is consumed here rather than from a streaming response: once a
+    # response has started, the logging middleware no longer passes body chunks
+    lines = []
+    restocked = []
+    status_code = 200
+    try:
+        async for result in run_book_import(get_service_client(), request.stream(), format, BookCreate):
+            if "summary" in result:
+                restocked = result.pop("restocked")
+            elif errors_only and result["status"] != "error":
+                continue
+            lines.append(json.dumps(result))
+    except Exception as e:
+        # Chunks written before the failure stay imported; their results are kept
+        logger.error(f"Book import error: {e}")
+        lines.append(json.dumps({"error": str(e)}))
+        status_code = 500
+    finally:
+        invalidate_book()
+    
+    # Restocked books count as a check-in for availability subscribers
+    for book_id in restocked:
+        background_tasks.add_task(fan_out_availability, book_id)
+    
+    return Response("\n".join(lines) + "\n", status_code=status_code, media_type="application/x-ndjson")
+
+
+@router.post("/books/copies")
+async def register_book_copies(
+    request: BulkCopiesCreate,
+    background_tasks: BackgroundTasks,
+    current_user: dict = Depends(get_admin_user)
+):
+    """
+    Register RFID-tagged copies in bulk, from (book_id, rfid_uid) pairs and/or
+    tag ranges. Tags that are already registered are reported, not inserted.
+    """
+    try:
+        total = len(request.copies) + sum(tag_spec.count for tag_spec in request.ranges)
+        if not total:
+            raise HTTPException(status_code=400, detail="No copies to register")
+        if total > settings.bulk_copies_max_tags:
+            raise HTTPException(status_code=400, detail=f"At most {settings.bulk_copies_max_tags} copies per request")
+        
+        tags = [(str(copy.book_id), copy.rfid_uid.strip()) for copy in request.copies]
+        for tag_spec in request.ranges:
+            tags.extend(
+                (str(tag_spec.book_id), rfid_uid)
+                for rfid_uid in tag_range(tag_spec.prefix, tag_spec.start, tag_spec.count, tag_spec.width)
+            )
+        
+        tags, repeated = dedupe_tags(tags)
+        
+        result = await run_in_threadpool(register_copies, get_service_client(), tags, request.count_as_new)
+        result["duplicates"] = repeated + result["duplicates"]
+        
+        if len(result["added"]) > 100:
+            invalidate_book()
+        else:
+            for book_id in result["added"]:
+                invalidate_book(book_id)
+        
+        # New copies of a book nobody could borrow count as a check-in for its subscribers
+        for book_id in result.pop("restocked"):
+            background_tasks.add_task(fan_out_availability, book_id)
+        
+        return {
+            "message": f"{result['registered']} copies registered",
+            **result
+        }
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Register book copies error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.put("/books/{book_id}")
 async def update_book(
     book_id: str,
     book_update: BookUpdate,
+    background_tasks: BackgroundTasks,
     current_user: dict = Depends(get_admin_user)
 ):
     """
@@ -352,6 +506,12 @@ async def update_book(
         if not response.data:
             raise HTTPException(status_code=404, detail="Book not found")
         
+        invalidate_book(book_id)
+        
+        # Restocking a book counts as a check-in for availability subscribers
+        if (update_data.get("available_copies") or 0) > 0:
+            background_tasks.add_task(fan_out_availability, book_id)
+        
         return {
     "message": "Book updated successfully",
     "book": response.data[0]
@@ -374,6 +534,7 @@ async def delete_book(book_id: str, current_user: dict = Depends(get_admin_user)
         supabase = get_supabase_client()
         
         response = supabase.table("books").delete().eq("id", book_id).execute()
+        invalidate_book(book_id)
         
         return {"message": "Book deleted successfully"}
     
@@ -450,6 +611,46 @@ async def get_all_students(current_user: dict = Depends(get_admin_user)):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/students/import")
+async def import_students(
+    request: Request,
+    format: Optional[str] = Query(None, description="csv or jsonl (default: from Content-Type)"),
+    errors_only: bool = Query(False, description="Only report rows that failed"),
+    start_row: int = Query(1, ge=1, description="First row to import (next_row of the previous call)"),
+    current_user: dict = Depends(get_admin_user)
+):
+    """
+    Create student accounts from a roster: CSV (with a header row) or JSONL with
+    email, name and optional student_id, department and password. Auth users
+    are created concurrently and profiles written in batches. Safe to re-run
+    after a partial failure. Answers with one JSON result per row, then a
+    summary line with throughput (NDJSON). A call imports up to
+    student_import_max_rows rows: while the summary has `remaining` rows, send
+    the same roster again with start_row set to its `next_row`.
+    """
+    content_type = request.headers.get("content-type", "")
+    format = format or ("jsonl" if "json" in content_type else "csv")
+    if format not in IMPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Invalid format. Must be one of: {', '.join(IMPORT_FORMATS)}")
+    
+    lines = []
+    status_code = 200
+    try:
+        async for result in run_student_import(
+            get_service_client(), request.stream(), format, RosterStudent, start_row=start_row
+        ):
+            if errors_only and result.get("status") not in (None, "error"):
+                continue
+            lines.append(json.dumps(result))
+    except Exception as e:
+        # Accounts created before the failure are kept; re-running the roster completes it
+        logger.error(f"Student import error: {e}")
+        lines.append(json.dumps({"error": str(e)}))
+        status_code = 500
+    
+    return Response("\n".join(lines) + "\n", status_code=status_code, media_type="application/x-ndjson")
+
+
 @router.get("/students/{student_id}")
 async def get_student_details(student_id: str, current_user: dict = Depends(get_admin_user)):
     """
@@ -544,45 +745,33 @@ async def update_fine_config(
     Update fine configuration
     """
     try:
-        supabase = get_supabase_client()
-        
-        updates = []
-        if config.fine_per_day is not None:
-            updates.append({
-                "key": "fine_per_day",
-                "value": str(config.fine_per_day)
-            })
+        # Use service client so new keys can be inserted regardless of RLS
+        supabase = get_service_client()
         
-        if config.grace_period_days is not None:
-            updates.append({
-                "key": "grace_period_days",
-                "value": str(config.grace_period_days)
-            })
+        # FineConfigUpdate field -> system_config key
+        config_keys = {
+            "fine_per_day": "fine_per_day",
+            "grace_period_days": "grace_period_days",
+            "borrow_duration_days": "borrow_duration_days",
+            "reminder_days": "reminder_days_before_due",
+            "overdue_frequency": "overdue_frequency"
+        }
         
-        if config.borrow_duration_days is not None:
-            updates.append({
-                "key": "borrow_duration_days",
-                "value": str(config.borrow_duration_days)
-            })
-
-        if config.reminder_days is not None:
-            updates.append({
-                "key": "reminder_days",
-                "value": str(config.reminder_days)
-            })
-
-        if config.overdue_frequency is not None:
-            updates.append({
-                "key": "overdue_frequency",
-                "value": str(config.overdue_frequency)
-            })
+        updates = [
+            {"key": key, "value": str(value)}
+            for field, key in config_keys.items()
+            if (value := getattr(config, field)) is not None
+        ]
         
-        # Update each config value
-        for update in updates:
+        if updates:
+            # Write all values and bump the version in one statement so every
+            # instance reloads its cached config on the next version check
+            updates.append({"key": VERSION_KEY, "value": new_config_version()})
             supabase.table("system_config")\
-                .update({"value": update["value"]})\
-                .eq("key", update["key"])\
+                .upsert(updates, on_conflict="key")\
                 .execute()
+            config_service.invalidate()
+            dashboard_cache.clear()
         
         return {"message": "Fine configuration updated successfully"}
     
@@ -591,6 +780,23 @@ async def update_fine_config(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/reminders/run")
+async def run_reminders(current_user: dict = Depends(get_admin_user)):
+    """
+    Run the due-soon / overdue reminder sweep now (normally scheduled)
+    """
+    try:
+        stats = await run_in_threadpool(run_reminder_sweep)
+        return {
+            "message": "Reminder sweep completed",
+            "stats": stats
+        }
+    
+    except Exception as e:
+        logger.error(f"Reminder sweep error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.post("/notifications/broadcast")
 async def broadcast_notification(
     notification: BroadcastNotification,
@@ -608,32 +814,26 @@ async def broadcast_notification(
         # Use service client to bypass RLS
         supabase = get_service_client()
         
-        # Get all students
-        students_response = supabase.table("user_profiles")\
-            .select("id")\
-            .eq("role", "student")\
-            .execute()
+        # One row per broadcast; students merge it into their feed at read time
+        response = supabase.table("broadcasts").insert({
+            "type": notification.type,
+            "title": notification.title,
+            "message": notification.message,
+            "created_by": current_user["user_id"]
+        }).execute()
         
-        if not students_response.data:
-            return {"message": "No students found"}
-        
-        # Create notifications for all students
-        notifications = []
-        for student in students_response.data:
-            notifications.append({
-                "user_id": student["id"],
-                "type": notification.type,
-                "title": notification.title,
-                "message": notification.message,
-                "is_read": False
-            })
+        if not response.data:
+            raise HTTPException(status_code=500, detail="Failed to create broadcast")
         
-        response = supabase.table("notifications").insert(notifications).execute()
+        notification_bus.publish_all("notification", broadcast_as_notification(response.data[0], None))
         
         return {
-            "message": f"Notification sent to {len(notifications)} students"
+            "message": "Notification broadcast to all students",
+            "broadcast": response.data[0]
         }
     
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Broadcast notification error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -647,46 +847,13 @@ async def get_notification_history(current_user: dict = Depends(get_admin_user))
     try:
         supabase = get_service_client()
         
-        # Get recent announcements (limit to last 50 to process)
-        # distinct() is not directly available in standard postgrest-py builder easily in this version maybe?
-        # We fetch all announcement type notifications ordered by time
-        
-        response = supabase.table("notifications")\
-            .select("title, message, created_at, type")\
-            .eq("type", "announcement")\
+        response = supabase.table("broadcasts")\
+            .select("id, title, message, created_at, type")\
             .order("created_at", desc=True)\
-            .limit(100)\
+            .limit(20)\
             .execute()
-            
-        if not response.data:
-            return {"notifications": []}
-            
-        # Deduplicate in python
-        # Group by (title, message, created_at minute) to avoid duplicates for same broadcast
-        unique_notifications = []
-        seen = set()
-        
-        for notif in response.data:
-            # Create a signature. created_at might differ by milliseconds if inserted sequentially, 
-            # but usually for a broadcast they are close. 
-            # Or simplified: checking title+message. 
-            # If a user sends same message twice, we might dedupe it unintentionally if we ignore time.
-            # Let's use first 16 chars of timestamp (min resolution)
-            
-            ts = notif["created_at"][:16] # YYYY-MM-DDTHH:MM
-            sig = (notif["title"], notif["message"], ts)
-            
-            if sig not in seen:
-                seen.add(sig)
-                unique_notifications.append({
-                    "id": f"{ts}-{len(seen)}", # Generate a temp id
-                    "title": notif["title"],
-                    "message": notif["message"],
-                    "created_at": notif["created_at"],
-                    "type": notif["type"]
-                })
-        
-        return {"notifications": unique_notifications[:20]} # Return top 20
+        
+        return {"notifications": response.data if response.data else []}
         
     except Exception as e:
         logger.error(f"Notification history error: {e}")
@@ -778,6 +945,7 @@ async def process_profile_request(
 @router.post("/borrows/{borrow_id}/return")
 async def return_book(
     borrow_id: str,
+    background_tasks: BackgroundTasks,
     current_user: dict = Depends(get_admin_user)
 ):
     """
@@ -798,25 +966,14 @@ async def return_book(
             raise HTTPException(status_code=400, detail="Book already returned")
             
         # Calculate fine if overdue
-        tz = ZoneInfo("Asia/Kolkata")
-        now = datetime.now(tz)
-        
-        # Handle due_date parsing
-        due_date_str = borrow["due_date"].replace('Z', '+00:00')
-        due_date = datetime.fromisoformat(due_date_str).astimezone(tz)
-        
-        fine_amount = 0.0
-        days_overdue = (now.date() - due_date.date()).days
-        
-        if days_overdue > 0:
-            # Get fine config
-            config_res = supabase.table("system_config").select("*").eq("key", "fine_per_day").execute()
-            fine_per_day = 5.0
-            if config_res.data:
-                fine_per_day = float(config_res.data[0]["value"])
-            
-            fine_amount = days_overdue * fine_per_day
-            
+        now = datetime.now(LIBRARY_TZ)
+        policy = get_system_config().fine_policy
+        fine_batch = compute_fines([borrow["due_date"]], policy=policy, as_of=now)
+        
+        days_overdue = fine_batch.days_overdue[0]
+        fine_amount = fine_batch.fines[0]
+        
+        if fine_amount > 0:
             # Create fine record
             supabase.table("fines").insert({
                 "user_id": borrow["user_id"],
@@ -829,10 +986,17 @@ async def return_book(
         # Update borrow record
         supabase.table("borrows").update({
             "status": "returned",
+            "fine_amount": fine_amount,
             "return_date": now.isoformat(),
             "updated_at": now.isoformat()
         }).eq("id", borrow_id).execute()
         
+        invalidate_dashboard(borrow["user_id"])
+        invalidate_book(borrow["book_id"])
+        
+        # Tell waiting subscribers after the response has been sent
+        background_tasks.add_task(fan_out_availability, borrow["book_id"])
+        
         return {
             "message": "Book returned successfully",
             "fine_generated": fine_amount > 0,
@@ -846,15 +1010,45 @@ async def return_book(
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.delete("/notifications/broadcast")
+@router.delete("/notifications/broadcast/{broadcast_id}")
 async def delete_broadcast(
+    broadcast_id: str,
+    current_user: dict = Depends(get_admin_user)
+):
+    """
+    Delete a broadcast notification (removes it for all students)
+    """
+    try:
+        supabase = get_service_client()
+        
+        # Read markers go with it via ON DELETE CASCADE
+        response = supabase.table("broadcasts")\
+            .delete()\
+            .eq("id", broadcast_id)\
+            .execute()
+        
+        if not response.data:
+            raise HTTPException(status_code=404, detail="Broadcast not found")
+            
+        return {"message": "Broadcast notification deleted"}
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Delete broadcast error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.delete("/notifications/broadcast")
+async def delete_legacy_broadcast(
     title: str = Query(...),
     message: str = Query(...),
     type: str = Query(...),
     current_user: dict = Depends(get_admin_user)
 ):
     """
-    Delete a broadcast notification (removes for all students)
+    Delete a broadcast sent before the broadcasts table existed
+    (one notification row per student, matched by text)
     """
     try:
         supabase = get_service_client()
@@ -1,8 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
 from api.dependencies import get_current_user
+from api.http_cache import PRIVATE_REVALIDATE, conditional_json
 from database import get_supabase_client, get_service_client
+from services.catalog import get_book_details as fetch_book_details, search_books as fetch_books, search_filters
+from services.singleflight import catalogue_flight
 from typing import Optional
 from pydantic import BaseModel
+import asyncio
 import logging
 
 logger = logging.getLogger(__name__)
@@ -14,6 +19,18 @@ class AvailabilitySubscription(BaseModel):
     book_id: str
 
 
+def _has_subscription(user_id: str, book_id: str) -> bool:
+    supabase = get_service_client()
+    response = supabase.table("availability_subscriptions")\
+        .select("id")\
+        .eq("user_id", user_id)\
+        .eq("book_id", book_id)\
+        .eq("notified", False)\
+        .limit(1)\
+        .execute()
+    return bool(response.data)
+
+
 @router.get("/search")
 async def search_books(
     title: Optional[str] = Query(None),
@@ -27,31 +44,8 @@ async def search_books(
     Search books with optional filters
     """
     try:
-        # Use service client to bypass RLS for public search (fixes 500 error)
-        supabase = get_service_client()
-        
-        # Start with base query
-        query = supabase.table("books").select("*")
-        
-        # Apply filters
-        # NOTE: Using '*' as wildcard instead of '%' because '%' causes URL encoding issues 
-        # with Cloudflare/Supabase and results in 500 Error.
-        if title:
-            query = query.ilike("title", f"*{title}*")
-        if author:
-            query = query.ilike("author", f"*{author}*")
-        if subject:
-            query = query.ilike("subject", f"*{subject}*")
-        if category:
-            query = query.eq("category", category)
-        if availability == "available":
-            query = query.gt("available_copies", 0)
-        elif availability == "unavailable":
-            query = query.eq("available_copies", 0)
-        
-        response = query.order("title").execute()
-        
-        books = response.data if response.data else []
+        filters = search_filters(title, author, subject, category, availability)
+        books = await catalogue_flight.do(("books.search",) + filters, fetch_books, filters)
         return {
             "books": books,
             "total": len(books)
@@ -64,51 +58,36 @@ async def search_books(
 
 @router.get("/{book_id}")
 async def get_book_details(
+    request: Request,
     book_id: str,
+    include_copies: bool = Query(False),
     current_user: dict = Depends(get_current_user)
 ):
     """
     Get detailed information about a specific book
     """
     try:
-        # Use service client to bypass RLS for public book details
-        supabase = get_service_client()
-        
-        # Get book details
-        book_response = supabase.table("books")\
-            .select("*")\
-            .eq("id", book_id)\
-            .single()\
-            .execute()
-        
-        if not book_response.data:
+        # The shared book lookup (coalesced across users) and this user's
+        # subscription check run concurrently
+        details, has_subscription = await asyncio.gather(
+            catalogue_flight.do(("books.detail", book_id, include_copies), fetch_book_details, book_id, include_copies),
+            run_in_threadpool(_has_subscription, current_user["user_id"], book_id)
+        )
+        
+        if not details:
             raise HTTPException(status_code=404, detail="Book not found")
         
-        book = book_response.data
-        
-        # Get book copies
-        copies_response = supabase.table("book_copies")\
-            .select("*")\
-            .eq("book_id", book_id)\
-            .execute()
-        
-        copies = copies_response.data if copies_response.data else []
-        
-        # Check if user has subscribed for availability notification
-        subscription_response = supabase.table("availability_subscriptions")\
-            .select("id")\
-            .eq("user_id", current_user["user_id"])\
-            .eq("book_id", book_id)\
-            .execute()
-        
-        has_subscription = len(subscription_response.data) > 0 if subscription_response.data else False
-        
-        return {
+        book = details["book"]
+        payload = {
             "book": book,
-            "copies": copies,
+            "copy_summary": details["copy_summary"],
             "is_available": book["available_copies"] > 0,
             "user_subscribed": has_subscription
         }
+        if include_copies:
+            payload["copies"] = details["copies"]
+        
+        return conditional_json(request, payload, PRIVATE_REVALIDATE)
     
     except HTTPException:
         raise
@@ -148,11 +127,12 @@ async def subscribe_to_availability(
                 "available": True
             }
         
-        # Check if already subscribed
+        # Check if already subscribed (and not notified yet)
         existing_response = supabase.table("availability_subscriptions")\
             .select("id")\
             .eq("user_id", user_id)\
             .eq("book_id", book_id)\
+            .eq("notified", False)\
             .execute()
         
         if existing_response.data:
@@ -160,7 +140,7 @@ async def subscribe_to_availability(
                 "message": "Already subscribed to notifications for this book"
             }
         
-        # Create subscription
+        # Create the subscription, or re-arm one that was already notified
         subscription_data = {
             "user_id": user_id,
             "book_id": book_id,
@@ -168,7 +148,7 @@ async def subscribe_to_availability(
         }
         
         response = supabase.table("availability_subscriptions")\
-            .insert(subscription_data)\
+            .upsert(subscription_data, on_conflict="user_id,book_id")\
             .execute()
         
         return {
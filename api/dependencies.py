@@ -1,4 +1,4 @@
-from fastapi import Depends, HTTPException, Header
+from fastapi import Depends, HTTPException, Header, Query
 from typing import Optional
 from auth.service import AuthService
 import logging
@@ -28,6 +28,19 @@ async def get_current_user(authorization: Optional[str] = Header(None)) -> dict:
         raise HTTPException(status_code=401, detail="Invalid or expired token")
 
 
+async def get_stream_user(
+    authorization: Optional[str] = Header(None),
+    access_token: Optional[str] = Query(None)
+) -> dict:
+    """
+    Dependency for streaming endpoints: browsers' EventSource cannot set headers,
+    so the token may also be passed as ?access_token=
+    """
+    if not authorization and access_token:
+        authorization = f"Bearer {access_token}"
+    return await get_current_user(authorization)
+
+
 async def get_student_user(current_user: dict = Depends(get_current_user)) -> dict:
     """
     Dependency to ensure user is a student
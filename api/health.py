@@ -1,4 +1,5 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
+from api.dependencies import get_admin_user
 
 router = APIRouter(tags=["Health"])
 
@@ -13,3 +14,17 @@ async def health_check():
         "service": "Smart Library API",
         "version": "1.0.0"
     }
+
+
+@router.get("/health/metrics")
+async def health_metrics(current_user: dict = Depends(get_admin_user)):
+    """
+    Request coalescing and catalogue cache counters (admin only: every call
+    also asks the shared cache for its memory use)
+    """
+    from services.catalog_cache import catalog_cache
+    from services.singleflight import catalogue_flight
+    return {
+        "singleflight": catalogue_flight.stats(),
+        "catalog_cache": catalog_cache.stats()
+    }
@@ -0,0 +1,70 @@
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from typing import Any, Callable, Optional, Union
+import hashlib
+import json
+
+# Cache-Control policies
+# Per-user data: never shared, always revalidated with the ETag
+PRIVATE_REVALIDATE = "private, no-cache"
+# Authenticated listings that change rarely
+PRIVATE_SHORT = "private, max-age=30"
+
+
+def public_cache_control(max_age: int) -> str:
+    """Shared reference data: browsers and CDNs may reuse it briefly"""
+    return f"public, max-age={max_age}, stale-while-revalidate={max_age * 5}"
+
+
+def make_etag(value: Any) -> str:
+    """Strong ETag from the content hash of any JSON-serialisable value"""
+    if not isinstance(value, bytes):
+        value = json.dumps(jsonable_encoder(value), sort_keys=True, separators=(",", ":")).encode()
+    return '"' + hashlib.blake2b(value, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """True if the client's If-None-Match already names this representation"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # Weak comparison, as RFC 9110 requires for If-None-Match
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return etag.removeprefix("W/") in candidates
+
+
+def not_modified(etag: str, cache_control: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": cache_control})
+
+
+def conditional_json(
+    request: Request,
+    payload: Union[Any, Callable[[], Any]],
+    cache_control: str,
+    etag: Optional[str] = None
+) -> Response:
+    """
+    Return payload as JSON with ETag/Cache-Control, or 304 if the client copy is current.
+
+    Pass a precomputed etag (from row versions or raw query data) and a payload
+    builder (callable) to skip building and serialising the payload when the answer
+    is 304; otherwise the rendered body is hashed.
+    """
+    if etag is not None and etag_matches(request, etag):
+        return not_modified(etag, cache_control)
+
+    if callable(payload):
+        payload = payload()
+
+    response = JSONResponse(jsonable_encoder(payload))
+    if etag is None:
+        etag = make_etag(response.body)
+        if etag_matches(request, etag):
+            return not_modified(etag, cache_control)
+
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = cache_control
+    return response
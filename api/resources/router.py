@@ -1,50 +1,83 @@
-from fastapi import APIRouter, Depends, Query, HTTPException, UploadFile, File, Form
+from fastapi import APIRouter, BackgroundTasks, Depends, Query, HTTPException, Request, UploadFile, File, Form
+from fastapi.responses import RedirectResponse
 from api.dependencies import get_current_user, get_admin_user
-from database import get_supabase_client
-from typing import Optional
+from api.http_cache import PRIVATE_SHORT, conditional_json
+from config import settings
+from services.catalog import get_resource, list_resources as fetch_resources, search_resource_contents
+from services.catalog_cache import invalidate_resources
+from services.download_counter import download_counter
+from services.resource_objects import acquire_object, mark_object_ready, release_object, storage_savings
+from services.resource_text import index_resources, index_on_upload, pending_resources
+from services.storage import (
+    RESOURCES_BUCKET,
+    content_object_path,
+    download_url,
+    hash_upload,
+    is_resource_object_path,
+    resource_object_path,
+    storage_bootstrap,
+    stored_object,
+    upload_resumable
+)
+from typing import Literal, Optional
+from pydantic import BaseModel, Field
 import logging
-import uuid
 import time
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/resources", tags=["Resources"])
 
+# Allowed by the resources.type CHECK constraint
+ResourceType = Literal["cie_paper", "syllabus", "notes", "other"]
+
+
+class UploadUrlRequest(BaseModel):
+    filename: str = Field(..., min_length=1)
+    subject: str = Field(..., min_length=1)
+    semester: int
+
+
+class FinalizeUploadRequest(BaseModel):
+    path: str
+    title: str
+    subject: str
+    semester: int
+    year: int
+    type: ResourceType = "cie_paper"
+
+
+def _release_file(service_client, content_hash: str):
+    """Drop a resource's reference to its stored file, deleting the file with the last one"""
+    released = release_object(service_client, content_hash)
+    if released and released["ref_count"] == 0:
+        storage_bootstrap.bucket(service_client, RESOURCES_BUCKET).remove([released["file_path"]])
+
 
 @router.get("")
 async def list_resources(
+    request: Request,
     title: Optional[str] = Query(None),
     subject: Optional[str] = Query(None),
     semester: Optional[int] = Query(None),
     year: Optional[int] = Query(None),
     type: Optional[str] = Query(None),
+    q: Optional[str] = Query(None, min_length=2, description="Search inside resource contents"),
+    limit: int = Query(20, ge=1, le=100),
     current_user: dict = Depends(get_current_user)
 ):
     """
-    List academic resources with filters
+    List academic resources with filters; with `q`, resources whose contents
+    match, best match first, each with a highlighted snippet
     """
     try:
-        # Use service client to bypass potentially restricted RLS if public read is not fully open
-        from database import get_service_client
-        supabase = get_service_client()
-        
-        query = supabase.table("resources").select("*")
-        
-        if title:
-            # Using custom wildcard search for title
-            query = query.ilike("title", f"%{title}%")
-        if subject:
-            query = query.ilike("subject", f"%{subject}%")
-        if semester:
-            query = query.eq("semester", semester)
-        if year:
-            query = query.eq("year", year)
-        if type:
-            query = query.eq("type", type)
-        
-        response = query.order("year", desc=True).order("semester", desc=True).execute()
+        filters = (title, subject, semester, year, type)
+        if q:
+            resources = search_resource_contents(q, filters, limit)
+        else:
+            resources = fetch_resources(filters)
         
-        return response.data if response.data else []
+        return conditional_json(request, resources, PRIVATE_SHORT)
     
     except Exception as e:
         logger.error(f"List resources error: {e}")
@@ -53,11 +86,12 @@ async def list_resources(
 
 @router.post("")
 async def upload_resource(
+    background_tasks: BackgroundTasks,
     title: str = Form(...),
     subject: str = Form(...),
     semester: int = Form(...),
     year: int = Form(...),
-    type: str = Form("paper"), # paper, notes, etc
+    type: ResourceType = Form("cie_paper"),
     file: UploadFile = File(...),
     current_user: dict = Depends(get_admin_user)
 ):
@@ -69,60 +103,65 @@ async def upload_resource(
         from database import get_service_client
         service_client = get_service_client()
         
-        # Ensure bucket exists
-        try:
-            buckets = service_client.storage.list_buckets()
-            bucket_names = [b.name for b in buckets]
-            if "resources" not in bucket_names:
-                logger.info("Creating 'resources' bucket...")
-                service_client.storage.create_bucket("resources", options={"public": True})
-        except Exception as bucket_err:
-             logger.warning(f"Bucket check/create failed (might already exist or permission issue): {bucket_err}")
-
-        # 1. Generate unique filename
-        file_ext = file.filename.split(".")[-1]
-        unique_filename = f"{uuid.uuid4()}.{file_ext}"
-        file_path = f"{subject}/{semester}/{unique_filename}"
-        
-        # 2. Read file
-        contents = await file.read()
-        
-        # 3. Upload to Storage using service client
-        try:
-            storage_response = service_client.storage.from_("resources").upload(
-                file_path,
-                contents,
-                {"content-type": file.content_type}
-            )
-        except Exception as upload_err:
-             logger.error(f"Storage upload failed: {upload_err}")
-             raise HTTPException(status_code=500, detail=f"Storage upload failed: {str(upload_err)}")
-
-        # 4. Get Public URL
-        public_url_res = service_client.storage.from_("resources").get_public_url(file_path)
-        file_url = public_url_res 
-        
-        # 5. Insert into Database
+        bucket = storage_bootstrap.bucket(service_client, RESOURCES_BUCKET)
+
+        # 1. Hash the file: identical files share one content-addressed object
+        content_hash, file_size = await hash_upload(file)
+        file_path = content_object_path(content_hash, file.filename)
+        
+        # 2. Take a reference on the object; only the first copy is uploaded
+        stored = acquire_object(service_client, content_hash, file_path, bucket.get_public_url(file_path), file_size)
+        
+        if not stored["ready"]:
+            # A pending object is ours to upload, or its first upload is still
+            # running (or failed): upload the same bytes unless they are there now
+            try:
+                if stored["created"] or stored_object(service_client, RESOURCES_BUCKET, stored["file_path"]) is None:
+                    # Stream the file to Storage in chunks (resumable upload)
+                    await upload_resumable(RESOURCES_BUCKET, stored["file_path"], file, file.content_type, upsert=True)
+                mark_object_ready(service_client, content_hash)
+            except Exception as upload_err:
+                 logger.error(f"Storage upload failed: {upload_err}")
+                 _release_file(service_client, content_hash)
+                 raise HTTPException(status_code=500, detail=f"Storage upload failed: {str(upload_err)}")
+        if not stored["created"]:
+            logger.info(f"Resource file {content_hash[:12]} already stored, linked instead ({file_size} bytes saved)")
+        
+        # 3. Insert into Database
         resource_data = {
             "title": title,
             "subject": subject,
             "semester": semester,
             "year": year,
             "type": type,
-            "file_url": file_url,
-            "file_path": file_path,
-            "file_size": len(contents),
+            "file_url": stored["file_url"],
+            "file_path": stored["file_path"],
+            "file_size": stored["file_size"],
+            "content_hash": content_hash,
             "uploaded_by": current_user["user_id"]
         }
         
-        db_response = service_client.table("resources").insert(resource_data).execute()
+        try:
+            db_response = service_client.table("resources").insert(resource_data).execute()
+        except Exception:
+            _release_file(service_client, content_hash)
+            raise
         
         if not db_response.data:
+            _release_file(service_client, content_hash)
             raise HTTPException(status_code=500, detail="Failed to save resource metadata")
+        
+        invalidate_resources()
+        
+        # Extract the text for content search after the response is sent
+        resource = db_response.data[0]
+        if index_on_upload(resource):
+            background_tasks.add_task(index_resources, [resource])
             
         return {
             "message": "Resource uploaded successfully",
-            "resource": db_response.data[0]
+            "resource": resource,
+            "deduplicated": not stored["created"]
         }
 
     except HTTPException:
@@ -135,30 +174,178 @@ async def upload_resource(
 
 
 
+@router.post("/upload-url")
+async def create_upload_url(
+    request: UploadUrlRequest,
+    current_user: dict = Depends(get_admin_user)
+):
+    """
+    Step 1 of a direct upload: a signed URL the client uploads the file to
+    (PUT, straight to Storage) before calling /resources/finalize
+    """
+    try:
+        from database import get_service_client
+        service_client = get_service_client()
+        
+        bucket = storage_bootstrap.bucket(service_client, RESOURCES_BUCKET)
+        
+        file_path = resource_object_path(request.subject, request.semester, request.filename)
+        signed = bucket.create_signed_upload_url(file_path)
+        
+        return {
+            "upload_url": signed["signed_url"],
+            "token": signed["token"],
+            "bucket": RESOURCES_BUCKET,
+            "path": file_path
+        }
+    
+    except Exception as e:
+        logger.error(f"Create upload URL error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/finalize")
+async def finalize_upload(
+    request: FinalizeUploadRequest,
+    background_tasks: BackgroundTasks,
+    current_user: dict = Depends(get_admin_user)
+):
+    """
+    Step 2 of a direct upload: verify the uploaded object and save the resource
+    """
+    try:
+        if not is_resource_object_path(request.path, request.subject, request.semester):
+            raise HTTPException(status_code=400, detail="Path was not issued for this subject and semester")
+        
+        from database import get_service_client
+        service_client = get_service_client()
+        
+        # Finalizing twice returns the resource saved the first time
+        existing = service_client.table("resources")\
+            .select("*")\
+            .eq("file_path", request.path)\
+            .limit(1)\
+            .execute()
+        if existing.data:
+            return {
+                "message": "Resource uploaded successfully",
+                "resource": existing.data[0]
+            }
+        
+        metadata = stored_object(service_client, RESOURCES_BUCKET, request.path)
+        if metadata is None:
+            raise HTTPException(status_code=404, detail="Uploaded file not found in storage")
+        
+        resource_data = {
+            "title": request.title,
+            "subject": request.subject,
+            "semester": request.semester,
+            "year": request.year,
+            "type": request.type,
+            "file_url": storage_bootstrap.bucket(service_client, RESOURCES_BUCKET).get_public_url(request.path),
+            "file_path": request.path,
+            "file_size": metadata.get("size"),
+            "uploaded_by": current_user["user_id"]
+        }
+        
+        db_response = service_client.table("resources").insert(resource_data).execute()
+        
+        if not db_response.data:
+            raise HTTPException(status_code=500, detail="Failed to save resource metadata")
+        
+        invalidate_resources()
+        
+        resource = db_response.data[0]
+        if index_on_upload(resource):
+            background_tasks.add_task(index_resources, [resource])
+        
+        return {
+            "message": "Resource uploaded successfully",
+            "resource": resource
+        }
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Finalize upload error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/storage-stats")
+async def resource_storage_stats(
+    current_user: dict = Depends(get_admin_user)
+):
+    """
+    Storage saved by content-addressed deduplication of uploaded files
+    """
+    try:
+        from database import get_service_client
+        return storage_savings(get_service_client())
+    
+    except Exception as e:
+        logger.error(f"Resource storage stats error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/reindex")
+async def reindex_resources(
+    background_tasks: BackgroundTasks,
+    limit: int = Query(500, ge=1, le=5000),
+    current_user: dict = Depends(get_admin_user)
+):
+    """
+    Backfill content search: extract the text of PDF resources that have not
+    been indexed yet (up to `limit` per call; call again until nothing is queued)
+    """
+    try:
+        from database import get_service_client
+        pending = pending_resources(get_service_client(), limit)
+        
+        if pending:
+            background_tasks.add_task(index_resources, pending)
+        
+        return {"queued": len(pending)}
+    
+    except Exception as e:
+        logger.error(f"Reindex resources error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/{resource_id}/download")
 async def download_resource(
     resource_id: str,
+    background_tasks: BackgroundTasks,
+    redirect: bool = Query(False, description="Answer with a 302 to the file instead of JSON"),
     current_user: dict = Depends(get_current_user)
 ):
     """
-    Get download URL for a resource
+    Get download URL for a resource, or with `redirect=true` a cacheable
+    302 straight to the file
     """
     try:
-        supabase = get_supabase_client()
+        from database import get_service_client
         
-        response = supabase.table("resources")\
-            .select("*")\
-            .eq("id", resource_id)\
-            .single()\
-            .execute()
+        resource = get_resource(resource_id)
         
-        if not response.data:
+        if not resource:
             raise HTTPException(status_code=404, detail="Resource not found")
         
+        url = download_url(get_service_client(), resource)
+        
+        if download_counter.record(resource_id):
+            background_tasks.add_task(download_counter.flush)
+        
+        if redirect:
+            # A signed URL must not be reused from the browser cache after it expires
+            max_age = settings.download_redirect_max_age_seconds
+            if settings.resource_signed_url_seconds:
+                max_age = min(max_age, settings.resource_signed_url_seconds // 2)
+            return RedirectResponse(url, status_code=302, headers={"Cache-Control": f"private, max-age={max_age}"})
+        
         return {
-            "download_url": response.data["file_url"],
-            "title": response.data["title"],
-            "file_size": response.data.get("file_size")
+            "download_url": url,
+            "title": resource["title"],
+            "file_size": resource.get("file_size")
         }
     
     except HTTPException:
@@ -186,18 +373,22 @@ async def delete_resource(
             raise HTTPException(status_code=404, detail="Resource not found")
             
         resource = res.data
-        file_path = resource["file_path"]
-        
-        # Delete from storage
-        if file_path:
-            try:
-                service_client.storage.from_("resources").remove([file_path])
-            except Exception as storage_err:
-                logger.error(f"Failed to delete file from storage: {storage_err}")
-                # Continue to delete metadata even if file delete fails (orphaned file is better than broken UI)
+        file_path = resource.get("file_path")
+        content_hash = resource.get("content_hash")
         
         # Delete from database
         service_client.table("resources").delete().eq("id", resource_id).execute()
+        invalidate_resources(resource_id)
+        
+        # Delete from storage, for shared files only once no resource references them
+        try:
+            if content_hash:
+                _release_file(service_client, content_hash)
+            elif file_path:
+                storage_bootstrap.bucket(service_client, RESOURCES_BUCKET).remove([file_path])
+        except Exception as storage_err:
+            logger.error(f"Failed to delete file from storage: {storage_err}")
+            # The resource is gone either way (orphaned file is better than broken UI)
         
         return {"message": "Resource deleted successfully"}
         
@@ -1,5 +1,7 @@
-from fastapi import APIRouter
-from database import get_supabase_client
+from fastapi import APIRouter, Request
+from api.http_cache import conditional_json, public_cache_control
+from config import settings
+from services.system_config import SystemConfig, get_system_config
 import logging
 
 logger = logging.getLogger(__name__)
@@ -8,38 +10,18 @@ router = APIRouter(prefix="/rules", tags=["Rules"])
 
 
 @router.get("/borrow-policy")
-async def get_borrow_policy():
+async def get_borrow_policy(request: Request):
     """
     Get borrowing policy and rules
     """
+    cache_control = public_cache_control(settings.borrow_policy_max_age_seconds)
+    
     try:
-        supabase = get_supabase_client()
-        
-        # Get configuration from database
-        response = supabase.table("system_config")\
-            .select("*")\
-            .in_("key", ["borrow_duration_days", "grace_period_days", "fine_per_day", "max_books_per_student"])\
-            .execute()
-        
-        # Convert to dict
-        config = {}
-        if response.data:
-            for item in response.data:
-                config[item["key"]] = item["value"]
-        
-        return {
-            "borrow_duration_days": int(config.get("borrow_duration_days", 14)),
-            "grace_period_days": int(config.get("grace_period_days", 2)),
-            "fine_per_day": float(config.get("fine_per_day", 5)),
-            "max_books_per_student": int(config.get("max_books_per_student", 3))
-        }
+        config = get_system_config()
+        # The snapshot's ETag is known up front, so a 304 skips building the body
+        return conditional_json(request, config.borrow_policy, cache_control, etag=config.etag)
     
     except Exception as e:
         logger.error(f"Get borrow policy error: {e}")
-        # Return default values if database query fails
-        return {
-            "borrow_duration_days": 14,
-            "grace_period_days": 2,
-            "fine_per_day": 5.0,
-            "max_books_per_student": 3
-        }
+        # Return default values if the configuration cannot be loaded
+        return SystemConfig().borrow_policy()
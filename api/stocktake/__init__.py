@@ -0,0 +1 @@
+# Stocktake API module init
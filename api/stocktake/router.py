@@ -0,0 +1,227 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from api.dependencies import get_admin_user
+from database import get_service_client
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from uuid import UUID
+from datetime import datetime
+from services.stocktake import StocktakeClosedError, scan_tags, stocktake_report, tags_from_body, tags_from_list
+import logging
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/admin/stocktake", tags=["Stocktake"])
+
+# Everything but the seen bitmap
+SESSION_COLUMNS = "id, name, department, category, subject, status, seen_count, scan_count, created_by, created_at, closed_at"
+
+
+class StocktakeCreate(BaseModel):
+    name: str = Field(..., min_length=1)
+    # Shelf area being audited; copies of other books found there are misplaced
+    department: Optional[str] = None
+    category: Optional[str] = None
+    subject: Optional[str] = None
+
+
+class ScanBatch(BaseModel):
+    tags: List[str]
+
+
+def _get_session(supabase, session_id: UUID) -> dict:
+    response = supabase.table("stocktake_sessions")\
+        .select(SESSION_COLUMNS)\
+        .eq("id", str(session_id))\
+        .limit(1)\
+        .execute()
+    if not response.data:
+        raise HTTPException(status_code=404, detail="Stocktake session not found")
+    return response.data[0]
+
+
+@router.post("")
+async def create_stocktake(
+    session: StocktakeCreate,
+    current_user: dict = Depends(get_admin_user)
+):
+    """
+    Start a stocktake session
+    """
+    try:
+        supabase = get_service_client()
+        
+        response = supabase.table("stocktake_sessions").insert({
+            **session.dict(),
+            "created_by": current_user["user_id"]
+        }).execute()
+        
+        if not response.data:
+            raise HTTPException(status_code=500, detail="Failed to create stocktake session")
+        
+        created = response.data[0]
+        created.pop("seen", None)
+        return {
+            "message": "Stocktake session started",
+            "session": created
+        }
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Create stocktake error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("")
+async def list_stocktakes(
+    current_user: dict = Depends(get_admin_user)
+):
+    """
+    List stocktake sessions, newest first
+    """
+    try:
+        supabase = get_service_client()
+        
+        response = supabase.table("stocktake_sessions")\
+            .select(SESSION_COLUMNS)\
+            .order("created_at", desc=True)\
+            .execute()
+        
+        return {"sessions": response.data or []}
+    
+    except Exception as e:
+        logger.error(f"List stocktakes error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/{session_id}/scans")
+async def add_scans(
+    session_id: UUID,
+    request: Request,
+    current_user: dict = Depends(get_admin_user)
+):
+    """
+    Add scanned tags to a session: JSON {"tags": [...]}, or a streamed body
+    with one tag per line (plain or JSON lines), applied in batches as it arrives
+    """
+    try:
+        supabase = get_service_client()
+        
+        session = _get_session(supabase, session_id)
+        if session["status"] != "open":
+            raise HTTPException(status_code=409, detail="Stocktake session is closed")
+        
+        if request.headers.get("content-type", "").startswith("application/json"):
+            batch = ScanBatch(**(await request.json()))
+            tags = tags_from_list(batch.tags)
+        else:
+            tags = tags_from_body(request.stream())
+        
+        totals = await scan_tags(supabase, str(session_id), tags)
+        
+        return {
+            "session_id": str(session_id),
+            **totals
+        }
+    
+    except HTTPException:
+        raise
+    except LookupError as e:
+        # The session was deleted while the tags were streaming in
+        raise HTTPException(status_code=404, detail=str(e))
+    except StocktakeClosedError as e:
+        # A close claimed the session while the tags were streaming in
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        logger.error(f"Stocktake scan error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/{session_id}/report")
+async def get_stocktake_report(
+    session_id: UUID,
+    limit: int = Query(1000, ge=1, le=100000),
+    current_user: dict = Depends(get_admin_user)
+):
+    """
+    Missing, misplaced and unexpectedly present copies, and unknown tags.
+    A closed session returns the report saved when it was closed.
+    """
+    try:
+        supabase = get_service_client()
+        
+        session = _get_session(supabase, session_id)
+        if session["status"] == "closed":
+            saved = supabase.table("stocktake_sessions")\
+                .select("report")\
+                .eq("id", str(session_id))\
+                .limit(1)\
+                .execute()
+            if saved.data and saved.data[0].get("report"):
+                return {"session": session, "report": saved.data[0]["report"]}
+        
+        report = stocktake_report(supabase, str(session_id), limit)
+        return {"session": session, "report": report}
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Stocktake report error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/{session_id}/close")
+async def close_stocktake(
+    session_id: UUID,
+    current_user: dict = Depends(get_admin_user)
+):
+    """
+    Close a session: no more scans, and the final report is saved with it
+    """
+    try:
+        supabase = get_service_client()
+        
+        # Claim the session first: scans are refused from here on, so the
+        # report saved below is final
+        claimed = supabase.table("stocktake_sessions")\
+            .update({"status": "closing"})\
+            .eq("id", str(session_id))\
+            .eq("status", "open")\
+            .execute()
+        
+        if not claimed.data:
+            session = _get_session(supabase, session_id)
+            if session["status"] == "closing":
+                raise HTTPException(status_code=409, detail="Stocktake session is being closed")
+            raise HTTPException(status_code=409, detail="Stocktake session is already closed")
+        
+        try:
+            report = stocktake_report(supabase, str(session_id), 100000)
+            
+            supabase.table("stocktake_sessions")\
+                .update({
+                    "status": "closed",
+                    "report": report,
+                    "closed_at": datetime.now().isoformat()
+                })\
+                .eq("id", str(session_id))\
+                .execute()
+        except Exception:
+            # Reopen, so the close can be retried
+            supabase.table("stocktake_sessions")\
+                .update({"status": "open"})\
+                .eq("id", str(session_id))\
+                .eq("status", "closing")\
+                .execute()
+            raise
+        
+        return {
+            "message": "Stocktake session closed",
+            "report": report
+        }
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Close stocktake error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,11 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException
-from api.dependencies import get_student_user
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from api.dependencies import get_student_user, get_stream_user
+from api.http_cache import PRIVATE_REVALIDATE, conditional_json, make_etag
 from database import get_supabase_client
+from services.dashboard import get_dashboard_summary
+from services.notification_bus import notification_bus
+from services.notifications import fetch_student_feed, mark_all_read, mark_read, unread_count
+from services.fines import LIBRARY_TZ, compute_fines, days_until_due, today_day_number
+from services.system_config import get_system_config
 from datetime import datetime
-from zoneinfo import ZoneInfo
+import json
 import logging
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from uuid import UUID
 
 logger = logging.getLogger(__name__)
 
@@ -18,73 +27,103 @@ async def get_student_dashboard(current_user: dict = Depends(get_student_user)):
     Get student dashboard summary with borrowed books count, due soon, overdue, and total fines
     """
     try:
-        supabase = get_supabase_client()
-        user_id = current_user["user_id"]
-        
-        # Get currently borrowed books
-        borrowed_response = supabase.table("borrows")\
-            .select("*")\
-            .eq("user_id", user_id)\
-            .eq("status", "borrowed")\
-            .execute()
-        
-        borrowed_books = borrowed_response.data if borrowed_response.data else []
-        borrowed_count = len(borrowed_books)
-        
-        # Count due soon (within 3 days) and Calculate dynamic fines
-        due_soon_count = 0
-        overdue_count = 0
-        dynamic_fine = 0
-        
-        # specific timezone
-        tz = ZoneInfo("Asia/Kolkata")
-        now = datetime.now(tz)
-        
-        for borrow in borrowed_books:
-            # Handle potential Z suffix and ensure timezone awareness
-            due_date_str = borrow["due_date"].replace('Z', '+00:00')
-            due_date = datetime.fromisoformat(due_date_str).astimezone(tz)
-            
-            # Calculate difference in days (using date() to ignore time)
-            days_diff = (now.date() - due_date.date()).days
-            
-            if days_diff > 0:
-                overdue_count += 1
-                # Calculate fine: 5 Rs per day overdue
-                fine_amount = days_diff * 5
-                dynamic_fine += fine_amount
-            elif days_diff >= -3:
-                # Due within next 3 days (days_diff is negative or zero)
-                due_soon_count += 1
-        
-        # Get pending fines from database (fines already charged)
-        fines_response = supabase.table("fines")\
-            .select("amount")\
-            .eq("user_id", user_id)\
-            .eq("status", "pending")\
-            .execute()
-        
-        persisted_fine = sum(fine["amount"] for fine in (fines_response.data or []))
-        
-        # Total fine is potential/dynamic fine + already charged pending fines
-        total_fine = dynamic_fine + persisted_fine
-        
-        return {
-            "summary": {
-                "currently_borrowed": borrowed_count,
-                "due_soon": due_soon_count,
-                "overdue": overdue_count,
-                "total_fine": float(total_fine)
-            }
-        }
+        return {"summary": get_dashboard_summary(current_user["user_id"])}
     
     except Exception as e:
         logger.error(f"Dashboard error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _format_current_books(rows: list, policy, user_id: str) -> list:
+    borrowed_books = []
+    due_dates = [borrow["due_date"] for borrow in rows]
+    
+    try:
+        remaining = days_until_due(due_dates)
+        accrued_fines = compute_fines(due_dates, policy=policy).fines
+    except Exception:
+        # A bad due date: go row by row so only that borrow is "unknown"
+        remaining = []
+        accrued_fines = []
+        for borrow, due_date in zip(rows, due_dates):
+            try:
+                days_remaining = days_until_due([due_date])[0]
+                accrued_fine = compute_fines([due_date], policy=policy).fines[0]
+            except Exception as e:
+                logger.error(f"Date parsing error for borrow {borrow['id']} of user {user_id}: {e}")
+                days_remaining, accrued_fine = None, 0.0
+            remaining.append(days_remaining)
+            accrued_fines.append(accrued_fine)
+    
+    for borrow, days_remaining, accrued_fine in zip(rows, remaining, accrued_fines):
+        book = borrow.get("books", {})
+        
+        # Determine status based on days remaining
+        if days_remaining is None:
+            days_remaining = 0
+            status = "unknown"
+        elif days_remaining < 0:
+            status = "overdue"
+        elif days_remaining <= policy.due_soon_days:
+            status = "due_soon"
+        else:
+            status = "safe"
+        
+        borrowed_books.append({
+            "borrow_id": borrow["id"],
+            "book_id": book.get("id"),
+            "title": book.get("title"),
+            "author": book.get("author"),
+            "borrow_date": borrow["borrow_date"],
+            "due_date": borrow["due_date"],
+            "days_remaining": days_remaining,
+            "status": status,
+            "fine_amount": float(borrow.get("fine_amount", 0)),
+            "accrued_fine": float(accrued_fine)
+        })
+    
+    return borrowed_books
+
+
+def _format_history(rows: list) -> list:
+    history = []
+    for borrow in rows:
+        book = borrow.get("books", {})
+        
+        # Determine if returned on time
+        returned_status = None
+        if borrow["return_date"]:
+            try:
+                tz = LIBRARY_TZ
+                return_date_str = borrow["return_date"].replace('Z', '+00:00')
+                due_date_str = borrow["due_date"].replace('Z', '+00:00')
+                
+                return_date = datetime.fromisoformat(return_date_str).astimezone(tz)
+                due_date = datetime.fromisoformat(due_date_str).astimezone(tz)
+                
+                returned_status = "on_time" if return_date <= due_date else "late"
+            except Exception as e:
+                logger.error(f"Date comparison error in history: {e}")
+                returned_status = "unknown"
+        
+        history.append({
+            "borrow_id": borrow["id"],
+            "book_id": book.get("id"),
+            "title": book.get("title"),
+            "author": book.get("author"),
+            "borrow_date": borrow["borrow_date"],
+            "due_date": borrow["due_date"],
+            "return_date": borrow.get("return_date"),
+            "status": borrow["status"],
+            "returned_status": returned_status,
+            "fine_amount": float(borrow.get("fine_amount", 0))
+        })
+    
+    return history
+
+
 @router.get("/books/current")
-async def get_current_borrowed_books(current_user: dict = Depends(get_student_user)):
+async def get_current_borrowed_books(request: Request, current_user: dict = Depends(get_student_user)):
     """
     Get currently borrowed books for the student
     """
@@ -100,47 +139,18 @@ async def get_current_borrowed_books(current_user: dict = Depends(get_student_us
             .order("borrow_date", desc=True)\
             .execute()
         
-        if not response.data:
-            return {"books": []}
+        rows = response.data or []
+        config = get_system_config()
         
-        # Format response
-        borrowed_books = []
-        tz = ZoneInfo("Asia/Kolkata")
-        now = datetime.now(tz)
+        # Days remaining and fines change with the date and the fine rules, not just the rows
+        etag = make_etag([rows, today_day_number(), config.etag])
         
-        for borrow in response.data:
-            book = borrow.get("books", {})
-            try:
-                # Handle potential Z suffix and ensure timezone awareness
-                due_date_str = borrow["due_date"].replace('Z', '+00:00')
-                due_date = datetime.fromisoformat(due_date_str).astimezone(tz)
-                days_remaining = (due_date.date() - now.date()).days
-                
-                # Determine status based on days remaining
-                if days_remaining < 0:
-                    status = "overdue"
-                elif days_remaining <= 3:
-                    status = "due_soon"
-                else:
-                    status = "safe"
-            except Exception as e:
-                logger.error(f"Date parsing error for borrow {borrow['id']}: {e}")
-                days_remaining = 0
-                status = "unknown"
-            
-            borrowed_books.append({
-                "borrow_id": borrow["id"],
-                "book_id": book.get("id"),
-                "title": book.get("title"),
-                "author": book.get("author"),
-                "borrow_date": borrow["borrow_date"],
-                "due_date": borrow["due_date"],
-                "days_remaining": days_remaining,
-                "status": status,
-                "fine_amount": float(borrow.get("fine_amount", 0))
-            })
-        
-        return {"books": borrowed_books}
+        return conditional_json(
+            request,
+            lambda: {"books": _format_current_books(rows, config.fine_policy, user_id)},
+            PRIVATE_REVALIDATE,
+            etag=etag
+        )
     
     except Exception as e:
         logger.error(f"Current books error: {e}")
@@ -148,7 +158,7 @@ async def get_current_borrowed_books(current_user: dict = Depends(get_student_us
 
 
 @router.get("/books/history")
-async def get_borrow_history(current_user: dict = Depends(get_student_user)):
+async def get_borrow_history(request: Request, current_user: dict = Depends(get_student_user)):
     """
     Get complete borrow history for the student
     """
@@ -162,44 +172,14 @@ async def get_borrow_history(current_user: dict = Depends(get_student_user)):
             .order("borrow_date", desc=True)\
             .execute()
         
-        if not response.data:
-            return {"history": []}
+        rows = response.data or []
         
-        history = []
-        for borrow in response.data:
-            book = borrow.get("books", {})
-            
-            # Determine if returned on time
-            # Determine if returned on time
-            returned_status = None
-            if borrow["return_date"]:
-                try:
-                    tz = ZoneInfo("Asia/Kolkata")
-                    return_date_str = borrow["return_date"].replace('Z', '+00:00')
-                    due_date_str = borrow["due_date"].replace('Z', '+00:00')
-                    
-                    return_date = datetime.fromisoformat(return_date_str).astimezone(tz)
-                    due_date = datetime.fromisoformat(due_date_str).astimezone(tz)
-                    
-                    returned_status = "on_time" if return_date <= due_date else "late"
-                except Exception as e:
-                    logger.error(f"Date comparison error in history: {e}")
-                    returned_status = "unknown"
-            
-            history.append({
-                "borrow_id": borrow["id"],
-                "book_id": book.get("id"),
-                "title": book.get("title"),
-                "author": book.get("author"),
-                "borrow_date": borrow["borrow_date"],
-                "due_date": borrow["due_date"],
-                "return_date": borrow.get("return_date"),
-                "status": borrow["status"],
-                "returned_status": returned_status,
-                "fine_amount": float(borrow.get("fine_amount", 0))
-            })
-        
-        return {"history": history}
+        return conditional_json(
+            request,
+            lambda: {"history": _format_history(rows)},
+            PRIVATE_REVALIDATE,
+            etag=make_etag(rows)
+        )
     
     except Exception as e:
         logger.error(f"Borrow history error: {e}")
@@ -217,17 +197,8 @@ async def get_student_notifications(current_user: dict = Depends(get_student_use
         supabase = get_service_client()
         user_id = current_user["user_id"]
         
-        response = supabase.table("notifications")\
-            .select("*")\
-            .eq("user_id", user_id)\
-            .order("created_at", desc=True)\
-            .limit(50)\
-            .execute()
-        
-        notifications = response.data if response.data else []
-        
-        # Calculate unread count
-        unread_count = sum(1 for n in notifications if not n.get("is_read", False))
+        # Personal notifications and broadcasts merged at read time
+        notifications, unread_count = fetch_student_feed(supabase, user_id)
         
         return {
             "notifications": notifications,
@@ -239,30 +210,133 @@ async def get_student_notifications(current_user: dict = Depends(get_student_use
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+@router.get("/notifications/stream")
+async def stream_notifications(current_user: dict = Depends(get_stream_user)):
+    """
+    Server-Sent Events stream of new notifications and unread-count changes
+    """
+    if current_user.get("role") != "student":
+        raise HTTPException(status_code=403, detail="Access denied: Student role required")
+    
+    user_id = current_user["user_id"]
+    
+    async def event_stream():
+        queue = notification_bus.subscribe(user_id)
+        try:
+            # Initial state so the client does not need a separate poll
+            from database import get_service_client
+            count = await run_in_threadpool(unread_count, get_service_client(), user_id)
+            yield _sse("unread_count", {"unread_count": count})
+            
+            while True:
+                event, data = await queue.get()
+                if event == "ping":
+                    # Comment line keeps proxies from closing idle connections
+                    yield ": keep-alive\n\n"
+                else:
+                    yield _sse(event, data)
+        finally:
+            notification_bus.unsubscribe(user_id, queue)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"
+        }
+    )
+
+
+class MarkReadRequest(BaseModel):
+    ids: List[str] = Field(..., min_length=1, max_length=500)
+
+
+def _is_uuid(value: str) -> bool:
+    try:
+        UUID(value)
+        return True
+    except ValueError:
+        return False
+
+
+@router.put("/notifications/read-all")
+async def mark_all_notifications_read(current_user: dict = Depends(get_student_user)):
+    """
+    Mark every notification (including broadcasts) as read
+    """
+    try:
+        from database import get_service_client
+        supabase = get_service_client()
+        user_id = current_user["user_id"]
+        
+        result = mark_all_read(supabase, user_id)
+        notification_bus.publish(user_id, "unread_count", {"unread_count": result["unread_count"]})
+        
+        return {
+            "message": "All notifications marked as read",
+            "unread_count": result["unread_count"]
+        }
+    
+    except Exception as e:
+        logger.error(f"Mark all notifications error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.put("/notifications/read")
+async def mark_notifications_read(request: MarkReadRequest, current_user: dict = Depends(get_student_user)):
+    """
+    Mark many notifications as read in one request
+    """
+    try:
+        from database import get_service_client
+        supabase = get_service_client()
+        user_id = current_user["user_id"]
+        
+        invalid = [notification_id for notification_id in request.ids if not _is_uuid(notification_id)]
+        if invalid:
+            raise HTTPException(status_code=400, detail=f"Invalid notification id: {invalid[0]}")
+        
+        result = mark_read(supabase, user_id, request.ids)
+        notification_bus.publish(user_id, "unread_count", {"unread_count": result["unread_count"]})
+        
+        return {
+            "message": f"{result['matched']} notifications marked as read",
+            "matched": result["matched"],
+            "unread_count": result["unread_count"]
+        }
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Mark notifications error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.put("/notifications/{notification_id}/read")
 async def mark_notification_read(notification_id: str, current_user: dict = Depends(get_student_user)):
     """
     Mark a notification as read
     """
     try:
-        supabase = get_supabase_client()
+        from database import get_service_client
+        supabase = get_service_client()
         user_id = current_user["user_id"]
         
-        # Verify notification belongs to user
-        check_response = supabase.table("notifications")\
-            .select("id")\
-            .eq("id", notification_id)\
-            .eq("user_id", user_id)\
-            .execute()
+        if not _is_uuid(notification_id):
+            raise HTTPException(status_code=404, detail="Notification not found")
+        
+        # Ownership is enforced inside the update itself, so this is one round trip
+        result = mark_read(supabase, user_id, [notification_id])
         
-        if not check_response.data:
+        if not result["matched"]:
             raise HTTPException(status_code=404, detail="Notification not found")
         
-        # Mark as read
-        response = supabase.table("notifications")\
-            .update({"is_read": True})\
-            .eq("id", notification_id)\
-            .execute()
+        notification_bus.publish(user_id, "unread_count", {"unread_count": result["unread_count"]})
         
         return {"message": "Notification marked as read"}
     
@@ -1,6 +1,5 @@
 from datetime import datetime, timedelta
 from typing import Optional
-from jose import JWTError, jwt
 from database import get_supabase_client, get_service_client
 from config import settings
 import logging
@@ -14,6 +13,8 @@ class AuthService:
     @staticmethod
     def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
         """Create JWT access token"""
+        from jose import jwt
+        
         to_encode = data.copy()
         if expires_delta:
             expire = datetime.utcnow() + expires_delta
@@ -27,6 +28,8 @@ class AuthService:
     @staticmethod
     def verify_token(token: str) -> Optional[dict]:
         """Verify and decode JWT token"""
+        from jose import JWTError, jwt
+        
         try:
             payload = jwt.decode(token, settings.jwt_secret_key, algorithms=[settings.jwt_algorithm])
             return payload
@@ -0,0 +1,91 @@
+"""
+Benchmark for the batch fine engine: 1,000,000 borrows through compute_fines.
+
+Generates borrows due over the last 60 days, half of them returned, as the
+ISO timestamps Supabase returns, and times services.fines.compute_fines (the
+engine behind the dashboards, current-books list and returns) against the
+per-row loop it replaced (parse, astimezone, compare calendar dates). Both
+must agree on every borrow; the script exits non-zero if they do not.
+
+    python benchmarks/fines.py                        # 1,000,000 borrows
+    python benchmarks/fines.py --borrows 200000 --grace-days 2
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PLACEHOLDER_ENV = {
+    "SUPABASE_URL": "http://127.0.0.1:9",
+    "SUPABASE_KEY": "eyJhbGciOiJIUzI1NiJ9.e30.placeholder",
+    "SUPABASE_SERVICE_KEY": "eyJhbGciOiJIUzI1NiJ9.e30.placeholder"
+}
+
+
+def _borrows(count: int, as_of: datetime, seed: int):
+    rng = random.Random(seed)
+    start = as_of - timedelta(days=60)
+    span = 70 * 86400
+    due_dates, return_dates = [], []
+    for _ in range(count):
+        due = start + timedelta(seconds=rng.randrange(span))
+        due_dates.append(due.astimezone(timezone.utc).isoformat().replace("+00:00", "Z"))
+        returned = due + timedelta(seconds=rng.randrange(-10 * 86400, 20 * 86400))
+        return_dates.append(returned.astimezone(timezone.utc).isoformat() if rng.random() < 0.5 and returned < as_of else None)
+    return due_dates, return_dates
+
+
+def _per_row(due_dates, return_dates, policy, as_of, tz):
+    # The calculation as the endpoints did it before the engine, one borrow at a time
+    today = as_of.astimezone(tz).date()
+    fines = []
+    for due_value, return_value in zip(due_dates, return_dates):
+        due = datetime.fromisoformat(due_value.replace("Z", "+00:00")).astimezone(tz).date()
+        end = datetime.fromisoformat(return_value.replace("Z", "+00:00")).astimezone(tz).date() if return_value else today
+        days = (end - due).days
+        fines.append(max(days - policy.grace_period_days, 0) * policy.fine_per_day if days > 0 else 0)
+    return fines
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--borrows", type=int, default=1_000_000)
+    parser.add_argument("--grace-days", type=int, default=None, help="default: the configured grace period")
+    parser.add_argument("--seed", type=int, default=26)
+    args = parser.parse_args()
+
+    for key, value in PLACEHOLDER_ENV.items():
+        os.environ.setdefault(key, value)
+    sys.path.insert(0, ROOT)
+    from services.fines import LIBRARY_TZ, FinePolicy, compute_fines
+
+    policy = FinePolicy() if args.grace_days is None else FinePolicy(grace_period_days=args.grace_days)
+    as_of = datetime.now(LIBRARY_TZ)
+    due_dates, return_dates = _borrows(args.borrows, as_of, args.seed)
+
+    started = time.perf_counter()
+    batch = compute_fines(due_dates, return_dates, policy, as_of=as_of)
+    engine_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    expected = _per_row(due_dates, return_dates, policy, as_of, LIBRARY_TZ)
+    per_row_seconds = time.perf_counter() - started
+
+    print(f"{args.borrows} borrows ({policy.fine_per_day}/day after {policy.grace_period_days} grace days): "
+          f"{batch.overdue_count} overdue, {batch.total_fine:,.2f} in fines")
+    print(f"  compute_fines  {engine_seconds:.2f}s  {args.borrows / engine_seconds:,.0f} borrows/s")
+    print(f"  per-row loop   {per_row_seconds:.2f}s  {args.borrows / per_row_seconds:,.0f} borrows/s")
+
+    mismatches = sum(1 for got, want in zip(batch.fines, expected) if got != want)
+    if mismatches:
+        print(f"compute_fines disagrees with the per-row calculation on {mismatches} borrows")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,172 @@
+"""
+Load test for the notification stream: idle SSE connections per GB.
+
+Starts the API in a uvicorn subprocess (the real app and middleware; only the
+JWT check and the initial unread-count query are replaced, so no Supabase
+project is needed), opens N concurrent /api/student/notifications/stream
+connections, waits until every one has received its first event, then
+publishes one broadcast and checks that every connection receives it. Reports
+the server's resident memory per connection and the resulting connections
+per GB (Linux: memory is read from /proc).
+
+    python benchmarks/sse_connections.py                  # 5000 connections
+    python benchmarks/sse_connections.py --connections 10000 --users 2000
+"""
+import argparse
+import asyncio
+import os
+import resource
+import socket
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PLACEHOLDER_ENV = {
+    "SUPABASE_URL": "http://127.0.0.1:9",
+    "SUPABASE_KEY": "eyJhbGciOiJIUzI1NiJ9.e30.placeholder",
+    "SUPABASE_SERVICE_KEY": "eyJhbGciOiJIUzI1NiJ9.e30.placeholder"
+}
+
+# Runs in the server process
+SERVER = """
+import resource, sys
+soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+import uvicorn
+from fastapi import Query
+import api.dependencies as dependencies
+import api.student.router as student_router
+from main import app
+from services.notification_bus import notification_bus
+
+
+async def stream_user(user: str = Query(...)):
+    return {"user_id": user, "role": "student"}
+
+
+def no_database(client, user_id):
+    return 0
+
+
+@app.post("/bench/broadcast")
+async def broadcast():
+    notification_bus.publish_all("notification", {"title": "bench"})
+    return {"connections": notification_bus.connection_count}
+
+
+app.dependency_overrides[dependencies.get_stream_user] = stream_user
+student_router.unread_count = no_database
+uvicorn.run(app, host="127.0.0.1", port=int(sys.argv[1]), log_level="warning", access_log=False, backlog=4096)
+"""
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _rss_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    raise RuntimeError("VmRSS not found")
+
+
+async def _request(port: int, method: str, path: str):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: bench\r\nContent-Length: 0\r\n\r\n".encode())
+    await writer.drain()
+    return reader, writer
+
+
+async def _wait_for(reader, marker: bytes):
+    buffer = b""
+    while marker not in buffer:
+        piece = await reader.read(4096)
+        if not piece:
+            raise ConnectionError("Stream closed")
+        buffer += piece
+
+
+async def run(port: int, server_pid: int, connections: int, users: int, batch: int):
+    # One request first, so the baseline includes the app's lazy setup
+    reader, writer = await _request(port, "GET", "/api/student/notifications/stream?user=warmup")
+    await _wait_for(reader, b"unread_count")
+    writer.close()
+    await asyncio.sleep(0.5)
+    baseline = _rss_mb(server_pid)
+
+    streams = []
+    started = time.monotonic()
+    for start in range(0, connections, batch):
+        opened = await asyncio.gather(*(
+            _request(port, "GET", f"/api/student/notifications/stream?user=student-{n % users}")
+            for n in range(start, min(start + batch, connections))
+        ))
+        await asyncio.gather(*(_wait_for(reader, b"unread_count") for reader, _ in opened))
+        streams.extend(opened)
+    connect_seconds = time.monotonic() - started
+
+    await asyncio.sleep(1)
+    loaded = _rss_mb(server_pid)
+
+    # Every idle connection must still be live and receive a push
+    reader, writer = await _request(port, "POST", "/bench/broadcast")
+    await _wait_for(reader, b"connections")
+    writer.close()
+    started = time.monotonic()
+    await asyncio.gather(*(_wait_for(reader, b"bench") for reader, _ in streams))
+    fan_out_seconds = time.monotonic() - started
+
+    for _, writer in streams:
+        writer.close()
+    return baseline, loaded, connect_seconds, fan_out_seconds
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--connections", type=int, default=5000)
+    parser.add_argument("--users", type=int, default=1000, help="distinct students (several tabs each)")
+    parser.add_argument("--batch", type=int, default=500, help="connections opened at a time")
+    args = parser.parse_args()
+
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    if args.connections + 100 > hard:
+        print(f"Open file limit is {hard}: raise it (ulimit -n) to hold {args.connections} connections")
+        return 1
+
+    port = _free_port()
+    env = {**PLACEHOLDER_ENV, **os.environ, "PYTHONDONTWRITEBYTECODE": "1"}
+    server = subprocess.Popen([sys.executable, "-c", SERVER, str(port)], cwd=ROOT, env=env)
+    try:
+        for _ in range(100):
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+                break
+            except OSError:
+                time.sleep(0.2)
+
+        baseline, loaded, connect_seconds, fan_out_seconds = asyncio.run(
+            run(port, server.pid, args.connections, args.users, args.batch)
+        )
+    finally:
+        server.terminate()
+        server.wait()
+
+    per_connection_kb = (loaded - baseline) * 1024 / args.connections
+    print(f"{args.connections} idle SSE connections ({args.users} students): "
+          f"server RSS {baseline:.0f} MB -> {loaded:.0f} MB")
+    print(f"  {per_connection_kb:.1f} KB per connection, "
+          f"~{1024 * 1024 / per_connection_kb:,.0f} connections per GB")
+    print(f"  connected in {connect_seconds:.1f}s, broadcast reached all in {fan_out_seconds * 1000:.0f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+"""
+Throughput of serve.py by worker count: the same load at workers=1..N.
+
+Starts the real on-prem launcher (serve.py, with WORKERS and API_PORT set and
+placeholder Supabase settings, so no project is needed) once per worker
+count, keeps --connections keep-alive connections busy on --path from
+--load-processes client processes for --seconds, and reports requests per
+second and the speed-up over one worker. The default path needs no database.
+The client shares the machine with the server, so extra workers can only
+help up to the cores the client leaves free.
+
+    python benchmarks/workers.py                          # workers 1..CPU count
+    python benchmarks/workers.py --workers 1,2,4,8 --seconds 20 --connections 256
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PLACEHOLDER_ENV = {
+    "SUPABASE_URL": "http://127.0.0.1:9",
+    "SUPABASE_KEY": "eyJhbGciOiJIUzI1NiJ9.e30.placeholder",
+    "SUPABASE_SERVICE_KEY": "eyJhbGciOiJIUzI1NiJ9.e30.placeholder"
+}
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _connection(port: int, request: bytes, warmup_until: float, stop_at: float, counts: dict):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        while time.monotonic() < stop_at:
+            writer.write(request)
+            head = await reader.readuntil(b"\r\n\r\n")
+            length = 0
+            for line in head.split(b"\r\n")[1:]:
+                name, _, value = line.partition(b":")
+                if name.strip().lower() == b"content-length":
+                    length = int(value)
+            await reader.readexactly(length)
+            if time.monotonic() < warmup_until:
+                continue
+            counts["ok" if head.startswith(b"HTTP/1.1 200") else "errors"] += 1
+    finally:
+        writer.close()
+
+
+def _load(port: int, path: str, connections: int, warmup: float, seconds: float) -> dict:
+    # Runs in a client process: `connections` keep-alive connections, one request at a time each
+    request = f"GET {path} HTTP/1.1\r\nHost: bench\r\n\r\n".encode()
+    counts = {"ok": 0, "errors": 0}
+
+    async def run():
+        warmup_until = time.monotonic() + warmup
+        stop_at = warmup_until + seconds
+        await asyncio.gather(*(
+            _connection(port, request, warmup_until, stop_at, counts) for _ in range(connections)
+        ))
+
+    asyncio.run(run())
+    return counts
+
+
+def _wait_until_up(port: int, path: str, timeout: float = 60) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=1) as sock:
+                sock.sendall(f"GET {path} HTTP/1.1\r\nHost: bench\r\nConnection: close\r\n\r\n".encode())
+                if sock.recv(16).startswith(b"HTTP/1.1 200"):
+                    return True
+        except OSError:
+            pass
+        time.sleep(0.2)
+    return False
+
+
+def measure(workers: int, args) -> dict:
+    port = _free_port()
+    env = {**PLACEHOLDER_ENV, **os.environ, "WORKERS": str(workers), "API_PORT": str(port)}
+    server = subprocess.Popen(
+        [sys.executable, "serve.py"], cwd=ROOT, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        if not _wait_until_up(port, args.path):
+            raise RuntimeError(f"serve.py with {workers} workers did not answer {args.path}")
+        # Give every worker time to import the app, not just the first to answer
+        time.sleep(args.startup)
+
+        processes = args.load_processes
+        per_process = [args.connections // processes + (n < args.connections % processes) for n in range(processes)]
+        with ProcessPoolExecutor(processes) as pool:
+            results = list(pool.map(
+                _load, [port] * processes, [args.path] * processes, per_process,
+                [args.warmup] * processes, [args.seconds] * processes
+            ))
+    finally:
+        server.terminate()
+        server.wait()
+
+    ok = sum(result["ok"] for result in results)
+    errors = sum(result["errors"] for result in results)
+    return {"workers": workers, "rps": ok / args.seconds, "errors": errors}
+
+
+def main() -> int:
+    cpus = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", default=None, help="comma-separated worker counts (default: 1..CPU count)")
+    parser.add_argument("--path", default="/api/health")
+    parser.add_argument("--connections", type=int, default=64)
+    parser.add_argument("--load-processes", type=int, default=max(1, cpus // 4))
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--warmup", type=float, default=2)
+    parser.add_argument("--startup", type=float, default=3, help="seconds to let the workers start")
+    args = parser.parse_args()
+
+    counts = [int(n) for n in args.workers.split(",")] if args.workers else list(range(1, cpus + 1))
+    print(f"GET {args.path}: {args.connections} connections from {args.load_processes} client processes, "
+          f"{args.seconds:.0f}s per run, {cpus} CPUs")
+
+    baseline = None
+    failed = False
+    for workers in counts:
+        result = measure(workers, args)
+        baseline = baseline or result["rps"]
+        print(f"  workers={workers:<3} {result['rps']:>10,.0f} requests/s  "
+              f"x{result['rps'] / baseline if baseline else 0:.2f}" + (f"  {result['errors']} errors" if result["errors"] else ""))
+        failed = failed or result["errors"] > 0 or result["rps"] == 0
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
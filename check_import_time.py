@@ -0,0 +1,93 @@
+"""
+Cold-import budget for the Lambda entry point.
+
+Imports `adapter` in fresh interpreters (what a Lambda cold start does during
+its init phase) and exits non-zero when the median import time exceeds the
+budget, so a CI step can catch a heavy import sneaking back into module scope.
+
+    python check_import_time.py                 # default budget
+    python check_import_time.py --budget-ms 900 --runs 7
+    python check_import_time.py --top 15        # show the slowest modules
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+DEFAULT_BUDGET_MS = 1000
+
+# Dummy values: settings are validated at import, but no client is created
+PLACEHOLDER_ENV = {
+    "SUPABASE_URL": "http://127.0.0.1:9",
+    "SUPABASE_KEY": "eyJhbGciOiJIUzI1NiJ9.e30.placeholder",
+    "SUPABASE_SERVICE_KEY": "eyJhbGciOiJIUzI1NiJ9.e30.placeholder"
+}
+
+MEASURE = (
+    "import time; started = time.perf_counter(); import adapter; "
+    "print((time.perf_counter() - started) * 1000)"
+)
+
+
+def _env() -> dict:
+    env = {**PLACEHOLDER_ENV, **os.environ}
+    env["PYTHONDONTWRITEBYTECODE"] = "1"
+    return env
+
+
+def measure(runs: int) -> list:
+    here = os.path.dirname(os.path.abspath(__file__))
+    timings = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", MEASURE],
+            cwd=here, env=_env(), capture_output=True, text=True, check=True
+        ).stdout
+        timings.append(float(output.strip().splitlines()[-1]))
+    return timings
+
+
+def slowest_modules(limit: int) -> list:
+    """Top-level and first-level imports by cumulative time (python -X importtime)"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import adapter"],
+        cwd=here, env=_env(), capture_output=True, text=True, check=True
+    ).stderr
+
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        if depth <= 2:
+            modules.append((int(cumulative) / 1000, name.strip()))
+    return sorted(modules, reverse=True)[:limit]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--budget-ms", type=float, default=float(os.environ.get("IMPORT_BUDGET_MS", DEFAULT_BUDGET_MS)))
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=0)
+    args = parser.parse_args()
+
+    timings = measure(args.runs)
+    median = statistics.median(timings)
+    print(f"import adapter: median {median:.0f} ms over {args.runs} runs "
+          f"(min {min(timings):.0f}, max {max(timings):.0f}), budget {args.budget_ms:.0f} ms")
+
+    if args.top:
+        for cumulative_ms, name in slowest_modules(args.top):
+            print(f"  {cumulative_ms:8.1f} ms  {name}")
+
+    if median > args.budget_ms:
+        print("Import-time budget exceeded: move the new heavy import into the function that needs it")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
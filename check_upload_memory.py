@@ -0,0 +1,123 @@
+"""
+Peak-memory check for resource uploads.
+
+Pushes a large file (500 MB by default) through the same steps as
+POST /api/resources: the content hash (hash_upload) and the TUS resumable
+upload (upload_resumable). Storage is replaced by an in-process TUS server
+that reads and discards each chunk, so no network or Supabase project is
+needed. Runs in a fresh interpreter and exits non-zero when the process grew
+by more than the memory cap, so a CI step can catch an upload path that
+starts buffering whole files again.
+
+    python check_upload_memory.py                    # 500 MB file, 64 MB cap
+    python check_upload_memory.py --size-mb 2000 --cap-mb 48
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+DEFAULT_SIZE_MB = 500
+DEFAULT_CAP_MB = 64
+
+PLACEHOLDER_ENV = {
+    "SUPABASE_URL": "http://127.0.0.1:9",
+    "SUPABASE_KEY": "eyJhbGciOiJIUzI1NiJ9.e30.placeholder",
+    "SUPABASE_SERVICE_KEY": "eyJhbGciOiJIUzI1NiJ9.e30.placeholder"
+}
+
+# Runs in the child: prints "<bytes stored> <peak growth in KB>"
+MEASURE = """
+import asyncio, resource, sys, tempfile
+import httpx
+from starlette.datastructures import UploadFile
+from services.storage import hash_upload, upload_resumable
+
+size = int(sys.argv[1])
+
+
+class TusServer(httpx.AsyncBaseTransport):
+    # Minimal TUS endpoint: counts the bytes of each PATCH without keeping them
+    def __init__(self):
+        self.offset = 0
+
+    async def handle_async_request(self, request):
+        if request.method == "POST":
+            return httpx.Response(201, headers={"Location": "http://storage.test/upload/1"})
+        if request.method == "HEAD":
+            return httpx.Response(200, headers={"Upload-Offset": str(self.offset)})
+        async for piece in request.stream:
+            self.offset += len(piece)
+        return httpx.Response(204, headers={"Upload-Offset": str(self.offset)})
+
+
+server = TusServer()
+
+
+class Client(httpx.AsyncClient):
+    def __init__(self, **kwargs):
+        super().__init__(transport=server, **kwargs)
+
+
+httpx.AsyncClient = Client
+
+
+async def run():
+    with tempfile.TemporaryFile() as spooled:
+        # Sparse file: reading it does not need the file in memory either
+        spooled.truncate(size)
+        upload = UploadFile(file=spooled, size=size, filename="scan.pdf")
+        await hash_upload(upload)
+        return await upload_resumable("resources", "objects/check/scan.pdf", upload, "application/pdf")
+
+
+def current_rss_kb():
+    # Resident memory now (Linux); ru_maxrss would include the import-time peak
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * resource.getpagesize() // 1024
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+asyncio.run(asyncio.sleep(0))
+baseline = current_rss_kb()
+stored = asyncio.run(run())
+peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(stored, peak - baseline)
+"""
+
+
+def measure(size_bytes: int) -> tuple:
+    here = os.path.dirname(os.path.abspath(__file__))
+    env = {**PLACEHOLDER_ENV, **os.environ, "PYTHONDONTWRITEBYTECODE": "1"}
+    output = subprocess.run(
+        [sys.executable, "-c", MEASURE, str(size_bytes)],
+        cwd=here, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    stored, growth_kb = output.strip().splitlines()[-1].split()
+    return int(stored), int(growth_kb) / 1024
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size-mb", type=int, default=DEFAULT_SIZE_MB)
+    parser.add_argument("--cap-mb", type=float, default=float(os.environ.get("UPLOAD_MEMORY_CAP_MB", DEFAULT_CAP_MB)))
+    args = parser.parse_args()
+
+    size = args.size_mb * 1024 * 1024
+    stored, growth_mb = measure(size)
+    print(f"upload of {args.size_mb} MB: stored {stored} bytes, "
+          f"peak memory growth {growth_mb:.1f} MB, cap {args.cap_mb:.0f} MB")
+
+    if stored != size:
+        print("Upload incomplete: the stored size does not match the file size")
+        return 1
+    if growth_mb > args.cap_mb:
+        print("Upload memory cap exceeded: the upload path is buffering more than one chunk")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
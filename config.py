@@ -17,10 +17,85 @@ class Settings(BaseSettings):
     api_port: int = 8000
     frontend_url: str = "http://localhost:3000"
     
-    # Fine configuration
+    # Fine configuration (defaults used until system_config is loaded)
     fine_per_day: float = 5.0
     grace_period_days: int = 2
     borrow_duration_days: int = 14
+    max_books_per_student: int = 3
+    reminder_days_before_due: int = 3
+    overdue_frequency: str = "daily"
+    
+    # system_config cache
+    config_cache_ttl_seconds: int = 60
+    config_version_check_seconds: int = 5
+    borrow_policy_max_age_seconds: int = 60
+    
+    # Reminder sweep
+    reminder_page_size: int = 1000
+    notification_insert_batch_size: int = 1000
+    reminder_time_margin_ms: int = 10000
+    
+    # Student dashboard cache
+    dashboard_cache_ttl_seconds: int = 5
+    dashboard_cache_max_entries: int = 20000
+    
+    # Notification stream
+    sse_heartbeat_seconds: int = 20
+    
+    # Request coalescing for hot catalogue reads
+    singleflight_ttl_seconds: float = 1.0
+    singleflight_max_entries: int = 5000
+    
+    # Catalogue cache (in-process tier, optional shared Redis-compatible tier)
+    cache_local_ttl_seconds: int = 10
+    cache_local_max_entries: int = 5000
+    cache_local_max_bytes: int = 32 * 1024 * 1024
+    cache_redis_url: Optional[str] = None
+    cache_shared_ttl_seconds: int = 120
+    
+    # Warm-up (clients, connections, config, catalogue cache) before the first request
+    warmup_on_start: bool = False
+    
+    # Directory (on tmpfs) for snapshots shared by worker processes; set by serve.py
+    shared_cache_dir: Optional[str] = None
+    workers: int = 0
+    
+    # Resource uploads (streamed to Supabase Storage with TUS; Supabase requires
+    # every chunk except the last to be exactly 6 MB)
+    storage_upload_chunk_bytes: int = 6 * 1024 * 1024
+    storage_upload_max_retries: int = 3
+    storage_upload_timeout_seconds: int = 60
+    log_body_max_bytes: int = 16 * 1024
+    
+    # Resource content search (PDF text extracted in a background process pool;
+    # 0 workers extracts in a thread, as on Lambda)
+    text_extraction_workers: int = 2
+    text_extraction_max_bytes: int = 50 * 1024 * 1024
+    resource_text_max_chars: int = 200000
+    
+    # Resource downloads: 0 redirects to the public URL, otherwise to a URL
+    # signed for this many seconds; download counts are written in batches
+    # (on Lambda, by the invocation that served the download)
+    resource_signed_url_seconds: int = 0
+    download_redirect_max_age_seconds: int = 300
+    download_count_flush_seconds: int = 30
+    download_count_max_pending: int = 500
+    
+    # Bulk book import: validated rows per import_books RPC call
+    book_import_chunk_size: int = 1000
+    
+    # Bulk RFID copy registration
+    bulk_copies_chunk_size: int = 1000
+    bulk_copies_max_tags: int = 50000
+    
+    # RFID stocktake: tags per stocktake_scan RPC call
+    stocktake_batch_size: int = 2000
+    
+    # Roster import: concurrent auth user creations, profiles per import_student_profiles call,
+    # rows per request (auth users are created one API call each; keep a request under the 30 s timeout)
+    student_import_concurrency: int = 8
+    student_import_chunk_size: int = 500
+    student_import_max_rows: int = 1000
     
     class Config:
         env_file = ".env"
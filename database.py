@@ -1,24 +1,40 @@
-from supabase import create_client, Client
+from typing import TYPE_CHECKING, Optional
 from config import settings
+import threading
 
+if TYPE_CHECKING:
+    from supabase import Client
 
-# Initialize Supabase client
-supabase: Client = create_client(settings.supabase_url, settings.supabase_key)
 
+# Clients are created on first use: importing supabase and building a client is
+# the largest part of a cold start, and not every invocation needs both clients
+_supabase: Optional["Client"] = None
+_service_client: Optional["Client"] = None
+_lock = threading.Lock()
 
-def get_supabase_client() -> Client:
-    """Get Supabase client instance"""
-    return supabase
+
+def _create_client(key: str) -> "Client":
+    from supabase import create_client
+    return create_client(settings.supabase_url, key)
 
 
-# Service client with admin privileges (if service key is provided)
-service_client: Client = None
-if settings.supabase_service_key:
-    service_client = create_client(settings.supabase_url, settings.supabase_service_key)
+def get_supabase_client() -> "Client":
+    """Get Supabase client instance"""
+    global _supabase
+    if _supabase is None:
+        with _lock:
+            if _supabase is None:
+                _supabase = _create_client(settings.supabase_key)
+    return _supabase
 
 
-def get_service_client() -> Client:
+def get_service_client() -> "Client":
     """Get Supabase service client with admin privileges"""
-    if not service_client:
+    global _service_client
+    if not settings.supabase_service_key:
         raise ValueError("Service key not configured")
-    return service_client
+    if _service_client is None:
+        with _lock:
+            if _service_client is None:
+                _service_client = _create_client(settings.supabase_service_key)
+    return _service_client
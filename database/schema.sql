@@ -115,6 +115,9 @@ CREATE TABLE IF NOT EXISTS public.resources (
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
+-- Storage object path in the resources bucket (uploads, finalize, delete)
+ALTER TABLE public.resources ADD COLUMN IF NOT EXISTS file_path TEXT;
+
 -- ============================================
 -- AVAILABILITY SUBSCRIPTIONS TABLE
 -- ============================================
@@ -138,6 +141,36 @@ CREATE TABLE IF NOT EXISTS public.system_config (
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
+-- ============================================
+-- BROADCASTS TABLE
+-- ============================================
+-- One row per admin broadcast; students see them at read time
+CREATE TABLE IF NOT EXISTS public.broadcasts (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    type TEXT NOT NULL DEFAULT 'announcement' CHECK (type IN ('due_soon', 'overdue', 'availability', 'announcement', 'system')),
+    title TEXT NOT NULL,
+    message TEXT NOT NULL,
+    created_by UUID REFERENCES public.user_profiles(id) ON DELETE SET NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- Per-user read markers for broadcasts
+CREATE TABLE IF NOT EXISTS public.broadcast_reads (
+    broadcast_id UUID NOT NULL REFERENCES public.broadcasts(id) ON DELETE CASCADE,
+    user_id UUID NOT NULL REFERENCES public.user_profiles(id) ON DELETE CASCADE,
+    read_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (broadcast_id, user_id)
+);
+
+-- Unread personal notifications per user, maintained by triggers, and the
+-- user's broadcast read watermark: broadcasts created at or before
+-- broadcasts_read_at are read; newer ones are read if they have a marker
+CREATE TABLE IF NOT EXISTS public.notification_counters (
+    user_id UUID PRIMARY KEY REFERENCES public.user_profiles(id) ON DELETE CASCADE,
+    unread_count INTEGER NOT NULL DEFAULT 0
+);
+ALTER TABLE public.notification_counters ADD COLUMN IF NOT EXISTS broadcasts_read_at TIMESTAMP WITH TIME ZONE;
+
 -- ============================================
 -- PROFILE EDIT REQUESTS TABLE
 -- ============================================
@@ -166,6 +199,7 @@ CREATE INDEX IF NOT EXISTS idx_books_title ON public.books(title);
 CREATE INDEX IF NOT EXISTS idx_books_author ON public.books(author);
 CREATE INDEX IF NOT EXISTS idx_books_subject ON public.books(subject);
 CREATE INDEX IF NOT EXISTS idx_books_category ON public.books(category);
+CREATE INDEX IF NOT EXISTS idx_books_isbn ON public.books(isbn);
 
 -- Book copies indexes
 CREATE INDEX IF NOT EXISTS idx_book_copies_book_id ON public.book_copies(book_id);
@@ -178,16 +212,33 @@ CREATE INDEX IF NOT EXISTS idx_borrows_book_id ON public.borrows(book_id);
 CREATE INDEX IF NOT EXISTS idx_borrows_status ON public.borrows(status);
 CREATE INDEX IF NOT EXISTS idx_borrows_due_date ON public.borrows(due_date);
 CREATE INDEX IF NOT EXISTS idx_borrows_return_date ON public.borrows(return_date);
+-- Reminder sweep: range scan over active borrows ordered by (due_date, id)
+CREATE INDEX IF NOT EXISTS idx_borrows_active_due_date ON public.borrows(due_date, id)
+    WHERE status IN ('borrowed', 'overdue');
 
 -- Notifications indexes
 CREATE INDEX IF NOT EXISTS idx_notifications_user_id ON public.notifications(user_id);
 CREATE INDEX IF NOT EXISTS idx_notifications_is_read ON public.notifications(is_read);
 CREATE INDEX IF NOT EXISTS idx_notifications_type ON public.notifications(type);
+CREATE INDEX IF NOT EXISTS idx_notifications_user_unread ON public.notifications(user_id)
+    WHERE is_read = false;
+-- Reminder deduplication
+CREATE INDEX IF NOT EXISTS idx_notifications_related_borrow ON public.notifications(related_borrow_id, type, created_at)
+    WHERE related_borrow_id IS NOT NULL;
+
+-- Availability subscriptions: waiting subscribers per book
+CREATE INDEX IF NOT EXISTS idx_availability_subscriptions_waiting ON public.availability_subscriptions(book_id, id)
+    WHERE notified = false;
+
+-- Broadcasts indexes
+CREATE INDEX IF NOT EXISTS idx_broadcasts_created_at ON public.broadcasts(created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_broadcast_reads_user_id ON public.broadcast_reads(user_id);
 
 -- Resources indexes
 CREATE INDEX IF NOT EXISTS idx_resources_subject ON public.resources(subject);
 CREATE INDEX IF NOT EXISTS idx_resources_semester ON public.resources(semester);
 CREATE INDEX IF NOT EXISTS idx_resources_type ON public.resources(type);
+CREATE INDEX IF NOT EXISTS idx_resources_file_path ON public.resources(file_path);
 
 -- ============================================
 -- ROW LEVEL SECURITY (RLS) POLICIES
@@ -203,6 +254,9 @@ ALTER TABLE public.fines ENABLE ROW LEVEL SECURITY;
 ALTER TABLE public.resources ENABLE ROW LEVEL SECURITY;
 ALTER TABLE public.availability_subscriptions ENABLE ROW LEVEL SECURITY;
 ALTER TABLE public.system_config ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.broadcasts ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.broadcast_reads ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.notification_counters ENABLE ROW LEVEL SECURITY;
 
 -- Helper function to check if user is admin (bypasses RLS to avoid recursion)
 CREATE OR REPLACE FUNCTION public.is_admin()
@@ -296,6 +350,19 @@ CREATE POLICY "Admins can manage system config" ON public.system_config
 CREATE POLICY "Admins can manage system config" ON public.system_config
     FOR ALL USING (is_admin());
 
+-- Broadcasts Policies
+CREATE POLICY "Authenticated users can view broadcasts" ON public.broadcasts
+    FOR SELECT USING (auth.uid() IS NOT NULL);
+
+CREATE POLICY "Admins can manage broadcasts" ON public.broadcasts
+    FOR ALL USING (is_admin());
+
+CREATE POLICY "Users can manage their own broadcast reads" ON public.broadcast_reads
+    FOR ALL USING (auth.uid() = user_id);
+
+CREATE POLICY "Users can view their own notification counter" ON public.notification_counters
+    FOR SELECT USING (auth.uid() = user_id);
+
 -- Profile Requests Policies
 CREATE POLICY "Users can view their own requests" ON public.profile_requests
     FOR SELECT USING (auth.uid() = user_id);
@@ -338,6 +405,839 @@ CREATE TRIGGER update_fines_updated_at BEFORE UPDATE ON public.fines
 CREATE TRIGGER update_resources_updated_at BEFORE UPDATE ON public.resources
     FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 
+-- ============================================
+-- NOTIFICATION UNREAD COUNTERS
+-- ============================================
+
+-- Statement-level triggers: a batch insert of N notifications costs one counter upsert per user
+CREATE OR REPLACE FUNCTION public.notification_counters_on_insert()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO public.notification_counters (user_id, unread_count)
+    SELECT user_id, COUNT(*) FROM new_rows WHERE NOT COALESCE(is_read, FALSE) GROUP BY user_id
+    ON CONFLICT (user_id) DO UPDATE
+        SET unread_count = public.notification_counters.unread_count + EXCLUDED.unread_count;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION public.notification_counters_on_update()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO public.notification_counters (user_id, unread_count)
+    SELECT user_id, SUM(delta) FROM (
+        SELECT user_id, -1 AS delta FROM old_rows WHERE NOT COALESCE(is_read, FALSE)
+        UNION ALL
+        SELECT user_id, 1 AS delta FROM new_rows WHERE NOT COALESCE(is_read, FALSE)
+    ) changes
+    GROUP BY user_id
+    HAVING SUM(delta) <> 0
+    ON CONFLICT (user_id) DO UPDATE
+        SET unread_count = GREATEST(public.notification_counters.unread_count + EXCLUDED.unread_count, 0);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION public.notification_counters_on_delete()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE public.notification_counters c
+    SET unread_count = GREATEST(c.unread_count - d.removed, 0)
+    FROM (
+        SELECT user_id, COUNT(*) AS removed FROM old_rows WHERE NOT COALESCE(is_read, FALSE) GROUP BY user_id
+    ) d
+    WHERE c.user_id = d.user_id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS notifications_counter_insert ON public.notifications;
+CREATE TRIGGER notifications_counter_insert AFTER INSERT ON public.notifications
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.notification_counters_on_insert();
+
+DROP TRIGGER IF EXISTS notifications_counter_update ON public.notifications;
+CREATE TRIGGER notifications_counter_update AFTER UPDATE ON public.notifications
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.notification_counters_on_update();
+
+DROP TRIGGER IF EXISTS notifications_counter_delete ON public.notifications;
+CREATE TRIGGER notifications_counter_delete AFTER DELETE ON public.notifications
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.notification_counters_on_delete();
+
+-- Every profile gets its counter row when it is created (sign-up, roster
+-- import): broadcasts sent before the account existed count as read
+CREATE OR REPLACE FUNCTION public.notification_counters_on_profile_insert()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO public.notification_counters (user_id, unread_count, broadcasts_read_at)
+    SELECT id, 0, COALESCE(created_at, NOW()) FROM new_rows
+    ON CONFLICT (user_id) DO UPDATE
+        SET broadcasts_read_at = COALESCE(public.notification_counters.broadcasts_read_at, EXCLUDED.broadcasts_read_at);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+DROP TRIGGER IF EXISTS user_profiles_notification_counter ON public.user_profiles;
+CREATE TRIGGER user_profiles_notification_counter AFTER INSERT ON public.user_profiles
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.notification_counters_on_profile_insert();
+
+-- Backfill / repair counters from the partial unread index; a missing
+-- watermark starts at the account's creation
+INSERT INTO public.notification_counters (user_id, unread_count, broadcasts_read_at)
+SELECT p.id, COUNT(n.id), COALESCE(p.created_at, NOW())
+FROM public.user_profiles p
+LEFT JOIN public.notifications n ON n.user_id = p.id AND n.is_read = FALSE
+GROUP BY p.id
+ON CONFLICT (user_id) DO UPDATE
+    SET unread_count = EXCLUDED.unread_count,
+        broadcasts_read_at = COALESCE(public.notification_counters.broadcasts_read_at, EXCLUDED.broadcasts_read_at);
+
+-- Unread personal notifications (counter) plus broadcasts newer than the
+-- user's watermark without a read marker. The watermark starts at the
+-- account's creation and moves with "mark all read", so only broadcasts since
+-- then are looked at (a range of idx_broadcasts_created_at), never the table
+CREATE OR REPLACE FUNCTION public.unread_notification_count(p_user_id UUID)
+RETURNS INTEGER AS $$
+    SELECT COALESCE(c.unread_count, 0)
+         + (SELECT COUNT(*)::INTEGER FROM public.broadcasts b
+            WHERE b.created_at > COALESCE(c.broadcasts_read_at, p.created_at, 'infinity')
+              AND NOT EXISTS (
+                  SELECT 1 FROM public.broadcast_reads r
+                  WHERE r.broadcast_id = b.id AND r.user_id = p_user_id
+              ))
+    FROM (SELECT p_user_id AS user_id) u
+    LEFT JOIN public.user_profiles p ON p.id = u.user_id
+    LEFT JOIN public.notification_counters c ON c.user_id = u.user_id;
+$$ LANGUAGE sql STABLE;
+
+-- Newest broadcasts with this user's read state
+CREATE OR REPLACE FUNCTION public.student_broadcasts(p_user_id UUID, p_limit INTEGER DEFAULT 50)
+RETURNS JSON AS $$
+    SELECT COALESCE(json_agg(row_to_json(feed) ORDER BY feed.created_at DESC), '[]'::json)
+    FROM (
+        SELECT b.id, b.type, b.title, b.message, b.created_at,
+               b.created_at <= COALESCE(c.broadcasts_read_at, p.created_at)
+                   OR EXISTS (
+                       SELECT 1 FROM public.broadcast_reads r
+                       WHERE r.broadcast_id = b.id AND r.user_id = p_user_id
+                   ) AS is_read
+        FROM public.broadcasts b
+        JOIN public.user_profiles p ON p.id = p_user_id
+        LEFT JOIN public.notification_counters c ON c.user_id = p_user_id
+        -- Only broadcasts sent since the account was created
+        WHERE b.created_at >= p.created_at
+        ORDER BY b.created_at DESC
+        LIMIT p_limit
+    ) feed;
+$$ LANGUAGE sql STABLE;
+
+-- Mark specific notifications/broadcasts read; ownership is part of the UPDATE predicate.
+-- Broadcasts already under the user's watermark need no marker.
+CREATE OR REPLACE FUNCTION public.mark_notifications_read(p_user_id UUID, p_ids UUID[])
+RETURNS JSON AS $$
+DECLARE
+    matched INTEGER;
+BEGIN
+    UPDATE public.notifications SET is_read = TRUE
+    WHERE user_id = p_user_id AND id = ANY(p_ids) AND is_read = FALSE;
+
+    INSERT INTO public.broadcast_reads (broadcast_id, user_id)
+    SELECT b.id, p_user_id
+    FROM public.broadcasts b
+    LEFT JOIN public.user_profiles p ON p.id = p_user_id
+    LEFT JOIN public.notification_counters c ON c.user_id = p_user_id
+    WHERE b.id = ANY(p_ids) AND b.created_at > COALESCE(c.broadcasts_read_at, p.created_at, 'infinity')
+    ON CONFLICT DO NOTHING;
+
+    SELECT (SELECT COUNT(*) FROM public.notifications WHERE user_id = p_user_id AND id = ANY(p_ids))
+         + (SELECT COUNT(*) FROM public.broadcasts WHERE id = ANY(p_ids))
+    INTO matched;
+
+    RETURN json_build_object('matched', matched, 'unread_count', public.unread_notification_count(p_user_id));
+END;
+$$ LANGUAGE plpgsql;
+
+-- Mark everything read for one user: one counter row update moves the
+-- broadcast watermark, instead of a read marker per broadcast
+CREATE OR REPLACE FUNCTION public.mark_all_notifications_read(p_user_id UUID)
+RETURNS JSON AS $$
+DECLARE
+    v_latest TIMESTAMP WITH TIME ZONE;
+BEGIN
+    UPDATE public.notifications SET is_read = TRUE
+    WHERE user_id = p_user_id AND is_read = FALSE;
+
+    SELECT MAX(created_at) INTO v_latest FROM public.broadcasts;
+
+    IF v_latest IS NOT NULL THEN
+        INSERT INTO public.notification_counters (user_id, unread_count, broadcasts_read_at)
+        VALUES (p_user_id, 0, v_latest)
+        ON CONFLICT (user_id) DO UPDATE
+            SET broadcasts_read_at = GREATEST(public.notification_counters.broadcasts_read_at, EXCLUDED.broadcasts_read_at);
+
+        -- Markers under the watermark are no longer needed
+        DELETE FROM public.broadcast_reads r
+        USING public.broadcasts b
+        WHERE r.user_id = p_user_id AND b.id = r.broadcast_id AND b.created_at <= v_latest;
+    END IF;
+
+    RETURN json_build_object('unread_count', public.unread_notification_count(p_user_id));
+END;
+$$ LANGUAGE plpgsql;
+
+-- These take a user id argument, so only the backend (service role) may call them
+REVOKE EXECUTE ON FUNCTION public.unread_notification_count(UUID) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION public.student_broadcasts(UUID, INTEGER) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION public.mark_notifications_read(UUID, UUID[]) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION public.mark_all_notifications_read(UUID) FROM PUBLIC, anon, authenticated;
+
+-- ============================================
+-- STUDENT DASHBOARD
+-- ============================================
+
+-- Everything the dashboard needs in one round trip; fines are computed by the API's fine engine
+CREATE OR REPLACE FUNCTION public.student_dashboard_inputs(p_user_id UUID)
+RETURNS JSON AS $$
+    SELECT json_build_object(
+        'due_dates', COALESCE((
+            SELECT json_agg(b.due_date ORDER BY b.due_date)
+            FROM public.borrows b
+            WHERE b.user_id = p_user_id AND b.status = 'borrowed'
+        ), '[]'::json),
+        'pending_fines', COALESCE((
+            SELECT SUM(f.amount)
+            FROM public.fines f
+            WHERE f.user_id = p_user_id AND f.status = 'pending'
+        ), 0)
+    );
+$$ LANGUAGE sql STABLE;
+
+REVOKE EXECUTE ON FUNCTION public.student_dashboard_inputs(UUID) FROM PUBLIC, anon, authenticated;
+
+-- ============================================
+-- CONTENT-ADDRESSED RESOURCE FILES
+-- ============================================
+-- A file uploaded more than once (same SHA-256) is stored once; every resource
+-- row keeps a reference and the object goes when the last one is deleted
+ALTER TABLE public.resources ADD COLUMN IF NOT EXISTS content_hash TEXT;
+CREATE INDEX IF NOT EXISTS idx_resources_content_hash ON public.resources(content_hash);
+
+CREATE TABLE IF NOT EXISTS public.resource_objects (
+    content_hash TEXT PRIMARY KEY,
+    file_path TEXT NOT NULL,
+    file_url TEXT NOT NULL,
+    file_size BIGINT,
+    ref_count INTEGER NOT NULL DEFAULT 0 CHECK (ref_count >= 0),
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- 'pending' until the first uploader's bytes are in Storage
+ALTER TABLE public.resource_objects ADD COLUMN IF NOT EXISTS status TEXT NOT NULL DEFAULT 'ready'
+    CHECK (status IN ('pending', 'ready'));
+
+-- Only the backend (service role) reads or writes it
+ALTER TABLE public.resource_objects ENABLE ROW LEVEL SECURITY;
+
+-- Take a reference, registering the object as pending if it is new
+-- (created = the caller uploads it, ready = the file is already stored)
+CREATE OR REPLACE FUNCTION public.acquire_resource_object(
+    p_content_hash TEXT, p_file_path TEXT, p_file_url TEXT, p_file_size BIGINT
+)
+RETURNS JSON AS $$
+DECLARE
+    v_path TEXT;
+    v_url TEXT;
+    v_size BIGINT;
+    v_created BOOLEAN;
+    v_ready BOOLEAN;
+BEGIN
+    INSERT INTO public.resource_objects (content_hash, file_path, file_url, file_size, ref_count, status)
+    VALUES (p_content_hash, p_file_path, p_file_url, p_file_size, 1, 'pending')
+    ON CONFLICT (content_hash) DO UPDATE
+        SET ref_count = public.resource_objects.ref_count + 1
+    RETURNING file_path, file_url, file_size, (xmax = 0), status = 'ready'
+    INTO v_path, v_url, v_size, v_created, v_ready;
+
+    RETURN json_build_object(
+        'file_path', v_path, 'file_url', v_url, 'file_size', v_size,
+        'created', v_created, 'ready', v_ready
+    );
+END;
+$$ LANGUAGE plpgsql;
+
+-- The object's file is in Storage: later uploaders link to it without checking
+CREATE OR REPLACE FUNCTION public.mark_resource_object_ready(p_content_hash TEXT)
+RETURNS VOID AS $$
+    UPDATE public.resource_objects SET status = 'ready' WHERE content_hash = p_content_hash;
+$$ LANGUAGE sql;
+
+-- Drop a reference; at zero the row goes and the caller deletes the file
+CREATE OR REPLACE FUNCTION public.release_resource_object(p_content_hash TEXT)
+RETURNS JSON AS $$
+DECLARE
+    v_path TEXT;
+    v_left INTEGER;
+BEGIN
+    UPDATE public.resource_objects
+    SET ref_count = GREATEST(ref_count - 1, 0)
+    WHERE content_hash = p_content_hash
+    RETURNING file_path, ref_count INTO v_path, v_left;
+
+    IF NOT FOUND THEN
+        RETURN NULL;
+    END IF;
+
+    IF v_left = 0 THEN
+        DELETE FROM public.resource_objects WHERE content_hash = p_content_hash;
+    END IF;
+
+    RETURN json_build_object('file_path', v_path, 'ref_count', v_left);
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION public.resource_storage_stats()
+RETURNS JSON AS $$
+    SELECT json_build_object(
+        'objects', COUNT(*),
+        'references', COALESCE(SUM(ref_count), 0),
+        'stored_bytes', COALESCE(SUM(file_size), 0),
+        'referenced_bytes', COALESCE(SUM(file_size * ref_count), 0),
+        'saved_bytes', COALESCE(SUM(file_size * GREATEST(ref_count - 1, 0)), 0)
+    )
+    FROM public.resource_objects;
+$$ LANGUAGE sql STABLE;
+
+REVOKE EXECUTE ON FUNCTION public.acquire_resource_object(TEXT, TEXT, TEXT, BIGINT) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION public.mark_resource_object_ready(TEXT) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION public.release_resource_object(TEXT) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION public.resource_storage_stats() FROM PUBLIC, anon, authenticated;
+
+-- ============================================
+-- RESOURCE CONTENT SEARCH
+-- ============================================
+-- Text extracted from uploaded PDFs by the API's background indexer
+CREATE TABLE IF NOT EXISTS public.resource_texts (
+    resource_id UUID PRIMARY KEY REFERENCES public.resources(id) ON DELETE CASCADE,
+    content_hash TEXT,
+    content TEXT NOT NULL DEFAULT '',
+    search TSVECTOR GENERATED ALWAYS AS (to_tsvector('english', content)) STORED,
+    indexed_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_resource_texts_search ON public.resource_texts USING GIN (search);
+CREATE INDEX IF NOT EXISTS idx_resource_texts_content_hash ON public.resource_texts(content_hash);
+
+-- Only the backend (service role) reads or writes it
+ALTER TABLE public.resource_texts ENABLE ROW LEVEL SECURITY;
+
+-- PDF resources not indexed yet (incremental backfill)
+CREATE OR REPLACE FUNCTION public.resources_pending_text(p_limit INTEGER DEFAULT 500)
+RETURNS SETOF public.resources AS $$
+    SELECT r.*
+    FROM public.resources r
+    WHERE lower(r.file_path) LIKE '%.pdf'
+      AND NOT EXISTS (SELECT 1 FROM public.resource_texts t WHERE t.resource_id = r.id)
+    ORDER BY r.created_at
+    LIMIT p_limit;
+$$ LANGUAGE sql STABLE;
+
+-- Ranked content search with a highlighted snippet; filters match list_resources
+CREATE OR REPLACE FUNCTION public.search_resource_contents(
+    p_query TEXT,
+    p_title TEXT DEFAULT NULL,
+    p_subject TEXT DEFAULT NULL,
+    p_semester INTEGER DEFAULT NULL,
+    p_year INTEGER DEFAULT NULL,
+    p_type TEXT DEFAULT NULL,
+    p_limit INTEGER DEFAULT 20
+)
+RETURNS JSON AS $$
+    WITH q AS (
+        SELECT websearch_to_tsquery('english', p_query) AS query
+    ),
+    hits AS (
+        SELECT r.*, t.content, ts_rank_cd(t.search, q.query) AS rank
+        FROM q, public.resource_texts t
+        JOIN public.resources r ON r.id = t.resource_id
+        WHERE t.search @@ q.query
+          AND (p_title IS NULL OR r.title ILIKE '%' || p_title || '%')
+          AND (p_subject IS NULL OR r.subject ILIKE '%' || p_subject || '%')
+          AND (p_semester IS NULL OR r.semester = p_semester)
+          AND (p_year IS NULL OR r.year = p_year)
+          AND (p_type IS NULL OR r.type = p_type)
+        ORDER BY rank DESC
+        LIMIT p_limit
+    )
+    -- Snippets are built for the returned rows only
+    SELECT COALESCE(json_agg(
+        (to_jsonb(h) - 'content') || jsonb_build_object(
+            'snippet', ts_headline('english', h.content, q.query, 'MaxFragments=2, MinWords=5, MaxWords=20')
+        )
+        ORDER BY h.rank DESC
+    ), '[]'::json)
+    FROM hits h, q;
+$$ LANGUAGE sql STABLE;
+
+REVOKE EXECUTE ON FUNCTION public.resources_pending_text(INTEGER) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION public.search_resource_contents(TEXT, TEXT, TEXT, INTEGER, INTEGER, TEXT, INTEGER) FROM PUBLIC, anon, authenticated;
+
+-- ============================================
+-- RESOURCE DOWNLOAD COUNTS
+-- ============================================
+ALTER TABLE public.resources ADD COLUMN IF NOT EXISTS download_count BIGINT NOT NULL DEFAULT 0;
+
+-- Counts buffered by the API, applied in one statement per flush
+CREATE OR REPLACE FUNCTION public.increment_resource_downloads(p_ids UUID[], p_counts INTEGER[])
+RETURNS VOID AS $$
+    UPDATE public.resources r
+    SET download_count = r.download_count + c.downloads
+    FROM unnest(p_ids, p_counts) AS c(resource_id, downloads)
+    WHERE r.id = c.resource_id;
+$$ LANGUAGE sql;
+
+REVOKE EXECUTE ON FUNCTION public.increment_resource_downloads(UUID[], INTEGER[]) FROM PUBLIC, anon, authenticated;
+
+-- ============================================
+-- BULK BOOK IMPORT
+-- ============================================
+-- One chunk of validated import rows: books with a known ISBN are updated
+-- (available copies follow the change in total copies), the rest inserted.
+-- Columns a row leaves out keep their current value (or the default on insert).
+-- Returns one {row, id, status, restocked} entry per input row.
+CREATE OR REPLACE FUNCTION public.import_books(p_rows JSONB)
+RETURNS JSON AS $$
+DECLARE
+    result JSON;
+BEGIN
+    -- Concurrent imports of the same ISBN would otherwise both insert it
+    PERFORM pg_advisory_xact_lock(hashtext('public.import_books'));
+
+    WITH input AS MATERIALIZED (
+        SELECT uuid_generate_v4() AS new_id, r.*
+        FROM jsonb_to_recordset(p_rows) AS r(
+            row_no INTEGER, title TEXT, author TEXT, isbn TEXT, subject TEXT, category TEXT,
+            department TEXT, semester INTEGER, total_copies INTEGER, description TEXT
+        )
+    ),
+    updated AS (
+        UPDATE public.books b
+        SET title = COALESCE(i.title, old.title),
+            author = COALESCE(i.author, old.author),
+            subject = COALESCE(i.subject, old.subject),
+            category = COALESCE(i.category, old.category),
+            department = COALESCE(i.department, old.department),
+            semester = COALESCE(i.semester, old.semester),
+            description = COALESCE(i.description, old.description),
+            total_copies = COALESCE(i.total_copies, old.total_copies),
+            available_copies = GREATEST(old.available_copies + COALESCE(i.total_copies, old.total_copies) - old.total_copies, 0)
+        FROM input i, public.books old
+        WHERE i.isbn IS NOT NULL AND b.isbn = i.isbn AND old.id = b.id
+        RETURNING i.row_no, b.id, old.available_copies = 0 AND b.available_copies > 0 AS restocked
+    ),
+    inserted AS (
+        INSERT INTO public.books (
+            id, title, author, isbn, subject, category, department, semester,
+            total_copies, available_copies, description
+        )
+        SELECT i.new_id, i.title, i.author, i.isbn, i.subject, i.category, i.department, i.semester,
+               COALESCE(i.total_copies, 1), COALESCE(i.total_copies, 1), i.description
+        FROM input i
+        WHERE i.isbn IS NULL OR NOT EXISTS (SELECT 1 FROM public.books b WHERE b.isbn = i.isbn)
+        RETURNING id
+    )
+    SELECT COALESCE(json_agg(entry ORDER BY (entry->>'row')::INTEGER), '[]'::json) INTO result
+    FROM (
+        SELECT json_build_object('row', u.row_no, 'id', u.id, 'status', 'updated', 'restocked', u.restocked) AS entry
+        FROM updated u
+        UNION ALL
+        SELECT json_build_object('row', i.row_no, 'id', i.new_id, 'status', 'created', 'restocked', FALSE)
+        FROM inserted n JOIN input i ON i.new_id = n.id
+    ) entries;
+
+    RETURN result;
+END;
+$$ LANGUAGE plpgsql;
+
+REVOKE EXECUTE ON FUNCTION public.import_books(JSONB) FROM PUBLIC, anon, authenticated;
+
+-- ============================================
+-- BULK RFID COPY REGISTRATION
+-- ============================================
+-- One chunk of (book_id, rfid_uid) pairs: a single INSERT skips tags that are
+-- already registered (unique rfid_uid) and one UPDATE adds the new copies to
+-- their books' counts. Returns per-book counts, duplicate tags, unknown books
+-- and books that went from no available copy to some.
+CREATE OR REPLACE FUNCTION public.register_book_copies(p_copies JSONB, p_update_counts BOOLEAN DEFAULT TRUE)
+RETURNS JSON AS $$
+DECLARE
+    result JSON;
+BEGIN
+    WITH input AS MATERIALIZED (
+        SELECT c.book_id, c.rfid_uid
+        FROM jsonb_to_recordset(p_copies) AS c(book_id UUID, rfid_uid TEXT)
+    ),
+    inserted AS (
+        INSERT INTO public.book_copies (book_id, rfid_uid)
+        SELECT i.book_id, i.rfid_uid
+        FROM input i
+        WHERE EXISTS (SELECT 1 FROM public.books b WHERE b.id = i.book_id)
+        ON CONFLICT (rfid_uid) DO NOTHING
+        RETURNING book_id, rfid_uid
+    ),
+    added AS (
+        SELECT book_id, COUNT(*)::INTEGER AS added FROM inserted GROUP BY book_id
+    ),
+    counted AS (
+        UPDATE public.books b
+        SET total_copies = b.total_copies + a.added,
+            available_copies = b.available_copies + a.added
+        FROM added a
+        WHERE p_update_counts AND b.id = a.book_id
+        RETURNING b.id, b.available_copies = a.added AS restocked
+    )
+    SELECT json_build_object(
+        'added', COALESCE((SELECT json_agg(json_build_object('book_id', a.book_id, 'added', a.added)) FROM added a), '[]'::json),
+        'duplicates', COALESCE((
+            SELECT json_agg(i.rfid_uid)
+            FROM input i
+            WHERE EXISTS (SELECT 1 FROM public.books b WHERE b.id = i.book_id)
+              AND NOT EXISTS (SELECT 1 FROM inserted n WHERE n.rfid_uid = i.rfid_uid)
+        ), '[]'::json),
+        'unknown_books', COALESCE((
+            SELECT json_agg(DISTINCT i.book_id)
+            FROM input i
+            WHERE NOT EXISTS (SELECT 1 FROM public.books b WHERE b.id = i.book_id)
+        ), '[]'::json),
+        'restocked', COALESCE((SELECT json_agg(c.id) FROM counted c WHERE c.restocked), '[]'::json)
+    ) INTO result;
+
+    RETURN result;
+END;
+$$ LANGUAGE plpgsql;
+
+REVOKE EXECUTE ON FUNCTION public.register_book_copies(JSONB, BOOLEAN) FROM PUBLIC, anon, authenticated;
+
+-- ============================================
+-- RFID STOCKTAKE
+-- ============================================
+-- Dense number per copy, so a stocktake can keep the copies it has seen as a bitmap
+ALTER TABLE public.book_copies ADD COLUMN IF NOT EXISTS ordinal BIGINT GENERATED ALWAYS AS IDENTITY;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_book_copies_ordinal ON public.book_copies(ordinal);
+CREATE INDEX IF NOT EXISTS idx_borrows_book_copy_id ON public.borrows(book_copy_id);
+
+-- A stocktake session; scope (department/category/subject) is the shelf area
+-- being audited. seen holds bit <ordinal> for every copy scanned.
+CREATE TABLE IF NOT EXISTS public.stocktake_sessions (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    name TEXT NOT NULL,
+    department TEXT,
+    category TEXT,
+    subject TEXT,
+    status TEXT NOT NULL DEFAULT 'open' CHECK (status IN ('open', 'closing', 'closed')),
+    seen BYTEA NOT NULL DEFAULT ''::BYTEA,
+    seen_count INTEGER NOT NULL DEFAULT 0,
+    scan_count INTEGER NOT NULL DEFAULT 0,
+    report JSONB,
+    created_by UUID REFERENCES public.user_profiles(id) ON DELETE SET NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    closed_at TIMESTAMP WITH TIME ZONE
+);
+
+-- 'closing': claimed by a close that is building the final report (no more scans)
+ALTER TABLE public.stocktake_sessions DROP CONSTRAINT IF EXISTS stocktake_sessions_status_check;
+ALTER TABLE public.stocktake_sessions ADD CONSTRAINT stocktake_sessions_status_check
+    CHECK (status IN ('open', 'closing', 'closed'));
+
+-- Scanned tags that match no registered copy
+CREATE TABLE IF NOT EXISTS public.stocktake_unknown_tags (
+    session_id UUID NOT NULL REFERENCES public.stocktake_sessions(id) ON DELETE CASCADE,
+    rfid_uid TEXT NOT NULL,
+    PRIMARY KEY (session_id, rfid_uid)
+);
+
+-- Only the backend (service role) reads or writes them
+ALTER TABLE public.stocktake_sessions ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.stocktake_unknown_tags ENABLE ROW LEVEL SECURITY;
+
+-- Apply one batch of scanned tags. Only the batch's tags are looked up; the
+-- session row lock applies batches of one session one at a time.
+CREATE OR REPLACE FUNCTION public.stocktake_scan(p_session_id UUID, p_tags TEXT[])
+RETURNS JSON AS $$
+DECLARE
+    v_seen BYTEA;
+    v_status TEXT;
+    v_ordinals BIGINT[];
+    v_max BIGINT;
+    v_ordinal BIGINT;
+    v_new INTEGER := 0;
+    v_unknown INTEGER;
+BEGIN
+    SELECT seen, status INTO v_seen, v_status
+    FROM public.stocktake_sessions
+    WHERE id = p_session_id
+    FOR UPDATE;
+
+    IF NOT FOUND THEN
+        RETURN NULL;
+    END IF;
+    -- A distinct SQLSTATE, so the API can answer 409 rather than 500
+    IF v_status <> 'open' THEN
+        RAISE EXCEPTION 'Stocktake session % is closed', p_session_id
+            USING ERRCODE = 'object_not_in_prerequisite_state';
+    END IF;
+
+    SELECT array_agg(c.ordinal), MAX(c.ordinal) INTO v_ordinals, v_max
+    FROM public.book_copies c
+    WHERE c.rfid_uid = ANY(p_tags);
+
+    INSERT INTO public.stocktake_unknown_tags (session_id, rfid_uid)
+    SELECT p_session_id, t.rfid_uid
+    FROM unnest(p_tags) AS t(rfid_uid)
+    WHERE NOT EXISTS (SELECT 1 FROM public.book_copies c WHERE c.rfid_uid = t.rfid_uid)
+    ON CONFLICT DO NOTHING;
+    GET DIAGNOSTICS v_unknown = ROW_COUNT;
+
+    -- Grow the bitmap to cover the highest ordinal in this batch
+    IF v_max IS NOT NULL AND length(v_seen)::BIGINT * 8 <= v_max THEN
+        v_seen := v_seen || decode(repeat('00', (v_max / 8 + 1 - length(v_seen))::INTEGER), 'hex');
+    END IF;
+
+    FOREACH v_ordinal IN ARRAY COALESCE(v_ordinals, '{}'::BIGINT[]) LOOP
+        IF get_bit(v_seen, v_ordinal::INTEGER) = 0 THEN
+            v_seen := set_bit(v_seen, v_ordinal::INTEGER, 1);
+            v_new := v_new + 1;
+        END IF;
+    END LOOP;
+
+    UPDATE public.stocktake_sessions
+    SET seen = v_seen,
+        seen_count = seen_count + v_new,
+        scan_count = scan_count + cardinality(p_tags)
+    WHERE id = p_session_id;
+
+    RETURN json_build_object(
+        'received', cardinality(p_tags),
+        'matched', COALESCE(cardinality(v_ordinals), 0),
+        'new', v_new,
+        'unknown', v_unknown
+    );
+END;
+$$ LANGUAGE plpgsql;
+
+-- Diff the seen bitmap against book_copies and active borrows:
+--   missing     in scope, on the shelf according to the catalogue, not scanned
+--   misplaced   scanned, but the book belongs outside the session's scope
+--   unexpected  scanned, but on loan or marked borrowed/lost/maintenance
+-- Lists are cut at p_limit entries; counts are always complete.
+CREATE OR REPLACE FUNCTION public.stocktake_report(p_session_id UUID, p_limit INTEGER DEFAULT 1000)
+RETURNS JSON AS $$
+    WITH s AS (
+        SELECT * FROM public.stocktake_sessions WHERE id = p_session_id
+    ),
+    on_loan AS (
+        SELECT DISTINCT book_copy_id
+        FROM public.borrows
+        WHERE status IN ('borrowed', 'overdue') AND book_copy_id IS NOT NULL
+    ),
+    copies AS (
+        SELECT c.id AS copy_id, c.rfid_uid, c.status, c.book_id, b.title,
+               CASE WHEN c.ordinal < length(s.seen)::BIGINT * 8
+                    THEN get_bit(s.seen, c.ordinal::INTEGER) = 1
+                    ELSE FALSE END AS seen,
+               (s.department IS NULL OR b.department = s.department)
+                   AND (s.category IS NULL OR b.category = s.category)
+                   AND (s.subject IS NULL OR b.subject = s.subject) AS in_scope,
+               l.book_copy_id IS NOT NULL AS on_loan
+        FROM s
+        CROSS JOIN public.book_copies c
+        JOIN public.books b ON b.id = c.book_id
+        LEFT JOIN on_loan l ON l.book_copy_id = c.id
+    ),
+    classified AS (
+        SELECT *,
+               CASE
+                   WHEN seen AND NOT in_scope THEN 'misplaced'
+                   WHEN seen AND (on_loan OR status <> 'available') THEN 'unexpected'
+                   WHEN NOT seen AND in_scope AND NOT on_loan AND status = 'available' THEN 'missing'
+               END AS finding
+        FROM copies
+    ),
+    ranked AS (
+        SELECT *, row_number() OVER (PARTITION BY finding ORDER BY title, rfid_uid) AS n
+        FROM classified
+        WHERE finding IS NOT NULL
+    )
+    SELECT json_build_object(
+        'session_id', (SELECT id FROM s),
+        'expected', (SELECT COUNT(*) FROM classified WHERE in_scope AND NOT on_loan AND status = 'available'),
+        'found', (SELECT COUNT(*) FROM classified WHERE seen AND in_scope),
+        'counts', json_build_object(
+            'missing', (SELECT COUNT(*) FROM ranked WHERE finding = 'missing'),
+            'misplaced', (SELECT COUNT(*) FROM ranked WHERE finding = 'misplaced'),
+            'unexpected', (SELECT COUNT(*) FROM ranked WHERE finding = 'unexpected'),
+            'unknown_tags', (SELECT COUNT(*) FROM public.stocktake_unknown_tags WHERE session_id = p_session_id)
+        ),
+        'missing', COALESCE((
+            SELECT json_agg(json_build_object('copy_id', copy_id, 'rfid_uid', rfid_uid, 'book_id', book_id, 'title', title) ORDER BY n)
+            FROM ranked WHERE finding = 'missing' AND n <= p_limit
+        ), '[]'::json),
+        'misplaced', COALESCE((
+            SELECT json_agg(json_build_object('copy_id', copy_id, 'rfid_uid', rfid_uid, 'book_id', book_id, 'title', title) ORDER BY n)
+            FROM ranked WHERE finding = 'misplaced' AND n <= p_limit
+        ), '[]'::json),
+        'unexpected', COALESCE((
+            SELECT json_agg(json_build_object(
+                'copy_id', copy_id, 'rfid_uid', rfid_uid, 'book_id', book_id, 'title', title,
+                'status', status, 'on_loan', on_loan
+            ) ORDER BY n)
+            FROM ranked WHERE finding = 'unexpected' AND n <= p_limit
+        ), '[]'::json),
+        'unknown_tags', COALESCE((
+            SELECT json_agg(t.rfid_uid ORDER BY t.rfid_uid)
+            FROM (
+                SELECT rfid_uid FROM public.stocktake_unknown_tags
+                WHERE session_id = p_session_id
+                ORDER BY rfid_uid
+                LIMIT p_limit
+            ) t
+        ), '[]'::json)
+    )
+    WHERE EXISTS (SELECT 1 FROM s);
+$$ LANGUAGE sql STABLE;
+
+REVOKE EXECUTE ON FUNCTION public.stocktake_scan(UUID, TEXT[]) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION public.stocktake_report(UUID, INTEGER) FROM PUBLIC, anon, authenticated;
+
+-- ============================================
+-- BULK STUDENT ONBOARDING
+-- ============================================
+ALTER TABLE public.user_profiles ADD COLUMN IF NOT EXISTS department TEXT;
+
+-- Profiles by email, whatever the case they were stored in
+CREATE INDEX IF NOT EXISTS idx_user_profiles_email_lower ON public.user_profiles (lower(email));
+
+CREATE OR REPLACE FUNCTION public.profiles_by_email(p_emails TEXT[])
+RETURNS JSON AS $$
+    SELECT COALESCE(json_agg(json_build_object('id', p.id, 'email', p.email, 'student_id', p.student_id)), '[]'::json)
+    FROM public.user_profiles p
+    WHERE lower(p.email) = ANY(SELECT lower(e) FROM unnest(p_emails) AS e);
+$$ LANGUAGE sql STABLE;
+
+-- Auth users (by email) that exist already, so an interrupted roster import
+-- can give them a profile instead of creating them again
+CREATE OR REPLACE FUNCTION public.auth_user_ids(p_emails TEXT[])
+RETURNS JSON AS $$
+    SELECT COALESCE(json_agg(json_build_object('email', u.email, 'id', u.id)), '[]'::json)
+    FROM auth.users u
+    WHERE lower(u.email) = ANY(SELECT lower(e) FROM unnest(p_emails) AS e);
+$$ LANGUAGE sql STABLE SECURITY DEFINER SET search_path = public, auth;
+
+-- One chunk of roster profiles for already created auth users. Missing
+-- student IDs continue this year's STU<year><number> sequence (the format of
+-- generate_student_ids.sql, without cutting numbers past 999). Profiles that
+-- exist already are left alone. Returns one {row, id, email, student_id,
+-- status} entry per input row.
+CREATE OR REPLACE FUNCTION public.import_student_profiles(p_rows JSONB)
+RETURNS JSON AS $$
+DECLARE
+    v_prefix TEXT := 'STU' || to_char(NOW(), 'YYYY');
+    v_last BIGINT;
+    result JSON;
+BEGIN
+    -- Concurrent imports would otherwise hand out the same student IDs
+    PERFORM pg_advisory_xact_lock(hashtext('public.import_student_profiles'));
+
+    SELECT COALESCE(MAX(substring(student_id FROM length(v_prefix) + 1)::BIGINT), 0) INTO v_last
+    FROM public.user_profiles
+    WHERE student_id ~ ('^' || v_prefix || '[0-9]+$');
+
+    WITH raw AS (
+        SELECT r.*
+        FROM jsonb_to_recordset(p_rows) AS r(
+            row_no INTEGER, id UUID, email TEXT, name TEXT, student_id TEXT, department TEXT
+        )
+    ),
+    input AS MATERIALIZED (
+        SELECT raw.row_no, raw.id, raw.email, raw.name, raw.department,
+               COALESCE(raw.student_id, v_prefix || lpad(g.number::TEXT, GREATEST(3, length(g.number::TEXT)), '0')) AS student_id
+        FROM raw
+        LEFT JOIN (
+            SELECT row_no, v_last + ROW_NUMBER() OVER (ORDER BY row_no) AS number
+            FROM raw
+            WHERE student_id IS NULL
+        ) g ON g.row_no = raw.row_no
+    ),
+    inserted AS (
+        INSERT INTO public.user_profiles (id, email, name, role, student_id, department)
+        SELECT i.id, i.email, i.name, 'student', i.student_id, i.department
+        FROM input i
+        ON CONFLICT DO NOTHING
+        RETURNING id
+    )
+    SELECT COALESCE(json_agg(json_build_object(
+        'row', i.row_no,
+        'id', COALESCE(p.id, i.id),
+        'email', i.email,
+        'student_id', CASE WHEN n.id IS NOT NULL THEN i.student_id ELSE p.student_id END,
+        'status', CASE WHEN n.id IS NOT NULL THEN 'created' ELSE 'exists' END
+    ) ORDER BY i.row_no), '[]'::json) INTO result
+    FROM input i
+    LEFT JOIN inserted n ON n.id = i.id
+    LEFT JOIN LATERAL (
+        SELECT up.id, up.student_id
+        FROM public.user_profiles up
+        WHERE n.id IS NULL AND (up.id = i.id OR lower(up.email) = lower(i.email))
+        LIMIT 1
+    ) p ON TRUE;
+
+    RETURN result;
+END;
+$$ LANGUAGE plpgsql;
+
+REVOKE EXECUTE ON FUNCTION public.profiles_by_email(TEXT[]) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION public.auth_user_ids(TEXT[]) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION public.import_student_profiles(JSONB) FROM PUBLIC, anon, authenticated;
+
+-- ============================================
+-- BOOK DETAILS
+-- ============================================
+-- Copy counts by status come from the (book_id, status) index, not one row per copy
+CREATE INDEX IF NOT EXISTS idx_book_copies_book_status ON public.book_copies(book_id, status);
+
+-- A book row with its copy counts by status, in one round trip
+CREATE OR REPLACE FUNCTION public.book_details(p_book_id UUID)
+RETURNS JSON AS $$
+    SELECT json_build_object(
+        'book', to_json(b),
+        'copy_summary', (
+            SELECT json_build_object(
+                'available', COUNT(*) FILTER (WHERE c.status = 'available'),
+                'borrowed', COUNT(*) FILTER (WHERE c.status = 'borrowed'),
+                'maintenance', COUNT(*) FILTER (WHERE c.status = 'maintenance'),
+                'lost', COUNT(*) FILTER (WHERE c.status = 'lost'),
+                'total', COUNT(*)
+            )
+            FROM public.book_copies c
+            WHERE c.book_id = b.id
+        )
+    )
+    FROM public.books b
+    WHERE b.id = p_book_id;
+$$ LANGUAGE sql STABLE;
+
+REVOKE EXECUTE ON FUNCTION public.book_details(UUID) FROM PUBLIC, anon, authenticated;
+
+-- ============================================
+-- STORAGE BUCKETS
+-- ============================================
+-- Public bucket for academic resources (the API also creates it on first use)
+INSERT INTO storage.buckets (id, name, public)
+VALUES ('resources', 'resources', true)
+ON CONFLICT (id) DO NOTHING;
+
 -- ============================================
 -- INSERT DEFAULT SYSTEM CONFIGURATION
 -- ============================================
@@ -347,5 +1247,7 @@ INSERT INTO public.system_config (key, value, description) VALUES
     ('grace_period_days', '2', 'Grace period before fines start accumulating'),
     ('fine_per_day', '5', 'Fine amount per day for overdue books'),
     ('max_books_per_student', '3', 'Maximum number of books a student can borrow at once'),
-    ('reminder_days_before_due', '3', 'Number of days before due date to send reminder')
+    ('reminder_days_before_due', '3', 'Number of days before due date to send reminder'),
+    ('overdue_frequency', '"daily"', 'How often overdue reminders are repeated'),
+    ('config_version', '0', 'Bumped on every configuration change so API instances reload their cache')
 ON CONFLICT (key) DO NOTHING;
@@ -5,6 +5,7 @@ import logging
 from fastapi import Request
 import time
 import json
+import re
 from starlette.middleware.base import BaseHTTPMiddleware
 
 
@@ -15,6 +16,7 @@ from api.books.router import router as books_router
 from api.admin.router import router as admin_router
 from api.resources.router import router as resources_router
 from api.rules.router import router as rules_router
+from api.stocktake.router import router as stocktake_router
 from api.health import router as health_router
 
 # Configure logging
@@ -24,6 +26,26 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Streaming endpoints accept the JWT as ?access_token= (EventSource cannot set
+# headers); it must never reach the logs
+_TOKEN_PARAM = re.compile(r"(access_token=)[^&\s]+")
+
+
+def redact_tokens(text: str) -> str:
+    return _TOKEN_PARAM.sub(r"\1[redacted]", text)
+
+
+class RedactTokensFilter(logging.Filter):
+    """Redacts ?access_token= from uvicorn's access log lines"""
+
+    def filter(self, record):
+        if isinstance(record.args, tuple):
+            record.args = tuple(redact_tokens(arg) if isinstance(arg, str) else arg for arg in record.args)
+        return True
+
+
+logging.getLogger("uvicorn.access").addFilter(RedactTokensFilter())
+
 # Create FastAPI app
 app = FastAPI(
     title="Smart Library Management System API",
@@ -47,21 +69,34 @@ class LoggingMiddleware(BaseHTTPMiddleware):
     async def dispatch(self, request: Request, call_next):
         start_time = time.time()
         
-        # Read body properly
-        body = await request.body()
-        
-        # Re-inject body for next handler
-        async def receive():
-            return {"type": "http.request", "body": body}
-        request._receive = receive
+        # Only small non-file bodies are buffered for logging; uploads stream
+        # through untouched so they are never held in memory here
+        log_msg = f"REQUEST: {request.method} {redact_tokens(str(request.url))}"
+        content_type = request.headers.get("content-type", "")
+        content_length = request.headers.get("content-length")
+        loggable = (
+            content_length is not None
+            and content_length.isdigit()
+            and int(content_length) <= settings.log_body_max_bytes
+            and not content_type.startswith(("multipart/", "application/octet-stream"))
+        )
         
-        # Log Request
-        log_msg = f"REQUEST: {request.method} {request.url}"
-        try:
-            if body:
-                log_msg += f" Body: {body.decode()}"
-        except:
-            log_msg += " Body: (binary/unreadable)"
+        if loggable:
+            # Read body properly
+            body = await request.body()
+            
+            # BaseHTTPMiddleware caches a body read here and replays it to the
+            # route itself; replacing request._receive would also answer the
+            # disconnect listener of streaming responses with the body again
+            
+            # Log Request
+            try:
+                if body:
+                    log_msg += f" Body: {body.decode()}"
+            except:
+                log_msg += " Body: (binary/unreadable)"
+        elif content_length and content_length != "0":
+            log_msg += f" Body: ({content_length} bytes, {content_type or 'unknown type'}, not logged)"
         
         logger.info(log_msg)
             
@@ -90,6 +125,7 @@ app.include_router(books_router, prefix="/api")
 app.include_router(admin_router, prefix="/api")
 app.include_router(resources_router, prefix="/api")
 app.include_router(rules_router, prefix="/api")
+app.include_router(stocktake_router, prefix="/api")
 app.include_router(health_router, prefix="/api")
 
 
@@ -115,6 +151,10 @@ async def startup_event():
     logger.info(f"📚 Supabase URL: {settings.supabase_url}")
     logger.info(f"🌐 Frontend URL: {settings.frontend_url}")
     logger.info(f"🔧 API Port: {settings.api_port}")
+    if settings.warmup_on_start:
+        from fastapi.concurrency import run_in_threadpool
+        from services.warmup import run_warmup
+        await run_in_threadpool(run_warmup)
     logger.info("✅ API ready to accept requests")
 
 
@@ -124,6 +164,14 @@ async def shutdown_event():
     Shutdown event handler
     """
     logger.info("👋 Smart Library API shutting down...")
+    
+    # Write download counts still buffered in this process
+    from fastapi.concurrency import run_in_threadpool
+    from services.download_counter import download_counter
+    await run_in_threadpool(download_counter.flush)
+    
+    from services.resource_text import shutdown_extraction
+    shutdown_extraction()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,52 @@
+"""
+Production server for on-prem deployments (Lambda uses adapter.py instead).
+
+Runs the API in several uvicorn worker processes behind one listening socket:
+
+    python serve.py                      # one worker per CPU core
+    WORKERS=4 API_PORT=8000 python serve.py
+
+The supervisor restarts workers that crash or stop answering its health pings.
+Signals sent to the supervisor process:
+    SIGHUP          restart every worker (graceful: in-flight requests finish)
+    SIGTTIN/SIGTTOU add/remove a worker
+    SIGINT/SIGTERM  graceful shutdown
+
+Workers share read-mostly data (system_config snapshot, catalogue cache) through
+files in a per-server shared-memory directory, so only one of them has to fetch
+each snapshot from Supabase.
+"""
+import os
+import shutil
+import uvicorn
+from config import settings
+from services.shared_memory import default_shared_dir
+
+
+def main():
+    workers = settings.workers or os.cpu_count() or 1
+
+    # Workers are spawned as fresh interpreters and read their settings from the
+    # environment, so the shared directory is handed over that way
+    shared_dir = settings.shared_cache_dir or default_shared_dir(f"smart-library-{os.getpid()}")
+    os.environ["SHARED_CACHE_DIR"] = shared_dir
+    os.makedirs(shared_dir, exist_ok=True)
+
+    try:
+        uvicorn.run(
+            "main:app",
+            host="0.0.0.0",
+            port=settings.api_port,
+            workers=workers,
+            proxy_headers=True,
+            timeout_keep_alive=5,
+            timeout_graceful_shutdown=30,
+            log_level="info"
+        )
+    finally:
+        if not settings.shared_cache_dir:
+            shutil.rmtree(shared_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
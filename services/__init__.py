@@ -0,0 +1 @@
+# Services module init
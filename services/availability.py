@@ -0,0 +1,72 @@
+from typing import Dict
+from database import get_service_client
+from config import settings
+from services.batching import IN_FILTER_CHUNK_SIZE, chunked
+from services.notification_bus import publish_notifications
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def fan_out_availability(book_id: str) -> Dict[str, object]:
+    """
+    Notify everyone waiting on a book that a copy is available again.
+
+    Waiting subscribers are read page by page through the partial index on
+    (book_id) WHERE notified = false; each page becomes one notifications insert
+    and bulk `notified` updates. Flipped rows drop out of the index, so the next
+    page query simply returns the next set of waiters.
+    """
+    started = time.time()
+    client = get_service_client()
+    notified = 0
+
+    try:
+        book_res = client.table("books").select("id, title").eq("id", book_id).execute()
+        if not book_res.data:
+            return {"book_id": book_id, "notified": 0}
+        title = book_res.data[0]["title"]
+
+        page_size = settings.notification_insert_batch_size
+        while True:
+            waiting_res = client.table("availability_subscriptions")\
+                .select("id, user_id")\
+                .eq("book_id", book_id)\
+                .eq("notified", False)\
+                .order("id")\
+                .limit(page_size)\
+                .execute()
+
+            waiting = waiting_res.data or []
+            if not waiting:
+                break
+
+            inserted = client.table("notifications").insert([
+                {
+                    "user_id": subscription["user_id"],
+                    "type": "availability",
+                    "title": "Book available",
+                    "message": f"'{title}' is available to borrow again.",
+                    "is_read": False,
+                    "related_book_id": book_id
+                }
+                for subscription in waiting
+            ]).execute()
+            publish_notifications(inserted.data or [])
+
+            for ids in chunked([subscription["id"] for subscription in waiting], IN_FILTER_CHUNK_SIZE):
+                client.table("availability_subscriptions")\
+                    .update({"notified": True})\
+                    .in_("id", ids)\
+                    .execute()
+
+            notified += len(waiting)
+            if len(waiting) < page_size:
+                break
+
+    except Exception as e:
+        logger.error(f"Availability fan-out error for book {book_id}: {e}")
+
+    logger.info(f"Availability fan-out for book {book_id}: {notified} subscribers in {time.time() - started:.3f}s")
+    return {"book_id": book_id, "notified": notified}
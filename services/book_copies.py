@@ -0,0 +1,65 @@
+from collections import Counter
+from typing import Dict, Iterable, List, Tuple
+from config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+# (book_id, rfid_uid)
+CopyTag = Tuple[str, str]
+
+
+def tag_range(prefix: str, start: int, count: int, width: int = 0) -> List[str]:
+    """RFID UIDs prefix + start .. prefix + (start + count - 1), zero-padded to width digits"""
+    return [f"{prefix}{number:0{width}d}" for number in range(start, start + count)]
+
+
+def dedupe_tags(tags: Iterable[CopyTag]) -> Tuple[List[CopyTag], List[str]]:
+    """Drop repeated RFID UIDs within one request; returns (unique tags, repeated uids)"""
+    seen = set()
+    unique = []
+    repeated = []
+    for book_id, rfid_uid in tags:
+        if rfid_uid in seen:
+            repeated.append(rfid_uid)
+            continue
+        seen.add(rfid_uid)
+        unique.append((book_id, rfid_uid))
+    return unique, repeated
+
+
+def register_copies(client, tags: List[CopyTag], count_as_new: bool = True) -> Dict[str, object]:
+    """
+    Insert book_copies rows in chunks through the register_book_copies RPC.
+    Each chunk is one INSERT ... ON CONFLICT (rfid_uid) DO NOTHING, so tags
+    already registered are skipped in the same statement, plus one set-wise
+    UPDATE of the parent books' copy counts (unless count_as_new is False,
+    i.e. the copies are already included in total_copies).
+    """
+    added = Counter()
+    duplicates: List[str] = []
+    unknown_books = set()
+    restocked = set()
+
+    chunk_size = settings.bulk_copies_chunk_size
+    for start in range(0, len(tags), chunk_size):
+        chunk = tags[start:start + chunk_size]
+        response = client.rpc("register_book_copies", {
+            "p_copies": [{"book_id": book_id, "rfid_uid": rfid_uid} for book_id, rfid_uid in chunk],
+            "p_update_counts": count_as_new
+        }).execute()
+        result = response.data or {}
+
+        added.update({row["book_id"]: row["added"] for row in result.get("added") or []})
+        duplicates.extend(result.get("duplicates") or [])
+        unknown_books.update(result.get("unknown_books") or [])
+        restocked.update(result.get("restocked") or [])
+
+    logger.info(f"Registered {sum(added.values())} copies for {len(added)} books, {len(duplicates)} duplicates")
+    return {
+        "registered": sum(added.values()),
+        "added": dict(added),
+        "duplicates": duplicates,
+        "unknown_books": sorted(unknown_books),
+        "restocked": sorted(restocked)
+    }
@@ -0,0 +1,179 @@
+from typing import AsyncIterator, List, Optional, Tuple, Type
+from pydantic import BaseModel, ValidationError
+from starlette.concurrency import run_in_threadpool
+from config import settings
+import asyncio
+import codecs
+import csv
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+IMPORT_FORMATS = ("csv", "jsonl")
+
+# (row number, raw row or None, parse error or None)
+RawRow = Tuple[int, Optional[dict], Optional[str]]
+
+
+async def stream_lines(body: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Decoded lines (with their line endings) of a streamed body, as they arrive"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    pending = ""
+    async for chunk in body:
+        # The last piece may be a line that is still arriving
+        *lines, pending = (pending + decoder.decode(chunk)).split("\n")
+        for line in lines:
+            yield line + "\n"
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+def _without_blanks(row: dict) -> dict:
+    # Blank cells and nulls are left out, so the model's defaults apply to them
+    row = {key: value.strip() if isinstance(value, str) else value for key, value in row.items()}
+    return {key: value for key, value in row.items() if value is not None and value != ""}
+
+
+async def parse_csv(body: AsyncIterator[bytes]) -> AsyncIterator[RawRow]:
+    """
+    Rows of a CSV with a header line, parsed incrementally. A quoted field may
+    span lines: lines are joined until their quotes balance.
+    """
+    header: Optional[List[str]] = None
+    record = ""
+    row_no = 0
+    async for line in stream_lines(body):
+        record += line
+        if record.count('"') % 2:
+            continue
+        text, record = record, ""
+        if not text.strip():
+            continue
+        try:
+            values = next(csv.reader([text]))
+        except csv.Error as e:
+            row_no += 1
+            yield row_no, None, f"Invalid CSV: {e}"
+            continue
+
+        if header is None:
+            header = [name.strip().lower() for name in values]
+            continue
+        row_no += 1
+        if len(values) > len(header):
+            yield row_no, None, f"Expected {len(header)} columns, got {len(values)}"
+            continue
+        yield row_no, _without_blanks(dict(zip(header, values))), None
+
+    if record.strip():
+        yield row_no + 1, None, "Invalid CSV: unterminated quoted field"
+
+
+async def parse_jsonl(body: AsyncIterator[bytes]) -> AsyncIterator[RawRow]:
+    """One JSON object per line, parsed incrementally"""
+    row_no = 0
+    async for line in stream_lines(body):
+        if not line.strip():
+            continue
+        row_no += 1
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield row_no, None, f"Invalid JSON: {e}"
+            continue
+        if not isinstance(row, dict):
+            yield row_no, None, "Expected a JSON object"
+            continue
+        yield row_no, _without_blanks(row), None
+
+
+def validation_errors(error: ValidationError) -> List[str]:
+    return [f"{'.'.join(str(part) for part in e['loc'])}: {e['msg']}" for e in error.errors()]
+
+
+def _upsert_chunk(client, chunk: List[dict]) -> List[dict]:
+    response = client.rpc("import_books", {"p_rows": chunk}).execute()
+    return response.data or []
+
+
+async def import_books(
+    client,
+    body: AsyncIterator[bytes],
+    format: str,
+    model: Type[BaseModel],
+    chunk_size: Optional[int] = None
+) -> AsyncIterator[dict]:
+    """
+    Parse, validate and upsert a streamed catalogue file, yielding one result
+    per row ({row, status, id} or {row, status: "error", error}) and finally
+    {summary, restocked}. Valid rows are written through the import_books RPC in chunks;
+    the next chunk is parsed while the previous one is being written.
+    """
+    chunk_size = chunk_size or settings.book_import_chunk_size
+    rows = parse_csv(body) if format == "csv" else parse_jsonl(body)
+
+    summary = {"rows": 0, "created": 0, "updated": 0, "errors": 0}
+    restocked: List[str] = []
+    seen_isbns = {}
+    chunk: List[dict] = []
+    writing: Optional[asyncio.Future] = None
+
+    async def finish_write(future) -> List[dict]:
+        results = await future
+        for result in results:
+            summary[result["status"]] += 1
+            if result.get("restocked"):
+                restocked.append(result["id"])
+        return results
+
+    try:
+        async for row_no, raw, error in rows:
+            summary["rows"] += 1
+            if raw is not None:
+                try:
+                    book = model(**raw)
+                except ValidationError as e:
+                    error = "; ".join(validation_errors(e))
+                else:
+                    if book.isbn and book.isbn in seen_isbns:
+                        error = f"Duplicate ISBN {book.isbn} (row {seen_isbns[book.isbn]})"
+                    elif book.total_copies < 0:
+                        error = "total_copies: must not be negative"
+            if error:
+                summary["errors"] += 1
+                yield {"row": row_no, "status": "error", "error": error}
+                continue
+
+            if book.isbn:
+                seen_isbns[book.isbn] = row_no
+            # Only the columns the row gave: the others keep their current value on update
+            chunk.append({"row_no": row_no, **book.dict(exclude_unset=True)})
+
+            if len(chunk) >= chunk_size:
+                if writing is not None:
+                    previous, writing = writing, None
+                    for result in await finish_write(previous):
+                        yield result
+                writing = asyncio.ensure_future(run_in_threadpool(_upsert_chunk, client, chunk))
+                chunk = []
+
+        if writing is not None:
+            previous, writing = writing, None
+            for result in await finish_write(previous):
+                yield result
+        if chunk:
+            for result in await finish_write(run_in_threadpool(_upsert_chunk, client, chunk)):
+                yield result
+    finally:
+        # Stopped early (a failed chunk, or the client went away): the chunk in
+        # flight is still written by its thread, so wait for it here
+        if writing is not None:
+            try:
+                await writing
+            except Exception as e:
+                logger.error(f"Book import: chunk write failed after the import stopped: {e}")
+
+    logger.info(f"Book import: {summary}")
+    yield {"summary": summary, "restocked": restocked}
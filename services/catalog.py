@@ -0,0 +1,155 @@
+from typing import Optional, Tuple
+from database import get_service_client
+from services.catalog_cache import BOOK, BOOK_SEARCH, RESOURCE, RESOURCES, catalog_cache
+
+SearchFilters = Tuple[Optional[str], Optional[str], Optional[str], Optional[str], Optional[str]]
+ResourceFilters = Tuple[Optional[str], Optional[str], Optional[int], Optional[int], Optional[str]]
+
+
+def search_filters(
+    title: Optional[str] = None,
+    author: Optional[str] = None,
+    subject: Optional[str] = None,
+    category: Optional[str] = None,
+    availability: Optional[str] = None
+) -> SearchFilters:
+    """Normalised search filters, used as the query and as its cache key"""
+    # ilike is case-insensitive, so differently-cased searches share one query
+    return (
+        title.lower() if title else None,
+        author.lower() if author else None,
+        subject.lower() if subject else None,
+        category or None,
+        availability if availability in ("available", "unavailable") else None
+    )
+
+
+def _query_books(title, author, subject, category, availability) -> list:
+    # Use service client to bypass RLS for public search (fixes 500 error)
+    supabase = get_service_client()
+    
+    # Start with base query
+    query = supabase.table("books").select("*")
+    
+    # Apply filters
+    # NOTE: Using '*' as wildcard instead of '%' because '%' causes URL encoding issues 
+    # with Cloudflare/Supabase and results in 500 Error.
+    if title:
+        query = query.ilike("title", f"*{title}*")
+    if author:
+        query = query.ilike("author", f"*{author}*")
+    if subject:
+        query = query.ilike("subject", f"*{subject}*")
+    if category:
+        query = query.eq("category", category)
+    if availability == "available":
+        query = query.gt("available_copies", 0)
+    elif availability == "unavailable":
+        query = query.eq("available_copies", 0)
+    
+    response = query.order("title").execute()
+    return response.data if response.data else []
+
+
+def _query_book_details(book_id: str, include_copies: bool):
+    """Book row with its copy counts (counted in SQL), and the copies themselves if asked for"""
+    # Use service client to bypass RLS for public book details
+    supabase = get_service_client()
+    
+    response = supabase.rpc("book_details", {"p_book_id": book_id}).execute()
+    
+    if not response.data:
+        return None
+    
+    copies = None
+    if include_copies:
+        copies = supabase.table("book_copies")\
+            .select("*")\
+            .eq("book_id", book_id)\
+            .execute().data or []
+    
+    return {
+        "book": response.data["book"],
+        "copy_summary": response.data["copy_summary"],
+        "copies": copies
+    }
+
+
+def _query_resources(title, subject, semester, year, type) -> list:
+    # Use service client to bypass potentially restricted RLS if public read is not fully open
+    supabase = get_service_client()
+    
+    query = supabase.table("resources").select("*")
+    
+    if title:
+        # Using custom wildcard search for title
+        query = query.ilike("title", f"%{title}%")
+    if subject:
+        query = query.ilike("subject", f"%{subject}%")
+    if semester:
+        query = query.eq("semester", semester)
+    if year:
+        query = query.eq("year", year)
+    if type:
+        query = query.eq("type", type)
+    
+    response = query.order("year", desc=True).order("semester", desc=True).execute()
+    return response.data or []
+
+
+def _query_resource(resource_id: str) -> Optional[dict]:
+    supabase = get_service_client()
+    
+    response = supabase.table("resources")\
+        .select("id, title, file_url, file_path, file_size")\
+        .eq("id", resource_id)\
+        .limit(1)\
+        .execute()
+    return response.data[0] if response.data else None
+
+
+def _query_resource_contents(query: str, filters: ResourceFilters, limit: int) -> list:
+    supabase = get_service_client()
+    title, subject, semester, year, type = filters
+    
+    response = supabase.rpc("search_resource_contents", {
+        "p_query": query,
+        "p_title": title,
+        "p_subject": subject,
+        "p_semester": semester,
+        "p_year": year,
+        "p_type": type,
+        "p_limit": limit
+    }).execute()
+    return response.data or []
+
+
+def search_books(filters: SearchFilters) -> list:
+    """Books matching the filters, through the catalogue cache"""
+    return catalog_cache.get_or_load(BOOK_SEARCH, filters, lambda: _query_books(*filters))
+
+
+def get_book_details(book_id: str, include_copies: bool = False) -> Optional[dict]:
+    """Book with copy summary (and optionally copy rows), through the catalogue cache"""
+    return catalog_cache.get_or_load(
+        BOOK, (book_id, include_copies), lambda: _query_book_details(book_id, include_copies)
+    )
+
+
+def list_resources(filters: ResourceFilters) -> list:
+    """Resources matching the filters, through the catalogue cache"""
+    return catalog_cache.get_or_load(RESOURCES, filters, lambda: _query_resources(*filters))
+
+
+def get_resource(resource_id: str) -> Optional[dict]:
+    """Download metadata of one resource, through the catalogue cache"""
+    return catalog_cache.get_or_load(RESOURCE, resource_id, lambda: _query_resource(resource_id))
+
+
+def search_resource_contents(query: str, filters: ResourceFilters, limit: int = 20) -> list:
+    """Resources whose text matches the query, best match first, through the catalogue cache"""
+    query = " ".join(query.lower().split())
+    return catalog_cache.get_or_load(
+        RESOURCES, ("contents", query, limit) + tuple(filters),
+        lambda: _query_resource_contents(query, filters, limit)
+    )
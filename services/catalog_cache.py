@@ -0,0 +1,213 @@
+from collections import Counter
+from typing import Any, Callable, Dict, Hashable, Optional
+from config import settings
+from services.cache import TTLCache
+from services.shared_memory import FileTier, SharedFileStore
+from services.singleflight import catalogue_flight
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# Namespaces of cached catalogue reads
+BOOK = "book"
+BOOK_SEARCH = "book_search"
+RESOURCES = "resources"
+RESOURCE = "resource"
+
+NAMESPACES = (BOOK, BOOK_SEARCH, RESOURCES, RESOURCE)
+
+
+def _encode(value: Any) -> str:
+    return json.dumps(value, default=str, separators=(",", ":"))
+
+
+class SharedTier:
+    """
+    Optional second tier in a Redis-compatible server shared by all workers.
+
+    Values are stored as JSON with a TTL. Every key is also recorded in a
+    per-namespace index set so a namespace can be dropped without SCAN. Any
+    server error is logged and treated as a miss, so the cache never takes the
+    API down with it.
+    """
+
+    def __init__(self, url: str, ttl_seconds: int, key_prefix: str = "library:"):
+        # Optional dependency: only needed when a shared cache is configured
+        import redis
+
+        self.ttl_seconds = ttl_seconds
+        self.key_prefix = key_prefix
+        self._client = redis.Redis.from_url(url, socket_timeout=0.25, socket_connect_timeout=0.25)
+        self._stats = Counter()
+
+    def _key(self, namespace: str, key: str) -> str:
+        return f"{self.key_prefix}{namespace}:{key}"
+
+    def _index(self, namespace: str) -> str:
+        return f"{self.key_prefix}{namespace}:__keys__"
+
+    def get(self, namespace: str, key: str) -> Any:
+        try:
+            raw = self._client.get(self._key(namespace, key))
+        except Exception as e:
+            self._stats["errors"] += 1
+            logger.warning(f"Shared cache get failed: {e}")
+            return None
+        if raw is None:
+            self._stats["misses"] += 1
+            return None
+        self._stats["hits"] += 1
+        return json.loads(raw)
+
+    def set(self, namespace: str, key: str, encoded: str):
+        full_key = self._key(namespace, key)
+        try:
+            pipe = self._client.pipeline(transaction=False)
+            pipe.set(full_key, encoded, ex=self.ttl_seconds)
+            pipe.sadd(self._index(namespace), full_key)
+            pipe.expire(self._index(namespace), self.ttl_seconds * 2)
+            pipe.execute()
+        except Exception as e:
+            self._stats["errors"] += 1
+            logger.warning(f"Shared cache set failed: {e}")
+
+    def delete(self, namespace: str, key: str):
+        try:
+            self._client.delete(self._key(namespace, key))
+        except Exception as e:
+            self._stats["errors"] += 1
+            logger.warning(f"Shared cache delete failed: {e}")
+
+    def clear(self, namespace: str):
+        index = self._index(namespace)
+        try:
+            keys = self._client.smembers(index)
+            self._client.delete(index, *keys)
+        except Exception as e:
+            self._stats["errors"] += 1
+            logger.warning(f"Shared cache clear failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self._stats["hits"] + self._stats["misses"]
+        stats = {
+            "hits": self._stats["hits"],
+            "misses": self._stats["misses"],
+            "hit_rate": round(self._stats["hits"] / lookups, 4) if lookups else 0.0,
+            "errors": self._stats["errors"]
+        }
+        try:
+            stats["used_memory_bytes"] = self._client.info("memory").get("used_memory")
+        except Exception:
+            stats["used_memory_bytes"] = None
+        return stats
+
+
+class CatalogCache:
+    """
+    Read-through cache for catalogue data (books, copy summaries, resources).
+
+    Tier 1 is an in-process LRU per namespace with a short TTL and entry/byte
+    limits. Tier 2 is shared: a Redis-compatible server (SharedTier) when
+    settings.cache_redis_url is set, otherwise shared-memory files (FileTier)
+    between the worker processes of one host when settings.shared_cache_dir is set.
+    Admin write paths invalidate by key or by whole namespace. The short local
+    TTL bounds how long other workers can serve an entry another worker has
+    already invalidated.
+    """
+
+    def __init__(self, shared=None):
+        self.shared = shared
+        self._local = {
+            namespace: TTLCache(
+                ttl_seconds=settings.cache_local_ttl_seconds,
+                max_entries=settings.cache_local_max_entries,
+                max_bytes=settings.cache_local_max_bytes // len(NAMESPACES),
+                weigher=lambda value: len(_encode(value))
+            )
+            for namespace in NAMESPACES
+        }
+
+    def get_or_load(self, namespace: str, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """
+        Cached value for key, loading and filling both tiers on a miss.
+        None results (e.g. missing rows) are not cached.
+        """
+        local = self._local[namespace]
+        value = local.get(key)
+        if value is not None:
+            return value
+
+        shared_key = _encode(key) if self.shared else None
+        if self.shared:
+            value = self.shared.get(namespace, shared_key)
+            if value is not None:
+                local.set(key, value)
+                return value
+
+        value = loader()
+        if value is not None:
+            local.set(key, value)
+            if self.shared:
+                self.shared.set(namespace, shared_key, _encode(value))
+        return value
+
+    def invalidate(self, namespace: str, key: Optional[Hashable] = None):
+        """Drop one key, or the whole namespace when key is None"""
+        if key is None:
+            self._local[namespace].clear()
+            if self.shared:
+                self.shared.clear(namespace)
+        else:
+            self._local[namespace].delete(key)
+            if self.shared:
+                self.shared.delete(namespace, _encode(key))
+
+    def stats(self) -> Dict[str, Any]:
+        local = {namespace: cache.stats() for namespace, cache in self._local.items()}
+        hits = sum(stats["hits"] for stats in local.values())
+        lookups = hits + sum(stats["misses"] for stats in local.values())
+        return {
+            "local": local,
+            "local_hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "local_approx_bytes": sum(stats["approx_bytes"] for stats in local.values()),
+            "shared": self.shared.stats() if self.shared else None
+        }
+
+
+def _create_shared_tier():
+    if settings.cache_redis_url:
+        try:
+            return SharedTier(settings.cache_redis_url, settings.cache_shared_ttl_seconds)
+        except ImportError:
+            logger.warning("cache_redis_url is set but the redis package is not installed")
+    if settings.shared_cache_dir:
+        store = SharedFileStore(os.path.join(settings.shared_cache_dir, "catalog"))
+        return FileTier(store, settings.cache_shared_ttl_seconds)
+    return None
+
+
+catalog_cache = CatalogCache(shared=_create_shared_tier())
+
+
+def invalidate_book(book_id: Optional[str] = None):
+    """
+    After a write to books or book_copies: drop the book (every book when
+    book_id is None) and all search results, which embed copy counts.
+    """
+    if book_id is None:
+        catalog_cache.invalidate(BOOK)
+    else:
+        # Book details are cached with and without the copy rows
+        for include_copies in (False, True):
+            catalog_cache.invalidate(BOOK, (book_id, include_copies))
+    catalog_cache.invalidate(BOOK_SEARCH)
+    catalogue_flight.clear()
+
+
+def invalidate_resources(resource_id: Optional[str] = None):
+    """After a resource upload or delete (pass the id of a deleted resource)"""
+    catalog_cache.invalidate(RESOURCES)
+    if resource_id is not None:
+        catalog_cache.invalidate(RESOURCE, resource_id)
@@ -0,0 +1,53 @@
+from database import get_service_client
+from config import settings
+from services.cache import TTLCache
+from services.fines import compute_fines, days_until_due
+from services.system_config import get_system_config
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Absorbs bursts of dashboard loads (app opens at the start of class hours)
+dashboard_cache = TTLCache(
+    ttl_seconds=settings.dashboard_cache_ttl_seconds,
+    max_entries=settings.dashboard_cache_max_entries
+)
+
+
+def get_dashboard_summary(user_id: str) -> dict:
+    """
+    Student dashboard summary from one database call, cached per user for a few seconds
+    """
+    summary = dashboard_cache.get(user_id)
+    if summary is not None:
+        return summary
+
+    supabase = get_service_client()
+    response = supabase.rpc("student_dashboard_inputs", {"p_user_id": user_id}).execute()
+    inputs = response.data or {}
+
+    due_dates = inputs.get("due_dates") or []
+    policy = get_system_config().fine_policy
+    fine_batch = compute_fines(due_dates, policy=policy)
+
+    due_soon_count = sum(
+        1 for days in days_until_due(due_dates)
+        if 0 <= days <= policy.due_soon_days
+    )
+
+    # Total fine is potential/dynamic fine + already charged pending fines
+    total_fine = fine_batch.total_fine + float(inputs.get("pending_fines") or 0)
+
+    summary = {
+        "currently_borrowed": len(due_dates),
+        "due_soon": due_soon_count,
+        "overdue": fine_batch.overdue_count,
+        "total_fine": float(total_fine)
+    }
+    dashboard_cache.set(user_id, summary)
+    return summary
+
+
+def invalidate_dashboard(user_id: str):
+    """Drop a user's cached summary after a borrow, return or fine change"""
+    dashboard_cache.delete(user_id)
@@ -0,0 +1,84 @@
+from collections import Counter
+from config import settings
+from database import get_service_client
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class DownloadCounter:
+    """
+    Buffers resource download counts in memory and writes them with one
+    set-wise RPC per flush instead of an UPDATE per download (reading the
+    resource itself still goes through the catalogue cache, which refreshes
+    from the database every cache_local_ttl_seconds).
+
+    record() says when a flush is due (every flush_interval_seconds, or once
+    max_pending resources are waiting); the caller runs flush() off the request
+    path. Counts from a failed flush are kept for the next one. Counts still
+    buffered when a process dies are lost, so totals are approximate.
+
+    With flush_each_record (Lambda), every download is due: a frozen or
+    recycled container never runs a later flush or the shutdown hook, so the
+    count is written by a background task of the same invocation.
+    """
+
+    def __init__(self, flush_interval_seconds: float, max_pending: int, flush_each_record: bool = False):
+        self.flush_interval_seconds = flush_interval_seconds
+        self.max_pending = max_pending
+        self.flush_each_record = flush_each_record
+        self._pending = Counter()
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._flushing = False
+
+    def record(self, resource_id: str) -> bool:
+        """Count one download; True if the caller should schedule a flush"""
+        with self._lock:
+            self._pending[resource_id] += 1
+            due = not self._flushing and (
+                self.flush_each_record
+                or len(self._pending) >= self.max_pending
+                or time.monotonic() - self._last_flush >= self.flush_interval_seconds
+            )
+            if due:
+                self._flushing = True
+            return due
+
+    def flush(self) -> int:
+        """Write the buffered counts; returns how many downloads were written"""
+        with self._lock:
+            batch, self._pending = self._pending, Counter()
+            self._last_flush = time.monotonic()
+            self._flushing = True
+
+        try:
+            if batch:
+                get_service_client().rpc("increment_resource_downloads", {
+                    "p_ids": list(batch.keys()),
+                    "p_counts": list(batch.values())
+                }).execute()
+            return sum(batch.values())
+        except Exception as e:
+            logger.error(f"Download count flush failed ({len(batch)} resources), will retry: {e}")
+            with self._lock:
+                self._pending.update(batch)
+            return 0
+        finally:
+            with self._lock:
+                self._flushing = False
+
+    def pending(self) -> int:
+        with self._lock:
+            return sum(self._pending.values())
+
+
+download_counter = DownloadCounter(
+    flush_interval_seconds=settings.download_count_flush_seconds,
+    max_pending=settings.download_count_max_pending,
+    # Mangum runs with lifespan="off" and containers are frozen between invocations
+    flush_each_record=bool(os.environ.get("AWS_LAMBDA_FUNCTION_NAME"))
+)
@@ -0,0 +1,112 @@
+from typing import Dict, Optional, Set
+from config import settings
+import asyncio
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class NotificationBus:
+    """
+    In-process pub/sub feeding the notification stream.
+
+    Each connected client owns one small bounded queue; an idle connection costs
+    a queue and a suspended generator, nothing else. A single shared task sends
+    keep-alive pings, so there are no per-connection timers. Publishers may run
+    on the event loop or in worker threads (background tasks, threadpool jobs).
+    This bus only reaches clients connected to the same process.
+    """
+
+    def __init__(self, queue_size: int = 32, heartbeat_seconds: float = 20):
+        self.queue_size = queue_size
+        self.heartbeat_seconds = heartbeat_seconds
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        self._lock = threading.Lock()
+
+    @property
+    def connection_count(self) -> int:
+        return sum(len(queues) for queues in self._subscribers.values())
+
+    def subscribe(self, user_id: str) -> asyncio.Queue:
+        """Register a connection for a user (call from the event loop)"""
+        self._loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(queue)
+        if self._heartbeat_task is None or self._heartbeat_task.done():
+            self._heartbeat_task = self._loop.create_task(self._heartbeat())
+        return queue
+
+    def unsubscribe(self, user_id: str, queue: asyncio.Queue):
+        with self._lock:
+            queues = self._subscribers.get(user_id)
+            if queues is None:
+                return
+            queues.discard(queue)
+            if not queues:
+                del self._subscribers[user_id]
+
+    def publish(self, user_id: str, event: str, data: dict):
+        """Send an event to every connection of one user"""
+        with self._lock:
+            queues = list(self._subscribers.get(user_id, ()))
+        self._dispatch(queues, event, data)
+
+    def publish_all(self, event: str, data: dict):
+        """Send an event to every connected client"""
+        with self._lock:
+            queues = [queue for user_queues in self._subscribers.values() for queue in user_queues]
+        self._dispatch(queues, event, data)
+
+    def _dispatch(self, queues, event: str, data: dict):
+        if not queues or self._loop is None:
+            return
+
+        message = (event, data)
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+
+        if running is self._loop:
+            for queue in queues:
+                self._offer(queue, message)
+        else:
+            try:
+                for queue in queues:
+                    self._loop.call_soon_threadsafe(self._offer, queue, message)
+            except RuntimeError:
+                # Event loop already closed (shutdown)
+                pass
+
+    async def _heartbeat(self):
+        while self._subscribers:
+            await asyncio.sleep(self.heartbeat_seconds)
+            with self._lock:
+                queues = [queue for user_queues in self._subscribers.values() for queue in user_queues]
+            for queue in queues:
+                # A client with unread events does not need a ping
+                if queue.empty():
+                    queue.put_nowait(("ping", None))
+
+    @staticmethod
+    def _offer(queue: asyncio.Queue, message):
+        try:
+            queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Slow client: drop what it has not read and tell it to refetch
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(("resync", {}))
+
+
+notification_bus = NotificationBus(heartbeat_seconds=settings.sse_heartbeat_seconds)
+
+
+def publish_notifications(rows: list):
+    """Publish freshly inserted notifications rows to their owners"""
+    for row in rows:
+        notification_bus.publish(row["user_id"], "notification", row)
@@ -0,0 +1,66 @@
+from typing import List, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def broadcast_as_notification(broadcast: dict, user_id: str) -> dict:
+    """Shape a broadcast row (with the user's is_read from student_broadcasts) like a notifications row"""
+    return {
+        "id": broadcast["id"],
+        "user_id": user_id,
+        "type": broadcast["type"],
+        "title": broadcast["title"],
+        "message": broadcast["message"],
+        "is_read": bool(broadcast.get("is_read")),
+        "related_borrow_id": None,
+        "related_book_id": None,
+        "created_at": broadcast["created_at"],
+        "broadcast": True
+    }
+
+
+def fetch_student_feed(client, user_id: str, limit: int = 50) -> Tuple[List[dict], int]:
+    """
+    Merge personal notifications and broadcasts into one feed, newest first.
+    Returns the feed and the user's total unread count (not just within the feed).
+    """
+    personal_response = client.table("notifications")\
+        .select("*")\
+        .eq("user_id", user_id)\
+        .order("created_at", desc=True)\
+        .limit(limit)\
+        .execute()
+
+    # Read state comes from the user's watermark and read markers
+    broadcast_response = client.rpc("student_broadcasts", {"p_user_id": user_id, "p_limit": limit}).execute()
+
+    feed = list(personal_response.data or [])
+    feed.extend(broadcast_as_notification(b, user_id) for b in (broadcast_response.data or []))
+    feed.sort(key=lambda n: n["created_at"], reverse=True)
+
+    return feed[:limit], unread_count(client, user_id)
+
+
+def unread_count(client, user_id: str) -> int:
+    """Maintained unread counter plus unread broadcasts, in one call"""
+    response = client.rpc("unread_notification_count", {"p_user_id": user_id}).execute()
+    return int(response.data or 0)
+
+
+def mark_read(client, user_id: str, notification_ids: List[str]) -> dict:
+    """
+    Mark notifications and/or broadcasts read in one set-based call.
+    Returns how many ids belonged to the user (or were broadcasts) and the new unread count.
+    """
+    response = client.rpc("mark_notifications_read", {
+        "p_user_id": user_id,
+        "p_ids": notification_ids
+    }).execute()
+    return response.data or {"matched": 0, "unread_count": 0}
+
+
+def mark_all_read(client, user_id: str) -> dict:
+    """Mark every notification and broadcast read for a user"""
+    response = client.rpc("mark_all_notifications_read", {"p_user_id": user_id}).execute()
+    return response.data or {"unread_count": 0}
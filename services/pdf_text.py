@@ -0,0 +1,28 @@
+"""
+PDF text extraction, run in worker processes of the indexing pool.
+
+Kept free of app imports so a spawned worker only loads pypdf.
+"""
+import io
+
+
+def extract_pdf_text(data: bytes, max_chars: int) -> str:
+    """Plain text of a PDF, page by page, cut off at max_chars"""
+    from pypdf import PdfReader
+
+    reader = PdfReader(io.BytesIO(data))
+    pages = []
+    total = 0
+    for page in reader.pages:
+        try:
+            text = page.extract_text() or ""
+        except Exception:
+            # One unreadable page should not lose the rest of the document
+            continue
+        pages.append(text)
+        total += len(text)
+        if total >= max_chars:
+            break
+
+    # Postgres text cannot hold NUL characters
+    return "\n".join(pages)[:max_chars].replace("\x00", "")
@@ -0,0 +1,164 @@
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Set
+from database import get_service_client
+from config import settings
+from services.batching import IN_FILTER_CHUNK_SIZE, chunked
+from services.notification_bus import publish_notifications
+from services.fines import LIBRARY_TZ, days_until_due
+from services.system_config import get_system_config
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_BORROW_STATUSES = ["borrowed", "overdue"]
+
+# overdue_frequency -> days between repeated overdue reminders (None = only once)
+OVERDUE_REPEAT_DAYS = {
+    "daily": 1,
+    "weekly": 7,
+    "once": None
+}
+
+
+def _start_of_day(moment: datetime) -> datetime:
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _overdue_cutoff(frequency: str, now: datetime) -> Optional[datetime]:
+    """Earlier overdue reminders sent after this moment suppress a new one"""
+    repeat_days = OVERDUE_REPEAT_DAYS.get(frequency, 1)
+    if repeat_days is None:
+        return None
+    return _start_of_day(now) - timedelta(days=repeat_days - 1)
+
+
+def _already_notified(client, borrow_ids: List[str], notification_type: str, since: Optional[datetime]) -> Set[str]:
+    """Borrow ids that already have a reminder of this type (optionally since a cutoff)"""
+    notified = set()
+    for ids in chunked(borrow_ids, IN_FILTER_CHUNK_SIZE):
+        query = client.table("notifications")\
+            .select("related_borrow_id")\
+            .eq("type", notification_type)\
+            .in_("related_borrow_id", ids)
+        if since is not None:
+            query = query.gte("created_at", since.isoformat())
+        response = query.execute()
+        notified.update(row["related_borrow_id"] for row in (response.data or []))
+    return notified
+
+
+def _reminder(borrow: dict, notification_type: str, days_left: int) -> dict:
+    title = (borrow.get("books") or {}).get("title") or "A borrowed book"
+    if notification_type == "due_soon":
+        when = "today" if days_left == 0 else f"in {days_left} day{'s' if days_left != 1 else ''}"
+        heading = "Book due soon"
+        message = f"'{title}' is due {when}. Please return or renew it on time."
+    else:
+        days = -days_left
+        heading = "Book overdue"
+        message = f"'{title}' is {days} day{'s' if days != 1 else ''} overdue. Fines apply until it is returned."
+
+    return {
+        "user_id": borrow["user_id"],
+        "type": notification_type,
+        "title": heading,
+        "message": message,
+        "is_read": False,
+        "related_borrow_id": borrow["id"],
+        "related_book_id": borrow["book_id"]
+    }
+
+
+def _fetch_active_borrows(client, window_end: datetime, page_size: int):
+    """
+    Page through active borrows due before window_end using keyset pagination on
+    (due_date, id), so every page is an indexed range scan.
+    """
+    last_due, last_id = None, None
+    while True:
+        query = client.table("borrows")\
+            .select("id, user_id, book_id, due_date, books(title)")\
+            .in_("status", ACTIVE_BORROW_STATUSES)\
+            .lt("due_date", window_end.isoformat())
+        if last_due is not None:
+            query = query.or_(f'due_date.gt."{last_due}",and(due_date.eq."{last_due}",id.gt.{last_id})')
+        response = query.order("due_date").order("id").limit(page_size).execute()
+
+        page = response.data or []
+        if not page:
+            return
+        yield page
+
+        if len(page) < page_size:
+            return
+        last_due, last_id = page[-1]["due_date"], page[-1]["id"]
+
+
+def run_reminder_sweep(
+    as_of: Optional[datetime] = None,
+    remaining_ms: Optional[Callable[[], int]] = None
+) -> Dict[str, object]:
+    """
+    Send due_soon and overdue reminders for all active borrows.
+
+    Borrows inside the reminder window and already overdue are read with one paged
+    range query on borrows.due_date, deduplicated against notifications already sent
+    and inserted in large batches. `remaining_ms` (the Lambda context's
+    get_remaining_time_in_millis) lets the sweep stop cleanly before a timeout; the
+    next run picks up where it left off because sent reminders are skipped.
+    """
+    started = time.time()
+    client = get_service_client()
+    config = get_system_config()
+    now = as_of or datetime.now(LIBRARY_TZ)
+
+    reminder_days = config.reminder_days_before_due
+    window_end = _start_of_day(now) + timedelta(days=reminder_days + 1)
+    overdue_since = _overdue_cutoff(config.overdue_frequency, now)
+
+    stats = {"scanned": 0, "due_soon": 0, "overdue": 0, "skipped": 0, "complete": True}
+    pending: List[dict] = []
+
+    def flush():
+        for batch in chunked(pending, settings.notification_insert_batch_size):
+            response = client.table("notifications").insert(batch).execute()
+            publish_notifications(response.data or [])
+        pending.clear()
+
+    for page in _fetch_active_borrows(client, window_end, settings.reminder_page_size):
+        stats["scanned"] += len(page)
+        remaining = days_until_due([borrow["due_date"] for borrow in page], as_of=now)
+
+        candidates = {"due_soon": [], "overdue": []}
+        for borrow, days_left in zip(page, remaining):
+            if days_left < 0:
+                candidates["overdue"].append((borrow, days_left))
+            elif days_left <= reminder_days:
+                candidates["due_soon"].append((borrow, days_left))
+
+        for notification_type, rows in candidates.items():
+            if not rows:
+                continue
+            since = overdue_since if notification_type == "overdue" else None
+            sent = _already_notified(client, [borrow["id"] for borrow, _ in rows], notification_type, since)
+            for borrow, days_left in rows:
+                if borrow["id"] in sent:
+                    stats["skipped"] += 1
+                    continue
+                pending.append(_reminder(borrow, notification_type, days_left))
+                stats[notification_type] += 1
+
+        if len(pending) >= settings.notification_insert_batch_size:
+            flush()
+
+        if remaining_ms is not None and remaining_ms() < settings.reminder_time_margin_ms:
+            logger.warning("Reminder sweep stopping early to stay within the invocation time limit")
+            stats["complete"] = False
+            break
+
+    flush()
+
+    stats["duration_seconds"] = round(time.time() - started, 3)
+    logger.info(f"Reminder sweep finished: {stats}")
+    return stats
@@ -0,0 +1,46 @@
+from typing import Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def acquire_object(client, content_hash: str, file_path: str, file_url: str, file_size: int) -> dict:
+    """
+    Take a reference on the stored object for a content hash, registering it
+    with the given path (as pending) if it is new. Returns the object's path,
+    url and size, `created` when the caller has to upload the file, and `ready`
+    once an uploader has confirmed the file is in Storage.
+    """
+    response = client.rpc("acquire_resource_object", {
+        "p_content_hash": content_hash,
+        "p_file_path": file_path,
+        "p_file_url": file_url,
+        "p_file_size": file_size
+    }).execute()
+    return response.data
+
+
+def mark_object_ready(client, content_hash: str) -> None:
+    """Record that the object's file is in Storage"""
+    client.rpc("mark_resource_object_ready", {"p_content_hash": content_hash}).execute()
+
+
+def release_object(client, content_hash: str) -> Optional[dict]:
+    """
+    Drop a reference to a stored object. Returns its path and the references
+    left (0 means the caller should delete the file), or None if unknown.
+    """
+    response = client.rpc("release_resource_object", {"p_content_hash": content_hash}).execute()
+    return response.data or None
+
+
+def storage_savings(client) -> dict:
+    """Objects stored vs. resources pointing at them, and the bytes deduplication saved"""
+    response = client.rpc("resource_storage_stats").execute()
+    return response.data or {
+        "objects": 0,
+        "references": 0,
+        "stored_bytes": 0,
+        "referenced_bytes": 0,
+        "saved_bytes": 0
+    }
@@ -0,0 +1,145 @@
+from concurrent.futures import Executor, ThreadPoolExecutor
+from collections import Counter
+from typing import Dict, Iterable, List, Optional
+from config import settings
+from database import get_service_client
+from services.catalog_cache import invalidate_resources
+from services.pdf_text import extract_pdf_text
+from services.storage import RESOURCES_BUCKET, storage_bootstrap
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+_executor: Optional[Executor] = None
+_executor_lock = threading.Lock()
+
+
+def _create_executor() -> Executor:
+    # Lambda has no /dev/shm, which process pools need; extract in a thread there
+    if settings.text_extraction_workers <= 0 or os.environ.get("AWS_LAMBDA_FUNCTION_NAME"):
+        return ThreadPoolExecutor(max_workers=1, thread_name_prefix="text-extraction")
+    # Imported here: multiprocessing is not needed to serve requests (cold starts)
+    from concurrent.futures import ProcessPoolExecutor
+    import multiprocessing
+    # Spawned (not forked) workers: the server process has threads and an event loop
+    return ProcessPoolExecutor(
+        max_workers=settings.text_extraction_workers,
+        mp_context=multiprocessing.get_context("spawn")
+    )
+
+
+def _get_executor() -> Executor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = _create_executor()
+    return _executor
+
+
+def _reset_executor():
+    global _executor
+    with _executor_lock:
+        broken, _executor = _executor, None
+    if broken is not None:
+        broken.shutdown(wait=False)
+
+
+def shutdown_extraction():
+    """Stop the extraction workers (server shutdown)"""
+    _reset_executor()
+
+
+def _extract(data: bytes) -> str:
+    """PDF text from the extraction pool (CPU-bound work stays off the API's threads)"""
+    from concurrent.futures.process import BrokenProcessPool
+    try:
+        return _get_executor().submit(extract_pdf_text, data, settings.resource_text_max_chars).result()
+    except BrokenProcessPool:
+        # A worker died (e.g. a pathological PDF); start a fresh pool and retry once
+        _reset_executor()
+        return _get_executor().submit(extract_pdf_text, data, settings.resource_text_max_chars).result()
+
+
+def is_indexable(resource: dict) -> bool:
+    return (resource.get("file_path") or "").lower().endswith(".pdf")
+
+
+def index_on_upload(resource: dict) -> bool:
+    """
+    Whether an upload indexes the resource in a background task. Not on Lambda:
+    Mangum runs background tasks before the response is returned, so the upload
+    would wait for the extraction; POST /resources/reindex picks the file up there.
+    """
+    return is_indexable(resource) and not os.environ.get("AWS_LAMBDA_FUNCTION_NAME")
+
+
+def index_resource(client, resource: dict) -> str:
+    """
+    Store the text of one resource for content search.
+    Returns "indexed", "copied" (same file already extracted) or "skipped".
+    """
+    if not is_indexable(resource):
+        return "skipped"
+
+    content_hash = resource.get("content_hash")
+    text = None
+    status = "indexed"
+
+    # Deduplicated files share their text with the resource indexed first
+    if content_hash:
+        existing = client.table("resource_texts")\
+            .select("content")\
+            .eq("content_hash", content_hash)\
+            .limit(1)\
+            .execute()
+        if existing.data:
+            text = existing.data[0]["content"]
+            status = "copied"
+
+    if text is None:
+        # Checked before the download when the size is known
+        if (resource.get("file_size") or 0) > settings.text_extraction_max_bytes:
+            logger.info(f"Resource {resource['id']} is {resource['file_size']} bytes, too large to extract")
+            return "skipped"
+        data = storage_bootstrap.bucket(client, RESOURCES_BUCKET).download(resource["file_path"])
+        if len(data) > settings.text_extraction_max_bytes:
+            logger.info(f"Resource {resource['id']} is {len(data)} bytes, too large to extract")
+            return "skipped"
+        text = _extract(data)
+
+    # Empty text (e.g. a scanned paper) is stored too, so backfills do not retry it
+    client.table("resource_texts").upsert({
+        "resource_id": resource["id"],
+        "content_hash": content_hash,
+        "content": text
+    }).execute()
+    return status
+
+
+def index_resources(resources: Iterable[dict]) -> Dict[str, int]:
+    """
+    Index a batch of resources (run as a background task after uploads and for
+    backfills). A failure is logged and counted; it is retried by the next backfill.
+    """
+    client = get_service_client()
+    counts = Counter()
+    for resource in resources:
+        try:
+            counts[index_resource(client, resource)] += 1
+        except Exception as e:
+            logger.error(f"Text extraction failed for resource {resource.get('id')}: {e}")
+            counts["failed"] += 1
+
+    if counts["indexed"] or counts["copied"]:
+        invalidate_resources()
+    logger.info(f"Resource text indexing: {dict(counts)}")
+    return dict(counts)
+
+
+def pending_resources(client, limit: int) -> List[dict]:
+    """PDF resources that have no extracted text yet, oldest first"""
+    response = client.rpc("resources_pending_text", {"p_limit": limit}).execute()
+    return response.data or []
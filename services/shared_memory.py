@@ -0,0 +1,128 @@
+from collections import Counter
+from typing import Any, Dict, Optional
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+
+def default_shared_dir(name: str) -> str:
+    """A directory on shared memory (tmpfs) when the host has one"""
+    base = "/dev/shm" if os.path.isdir("/dev/shm") and os.access("/dev/shm", os.W_OK) else tempfile.gettempdir()
+    return os.path.join(base, name)
+
+
+class SharedFileStore:
+    """
+    JSON snapshots shared between worker processes through files in a tmpfs
+    directory (/dev/shm), i.e. pages of shared memory.
+
+    One worker builds a snapshot and publishes it; the others load it instead
+    of querying the database. Writes go to a temporary file that is renamed
+    into place, so readers never see a partial snapshot. Each process still
+    decodes the JSON into its own objects: Python objects cannot be shared, the
+    database round trip is what is saved.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def read(self, name: str, max_age_seconds: Optional[float] = None) -> Optional[Any]:
+        path = self._path(name)
+        try:
+            if max_age_seconds is not None and time.time() - os.stat(path).st_mtime >= max_age_seconds:
+                return None
+            with open(path, "rb") as snapshot:
+                return json.loads(snapshot.read())
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Shared snapshot {name} unreadable: {e}")
+            return None
+
+    def write(self, name: str, value: Any, encoded: Optional[str] = None):
+        path = self._path(name)
+        temp_path = f"{path}.{os.getpid()}.{uuid.uuid4().hex}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(temp_path, "w") as snapshot:
+                snapshot.write(encoded if encoded is not None else json.dumps(value, default=str))
+            os.replace(temp_path, path)
+        except OSError as e:
+            logger.warning(f"Shared snapshot {name} not written: {e}")
+            try:
+                os.unlink(temp_path)
+            except OSError:
+                pass
+
+    def delete(self, name: str):
+        try:
+            os.unlink(self._path(name))
+        except FileNotFoundError:
+            pass
+
+    def clear(self, prefix: str):
+        """Remove a sub-directory of snapshots (renamed away first, so it is atomic for readers)"""
+        path = self._path(prefix)
+        doomed = f"{path}.{uuid.uuid4().hex}.deleted"
+        try:
+            os.rename(path, doomed)
+        except FileNotFoundError:
+            return
+        shutil.rmtree(doomed, ignore_errors=True)
+
+
+class FileTier:
+    """
+    Catalogue cache tier backed by a SharedFileStore, so worker processes on
+    one host share warm entries (same interface as the Redis SharedTier).
+    """
+
+    def __init__(self, store: SharedFileStore, ttl_seconds: int):
+        self.store = store
+        self.ttl_seconds = ttl_seconds
+        self._stats = Counter()
+
+    def _name(self, namespace: str, key: str) -> str:
+        return os.path.join(namespace, hashlib.blake2b(key.encode(), digest_size=16).hexdigest())
+
+    def get(self, namespace: str, key: str) -> Any:
+        value = self.store.read(self._name(namespace, key), self.ttl_seconds)
+        self._stats["hits" if value is not None else "misses"] += 1
+        return value
+
+    def set(self, namespace: str, key: str, encoded: str):
+        self.store.write(self._name(namespace, key), None, encoded=encoded)
+
+    def delete(self, namespace: str, key: str):
+        self.store.delete(self._name(namespace, key))
+
+    def clear(self, namespace: str):
+        self.store.clear(namespace)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self._stats["hits"] + self._stats["misses"]
+        used_bytes = 0
+        for root, _, files in os.walk(self.store.directory):
+            for name in files:
+                try:
+                    used_bytes += os.path.getsize(os.path.join(root, name))
+                except OSError:
+                    pass
+        return {
+            "hits": self._stats["hits"],
+            "misses": self._stats["misses"],
+            "hit_rate": round(self._stats["hits"] / lookups, 4) if lookups else 0.0,
+            "errors": 0,
+            "used_memory_bytes": used_bytes
+        }
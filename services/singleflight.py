@@ -0,0 +1,88 @@
+from collections import Counter
+from typing import Any, Callable, Dict, Hashable, Optional
+from starlette.concurrency import run_in_threadpool
+from config import settings
+from services.cache import TTLCache
+import asyncio
+
+_MISSING = object()
+
+
+class SingleFlight:
+    """
+    Collapse concurrent identical reads into one backend call.
+
+    Callers that ask for a key while a call for it is in flight await the same
+    result instead of issuing their own query. Results can additionally be kept
+    for a short micro-TTL so a burst arriving just after the call finishes is
+    served too. Errors are shared with the waiters but never cached.
+    """
+
+    def __init__(self, ttl_seconds: float = 0, max_entries: int = 5000):
+        self.ttl_seconds = ttl_seconds
+        self._results = TTLCache(ttl_seconds=ttl_seconds, max_entries=max_entries)
+        self._in_flight: Dict[Hashable, asyncio.Future] = {}
+        self._stats = Counter()
+
+    async def do(self, key: Hashable, fn: Callable[..., Any], *args, ttl_seconds: Optional[float] = None) -> Any:
+        """
+        Return fn(*args) for this key, sharing one call between concurrent callers.
+        fn is blocking (a PostgREST query) and runs in the threadpool.
+        """
+        self._stats["requests"] += 1
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+
+        if ttl > 0:
+            result = self._results.get(key, _MISSING)
+            if result is not _MISSING:
+                self._stats["cache_hits"] += 1
+                return result
+
+        task = self._in_flight.get(key)
+        if task is not None:
+            self._stats["collapsed"] += 1
+        else:
+            self._stats["executions"] += 1
+            # The call runs as its own task, so a disconnecting caller never cancels it for the others
+            task = asyncio.ensure_future(run_in_threadpool(fn, *args))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done, ttl))
+
+        return await asyncio.shield(task)
+
+    def _finish(self, key: Hashable, task: asyncio.Future, ttl: float):
+        self._in_flight.pop(key, None)
+        if task.cancelled():
+            return
+        if task.exception() is not None:
+            self._stats["errors"] += 1
+        elif ttl > 0:
+            self._results.set(key, task.result(), ttl)
+
+    def forget(self, key: Hashable):
+        """Drop a cached result (after a write to the underlying rows)"""
+        self._results.delete(key)
+
+    def clear(self):
+        self._results.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        requests = self._stats["requests"]
+        saved = self._stats["collapsed"] + self._stats["cache_hits"]
+        return {
+            "requests": requests,
+            "executions": self._stats["executions"],
+            "collapsed": self._stats["collapsed"],
+            "cache_hits": self._stats["cache_hits"],
+            "errors": self._stats["errors"],
+            "in_flight": len(self._in_flight),
+            "cached_results": len(self._results),
+            "saved_ratio": round(saved / requests, 4) if requests else 0.0
+        }
+
+
+# Shared by the catalogue read endpoints
+catalogue_flight = SingleFlight(
+    ttl_seconds=settings.singleflight_ttl_seconds,
+    max_entries=settings.singleflight_max_entries
+)
@@ -0,0 +1,93 @@
+from typing import AsyncIterator, Dict, Iterable, List, Optional
+from postgrest.exceptions import APIError
+from starlette.concurrency import run_in_threadpool
+from config import settings
+from services.book_import import stream_lines
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+# SQLSTATE stocktake_scan raises for a session that is no longer open
+SESSION_CLOSED_SQLSTATE = "55000"
+
+
+class StocktakeClosedError(Exception):
+    """Tags were sent to a session that is closing or closed"""
+
+
+def apply_scan_batch(client, session_id: str, tags: List[str]) -> Optional[dict]:
+    """
+    Mark one batch of scanned tags as seen. Returns received/matched/new/unknown
+    counts, or None if the session does not exist. Raises StocktakeClosedError
+    if the session is no longer open.
+    """
+    try:
+        response = client.rpc("stocktake_scan", {"p_session_id": session_id, "p_tags": tags}).execute()
+    except APIError as e:
+        if e.code == SESSION_CLOSED_SQLSTATE:
+            raise StocktakeClosedError("Stocktake session is closed") from e
+        raise
+    return response.data
+
+
+async def scan_tags(client, session_id: str, tags: AsyncIterator[str]) -> Dict[str, int]:
+    """
+    Apply a stream of tags in batches of settings.stocktake_batch_size. Each
+    batch is de-duplicated before it is sent; the session bitmap takes care of
+    tags seen in earlier batches.
+    """
+    totals = {"received": 0, "matched": 0, "new": 0, "unknown": 0, "batches": 0}
+    batch = set()
+
+    async def flush():
+        result = await run_in_threadpool(apply_scan_batch, client, session_id, sorted(batch))
+        if result is None:
+            raise LookupError("Stocktake session not found")
+        for key in ("matched", "new", "unknown"):
+            totals[key] += result[key]
+        totals["batches"] += 1
+        batch.clear()
+
+    async for tag in tags:
+        totals["received"] += 1
+        batch.add(tag)
+        if len(batch) >= settings.stocktake_batch_size:
+            await flush()
+    if batch:
+        await flush()
+    return totals
+
+
+async def tags_from_body(body: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """
+    Tags from a streamed request body: one per line, either bare or as a JSON
+    string/object ({"rfid_uid": ...}) per line, as RFID readers export them
+    """
+    async for line in stream_lines(body):
+        line = line.strip()
+        if not line:
+            continue
+        if line[0] in "{\"":
+            try:
+                value = json.loads(line)
+            except ValueError:
+                value = line
+            if isinstance(value, dict):
+                value = value.get("rfid_uid") or value.get("tag")
+            line = str(value).strip() if value else ""
+        if line:
+            yield line
+
+
+async def tags_from_list(tags: Iterable[str]) -> AsyncIterator[str]:
+    for tag in tags:
+        tag = tag.strip()
+        if tag:
+            yield tag
+
+
+def stocktake_report(client, session_id: str, limit: int) -> Optional[dict]:
+    """Missing / misplaced / unexpected copies and unknown tags of a session"""
+    response = client.rpc("stocktake_report", {"p_session_id": session_id, "p_limit": limit}).execute()
+    return response.data
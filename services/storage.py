@@ -0,0 +1,295 @@
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple
+from starlette.datastructures import UploadFile
+from config import settings
+from services.cache import TTLCache
+import asyncio
+import base64
+import hashlib
+import logging
+import os
+import re
+import threading
+import urllib.parse
+import uuid
+
+logger = logging.getLogger(__name__)
+
+TUS_VERSION = "1.0.0"
+
+# Each TUS chunk is streamed to the server in pieces of this size
+STREAM_PIECE_BYTES = 1024 * 1024
+
+RESOURCES_BUCKET = "resources"
+
+# Content-addressed objects: objects/<first two hex digits>/<sha256>.<ext>
+CONTENT_PREFIX = "objects"
+
+_UNIQUE_NAME = re.compile(r"^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}(\.[A-Za-z0-9]{1,16})?$")
+
+
+class StorageUploadError(Exception):
+    """A resumable upload could not be completed"""
+
+
+class StorageBootstrap:
+    """
+    Makes sure the buckets the API writes to exist with the right options,
+    once per process. A bucket that has been checked (or created) is
+    remembered, so uploads and deletes no longer pay a bucket round trip.
+    A failed check is not remembered and is retried on the next use.
+    """
+
+    def __init__(self, buckets: Dict[str, dict]):
+        self.buckets = buckets
+        self._ready: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def ensure(self, client, bucket: str):
+        if bucket in self._ready:
+            return
+        with self._lock:
+            if bucket in self._ready:
+                return
+            options = self.buckets.get(bucket, {})
+            try:
+                try:
+                    existing = client.storage.get_bucket(bucket)
+                except Exception:
+                    existing = None
+
+                if existing is None:
+                    logger.info(f"Creating '{bucket}' bucket...")
+                    try:
+                        client.storage.create_bucket(bucket, options=options)
+                    except Exception as create_err:
+                        # Another process may have created it in the meantime
+                        if "exist" not in str(create_err).lower() and "duplicate" not in str(create_err).lower():
+                            raise
+                elif "public" in options and existing.public != options["public"]:
+                    client.storage.update_bucket(bucket, options)
+
+                self._ready.add(bucket)
+            except Exception as bucket_err:
+                logger.warning(f"Bucket check/create failed (might already exist or permission issue): {bucket_err}")
+
+    def bucket(self, client, bucket: str):
+        """Storage file API for a bucket, ensuring it exists first"""
+        self.ensure(client, bucket)
+        return client.storage.from_(bucket)
+
+    def ensure_all(self, client) -> List[str]:
+        for bucket in self.buckets:
+            self.ensure(client, bucket)
+        return sorted(self._ready)
+
+
+storage_bootstrap = StorageBootstrap({
+    RESOURCES_BUCKET: {"public": True}
+})
+
+
+def resource_object_path(subject: str, semester: int, filename: str) -> str:
+    """Storage path for a new resource file: <subject>/<semester>/<uuid>.<ext>"""
+    extension = filename.rsplit(".", 1)[-1] if "." in filename else ""
+    unique_filename = f"{uuid.uuid4()}.{extension}" if extension else str(uuid.uuid4())
+    return f"{subject}/{semester}/{unique_filename}"
+
+
+def is_resource_object_path(path: str, subject: str, semester: int) -> bool:
+    """True if path is one resource_object_path() could have issued for this subject/semester"""
+    prefix = f"{subject}/{semester}/"
+    return path.startswith(prefix) and bool(_UNIQUE_NAME.match(path[len(prefix):]))
+
+
+def content_object_path(digest: str, filename: str) -> str:
+    """Storage path for a file identified by its SHA-256 digest"""
+    extension = filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
+    name = f"{digest}.{extension}" if extension else digest
+    return f"{CONTENT_PREFIX}/{digest[:2]}/{name}"
+
+
+async def hash_upload(file: UploadFile) -> Tuple[str, int]:
+    """
+    SHA-256 digest and size of an upload, read in small pieces from the spooled
+    file so memory stays flat; the file is left rewound for the upload.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    await file.seek(0)
+    while True:
+        piece = await file.read(STREAM_PIECE_BYTES)
+        if not piece:
+            break
+        digest.update(piece)
+        size += len(piece)
+    await file.seek(0)
+    return digest.hexdigest(), size
+
+
+# Signed download URLs are reused for half their lifetime
+_signed_urls = TTLCache(ttl_seconds=max(settings.resource_signed_url_seconds // 2, 1), max_entries=10000)
+
+
+def download_name(resource: dict) -> str:
+    """File name a download is saved as: the resource title plus the file's extension"""
+    path = resource.get("file_path") or ""
+    extension = path.rsplit(".", 1)[-1] if "." in path.rsplit("/", 1)[-1] else ""
+    return f"{resource['title']}.{extension}" if extension else resource["title"]
+
+
+def download_url(client, resource: dict) -> str:
+    """
+    URL a resource is downloaded from: the public URL, or a signed one when
+    settings.resource_signed_url_seconds is set (private buckets)
+    """
+    name = download_name(resource)
+    if not settings.resource_signed_url_seconds or not resource.get("file_path"):
+        # Stored public URLs end with an empty query string ("...?")
+        public_url = resource["file_url"].rstrip("?")
+        separator = "&" if "?" in public_url else "?"
+        return f"{public_url}{separator}download={urllib.parse.quote(name)}"
+
+    key = (resource["file_path"], name)
+    url = _signed_urls.get(key)
+    if url is None:
+        signed = storage_bootstrap.bucket(client, RESOURCES_BUCKET).create_signed_url(
+            resource["file_path"], settings.resource_signed_url_seconds, {"download": name}
+        )
+        url = signed["signedURL"]
+        _signed_urls.set(key, url)
+    return url
+
+
+def stored_object(client, bucket: str, path: str) -> Optional[dict]:
+    """Storage metadata (size, mimetype, ...) of an object, or None if it does not exist"""
+    folder, _, name = path.rpartition("/")
+    items = client.storage.from_(bucket).list(folder, {"search": name, "limit": 100})
+    for item in items or []:
+        if item.get("name") == name and item.get("id"):
+            return item.get("metadata") or {}
+    return None
+
+
+def _tus_endpoint() -> str:
+    return f"{settings.supabase_url.rstrip('/')}/storage/v1/upload/resumable"
+
+
+def _auth_headers() -> dict:
+    key = settings.supabase_service_key
+    if not key:
+        raise ValueError("Service key not configured")
+    return {
+        "Authorization": f"Bearer {key}",
+        "apikey": key,
+        "Tus-Resumable": TUS_VERSION
+    }
+
+
+def _metadata(**values: str) -> str:
+    return ",".join(
+        f"{key} {base64.b64encode(value.encode()).decode()}"
+        for key, value in values.items() if value
+    )
+
+
+def _upload_size(file: UploadFile) -> int:
+    """Size of the (already spooled) upload without reading it"""
+    if file.size is not None:
+        return file.size
+    size = file.file.seek(0, os.SEEK_END)
+    file.file.seek(0)
+    return size
+
+
+async def _read_range(file: UploadFile, length: int) -> AsyncIterator[bytes]:
+    """
+    Yield the next `length` bytes of the file in small pieces. Handing httpx an
+    iterator rather than one chunk-sized bytes object keeps memory flat: request
+    objects are only freed by the cycle collector, which would otherwise keep
+    several whole chunks alive.
+    """
+    remaining = length
+    while remaining > 0:
+        piece = await file.read(min(STREAM_PIECE_BYTES, remaining))
+        if not piece:
+            return
+        remaining -= len(piece)
+        yield piece
+
+
+async def _server_offset(client: "httpx.AsyncClient", upload_url: str) -> int:
+    response = await client.head(upload_url, headers=_auth_headers())
+    response.raise_for_status()
+    return int(response.headers["Upload-Offset"])
+
+
+async def upload_resumable(
+    bucket: str,
+    object_name: str,
+    file: UploadFile,
+    content_type: Optional[str] = None,
+    upsert: bool = False
+) -> int:
+    """
+    Stream an upload to Supabase Storage with the TUS resumable protocol and
+    return the number of bytes stored.
+
+    The file is read one chunk at a time, so memory use is bounded by the chunk
+    size whatever the file size. A failed chunk is retried from the offset the
+    server reports, instead of restarting the whole upload.
+    """
+    # Deferred: httpx is only needed once an upload starts, not at cold start
+    import httpx
+
+    size = _upload_size(file)
+    chunk_size = settings.storage_upload_chunk_bytes
+    timeout = httpx.Timeout(settings.storage_upload_timeout_seconds, connect=10)
+
+    async with httpx.AsyncClient(timeout=timeout) as client:
+        create = await client.post(_tus_endpoint(), headers={
+            **_auth_headers(),
+            "Upload-Length": str(size),
+            "Upload-Metadata": _metadata(
+                bucketName=bucket,
+                objectName=object_name,
+                contentType=content_type or "application/octet-stream",
+                cacheControl="3600"
+            ),
+            "x-upsert": "true" if upsert else "false"
+        })
+        if create.status_code != 201 or "Location" not in create.headers:
+            raise StorageUploadError(f"Could not start upload ({create.status_code}): {create.text}")
+        upload_url = create.headers["Location"]
+
+        offset = 0
+        failures = 0
+        await file.seek(0)
+        while offset < size:
+            length = min(chunk_size, size - offset)
+            try:
+                response = await client.patch(upload_url, content=_read_range(file, length), headers={
+                    **_auth_headers(),
+                    "Upload-Offset": str(offset),
+                    "Content-Length": str(length),
+                    "Content-Type": "application/offset+octet-stream"
+                })
+                response.raise_for_status()
+                expected = offset + length
+                offset = int(response.headers.get("Upload-Offset", expected))
+                failures = 0
+                if offset != expected:
+                    await file.seek(offset)
+            except (httpx.HTTPError, ValueError) as e:
+                failures += 1
+                if failures > settings.storage_upload_max_retries:
+                    raise StorageUploadError(f"Upload failed at {offset} of {size} bytes: {e}")
+                logger.warning(f"Upload chunk at {offset} failed ({e}), resuming (attempt {failures})")
+                await asyncio.sleep(0.5 * 2 ** (failures - 1))
+                try:
+                    offset = await _server_offset(client, upload_url)
+                except (httpx.HTTPError, KeyError, ValueError) as head_error:
+                    logger.warning(f"Upload offset check failed: {head_error}")
+                # Continue from wherever the server says the upload stands
+                await file.seek(offset)
+
+    return offset
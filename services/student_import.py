@@ -0,0 +1,179 @@
+from typing import AsyncIterator, Dict, List, Optional, Type
+from pydantic import BaseModel, ValidationError
+from starlette.concurrency import run_in_threadpool
+from config import settings
+from services.book_import import parse_csv, parse_jsonl, validation_errors
+import asyncio
+import logging
+import secrets
+import time
+
+logger = logging.getLogger(__name__)
+
+
+# Per-row status -> summary counter
+SUMMARY_KEYS = {"created": "created", "exists": "existing", "error": "errors"}
+
+
+def _existing_profiles(client, emails: List[str]) -> Dict[str, dict]:
+    # Matched on lower(email): profiles created elsewhere keep the case they were typed in
+    response = client.rpc("profiles_by_email", {"p_emails": emails}).execute()
+    return {profile["email"].lower(): profile for profile in response.data or []}
+
+
+def _existing_auth_users(client, emails: List[str]) -> Dict[str, str]:
+    """Auth users left without a profile by an earlier, interrupted import"""
+    response = client.rpc("auth_user_ids", {"p_emails": emails}).execute()
+    return {user["email"].lower(): user["id"] for user in response.data or []}
+
+
+def _create_auth_user(client, student) -> str:
+    auth_response = client.auth.admin.create_user({
+        "email": student.email,
+        # Without a password from the roster, students sign in through the
+        # password reset flow (or Google) the first time
+        "password": student.password or secrets.token_urlsafe(24),
+        # The roster is the school's own list, so addresses need no confirmation mail
+        "email_confirm": True
+    })
+    if not auth_response.user:
+        raise ValueError("Failed to create user")
+    return auth_response.user.id
+
+
+def _insert_profiles(client, profiles: List[dict]) -> List[dict]:
+    response = client.rpc("import_student_profiles", {"p_rows": profiles}).execute()
+    return response.data or []
+
+
+async def _import_chunk(client, chunk: List[tuple], summary: dict) -> List[dict]:
+    """
+    One chunk of validated (row_no, student) pairs: students that already have
+    a profile are skipped, auth users are created concurrently (bounded by
+    settings.student_import_concurrency) and all profiles are written with one
+    import_student_profiles call.
+    """
+    emails = [student.email for _, student in chunk]
+    existing = await run_in_threadpool(_existing_profiles, client, emails)
+    auth_ids = await run_in_threadpool(_existing_auth_users, client, emails)
+
+    results = {}
+    pending = []
+    for row_no, student in chunk:
+        profile = existing.get(student.email)
+        if profile:
+            results[row_no] = {
+                "row": row_no, "email": student.email, "status": "exists",
+                "id": profile["id"], "student_id": profile["student_id"]
+            }
+        else:
+            pending.append((row_no, student))
+
+    semaphore = asyncio.Semaphore(settings.student_import_concurrency)
+
+    async def create(row_no, student):
+        if student.email in auth_ids:
+            summary["resumed"] += 1
+            return row_no, student, auth_ids[student.email], None
+        async with semaphore:
+            try:
+                summary["auth_calls"] += 1
+                return row_no, student, await run_in_threadpool(_create_auth_user, client, student), None
+            except Exception as e:
+                return row_no, student, None, str(e)
+
+    profiles = []
+    for row_no, student, user_id, error in await asyncio.gather(*(create(*pair) for pair in pending)):
+        if error:
+            results[row_no] = {"row": row_no, "email": student.email, "status": "error", "error": error}
+            continue
+        profiles.append({
+            "row_no": row_no,
+            "id": user_id,
+            "email": student.email,
+            "name": student.name,
+            "student_id": student.student_id,
+            "department": student.department
+        })
+
+    # If this write fails the auth users stay; the next run picks them up as resumed
+    if profiles:
+        for entry in await run_in_threadpool(_insert_profiles, client, profiles):
+            results[entry["row"]] = {
+                "row": entry["row"], "email": entry["email"], "status": entry["status"],
+                "id": entry["id"], "student_id": entry["student_id"]
+            }
+
+    for result in results.values():
+        summary[SUMMARY_KEYS[result["status"]]] += 1
+    return [results[row_no] for row_no in sorted(results)]
+
+
+async def import_students(
+    client,
+    body: AsyncIterator[bytes],
+    format: str,
+    model: Type[BaseModel],
+    chunk_size: Optional[int] = None,
+    start_row: int = 1,
+    max_rows: Optional[int] = None
+) -> AsyncIterator[dict]:
+    """
+    Create student accounts from a streamed roster (CSV with a header row, or
+    JSONL), yielding one result per row ({row, email, status, id, student_id}
+    or {row, status: "error", error}) and finally {summary}. Re-running the same
+    roster is safe: students with a profile are reported as "exists", and auth
+    users created by an interrupted run get their profile without a new account.
+    Missing student IDs are generated as STU<year><number>.
+
+    One call imports at most `max_rows` rows from `start_row` on (so a request
+    stays within the API timeout); the summary then counts the `remaining` rows
+    and gives the `next_row` to continue from with the same roster.
+    """
+    chunk_size = chunk_size or settings.student_import_chunk_size
+    max_rows = max_rows or settings.student_import_max_rows
+    rows = parse_csv(body) if format == "csv" else parse_jsonl(body)
+
+    summary = {"rows": 0, "created": 0, "existing": 0, "resumed": 0, "errors": 0, "auth_calls": 0, "remaining": 0}
+    seen_emails = {}
+    chunk = []
+    started = time.monotonic()
+
+    async for row_no, raw, error in rows:
+        if row_no < start_row:
+            continue
+        if summary["rows"] >= max_rows:
+            # Left for the next call; the rest of the body is only counted
+            summary.setdefault("next_row", row_no)
+            summary["remaining"] += 1
+            continue
+        summary["rows"] += 1
+        if raw is not None:
+            try:
+                student = model(**raw)
+            except ValidationError as e:
+                error = "; ".join(validation_errors(e))
+            else:
+                if student.email in seen_emails:
+                    error = f"Duplicate email {student.email} (row {seen_emails[student.email]})"
+        if error:
+            summary["errors"] += 1
+            yield {"row": row_no, "status": "error", "error": error}
+            continue
+
+        seen_emails[student.email] = row_no
+        chunk.append((row_no, student))
+        if len(chunk) >= chunk_size:
+            for result in await _import_chunk(client, chunk, summary):
+                yield result
+            chunk = []
+
+    if chunk:
+        for result in await _import_chunk(client, chunk, summary):
+            yield result
+
+    elapsed = time.monotonic() - started
+    summary["elapsed_seconds"] = round(elapsed, 3)
+    summary["students_per_second"] = round((summary["created"] + summary["existing"]) / elapsed, 1) if elapsed else None
+    logger.info(f"Student import: {summary}")
+    yield {"summary": summary}
@@ -0,0 +1,201 @@
+from dataclasses import asdict, dataclass, field, replace
+from functools import cached_property
+from typing import Optional
+from database import get_supabase_client
+from config import settings
+from services.fines import FinePolicy
+from services.shared_memory import SharedFileStore
+import hashlib
+import json
+import threading
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# Row written by update_fine_config whenever any key changes
+VERSION_KEY = "config_version"
+
+# Snapshot file shared by worker processes (see serve.py)
+SNAPSHOT_NAME = "system_config.json"
+
+
+@dataclass(frozen=True)
+class SystemConfig:
+    """Typed snapshot of the system_config table"""
+    borrow_duration_days: int = settings.borrow_duration_days
+    grace_period_days: int = settings.grace_period_days
+    fine_per_day: float = settings.fine_per_day
+    max_books_per_student: int = settings.max_books_per_student
+    reminder_days_before_due: int = settings.reminder_days_before_due
+    overdue_frequency: str = settings.overdue_frequency
+    version: int = 0
+    loaded_at: float = field(default=0.0, compare=False)
+
+    @classmethod
+    def from_rows(cls, rows: list) -> "SystemConfig":
+        """Build a snapshot from system_config rows, keeping defaults for missing or bad values"""
+        values = {row["key"]: row["value"] for row in rows}
+        defaults = cls()
+
+        def read(key, cast):
+            try:
+                return cast(values[key]) if key in values else getattr(defaults, key)
+            except (TypeError, ValueError):
+                logger.warning(f"Invalid system_config value for {key}: {values[key]!r}")
+                return getattr(defaults, key)
+
+        return cls(
+            borrow_duration_days=read("borrow_duration_days", int),
+            grace_period_days=read("grace_period_days", int),
+            fine_per_day=read("fine_per_day", float),
+            max_books_per_student=read("max_books_per_student", int),
+            reminder_days_before_due=read("reminder_days_before_due", int),
+            overdue_frequency=read("overdue_frequency", str),
+            version=_parse_version(values.get(VERSION_KEY)),
+            loaded_at=time.time()
+        )
+
+    @property
+    def fine_policy(self) -> FinePolicy:
+        return FinePolicy(
+            fine_per_day=self.fine_per_day,
+            grace_period_days=self.grace_period_days,
+            due_soon_days=self.reminder_days_before_due
+        )
+
+    @cached_property
+    def etag(self) -> str:
+        """Content hash of the configuration values, computed once per snapshot"""
+        values = asdict(self)
+        values.pop("loaded_at")
+        digest = hashlib.blake2b(json.dumps(values, sort_keys=True).encode(), digest_size=16).hexdigest()
+        return f'"{digest}"'
+
+    def borrow_policy(self) -> dict:
+        return {
+            "borrow_duration_days": self.borrow_duration_days,
+            "grace_period_days": self.grace_period_days,
+            "fine_per_day": self.fine_per_day,
+            "max_books_per_student": self.max_books_per_student
+        }
+
+
+def _parse_version(value) -> int:
+    try:
+        return int(value) if value is not None else 0
+    except (TypeError, ValueError):
+        return 0
+
+
+class ConfigService:
+    """
+    Serves system_config from memory.
+    The cheap config_version row is polled every few seconds and the full table
+    is only reloaded when the version moves or the TTL expires. With a shared
+    store, a snapshot loaded by one worker process is reused by the others.
+    """
+
+    def __init__(self, ttl_seconds: int, version_check_seconds: int, store: Optional[SharedFileStore] = None):
+        self.ttl_seconds = ttl_seconds
+        self.version_check_seconds = version_check_seconds
+        self.store = store
+        self._snapshot: Optional[SystemConfig] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        # Error from the most recent reload (None when it succeeded)
+        self.last_error: Optional[str] = None
+
+    def get(self) -> SystemConfig:
+        """Return the current snapshot, refreshing it if stale"""
+        now = time.time()
+        snapshot = self._snapshot
+
+        if snapshot is None or now - snapshot.loaded_at >= self.ttl_seconds:
+            return self.reload()
+
+        if now - self._checked_at >= self.version_check_seconds:
+            with self._lock:
+                self._checked_at = now
+            version = self._fetch_version()
+            if version is not None and version != snapshot.version:
+                return self.reload(expected_version=version)
+
+        return snapshot
+
+    def reload(self, expected_version: Optional[int] = None) -> SystemConfig:
+        """Load every system_config key in one query (or another worker's fresh snapshot)"""
+        with self._lock:
+            shared = self._read_shared(expected_version)
+            if shared is not None:
+                self._snapshot = shared
+                self._checked_at = time.time()
+                return shared
+
+            try:
+                supabase = get_supabase_client()
+                response = supabase.table("system_config").select("key, value").execute()
+                snapshot = SystemConfig.from_rows(response.data or [])
+                self.last_error = None
+                if self.store:
+                    self.store.write(SNAPSHOT_NAME, asdict(snapshot))
+            except Exception as e:
+                logger.error(f"Load system config error: {e}")
+                self.last_error = str(e)
+                # Keep serving the last good snapshot (or defaults) until the next TTL
+                if self._snapshot is not None:
+                    snapshot = replace(self._snapshot, loaded_at=time.time())
+                else:
+                    snapshot = SystemConfig(loaded_at=time.time())
+
+            self._snapshot = snapshot
+            self._checked_at = time.time()
+            return snapshot
+
+    def invalidate(self):
+        """Drop the snapshot so the next read reloads it"""
+        with self._lock:
+            self._snapshot = None
+            if self.store:
+                self.store.delete(SNAPSHOT_NAME)
+
+    def _read_shared(self, expected_version: Optional[int]) -> Optional[SystemConfig]:
+        if not self.store:
+            return None
+        values = self.store.read(SNAPSHOT_NAME, max_age_seconds=self.ttl_seconds)
+        if not values or (expected_version is not None and values.get("version") != expected_version):
+            return None
+        try:
+            return SystemConfig(**values)
+        except TypeError:
+            # Written by an older release with different fields
+            return None
+
+    def _fetch_version(self) -> Optional[int]:
+        try:
+            supabase = get_supabase_client()
+            response = supabase.table("system_config")\
+                .select("value")\
+                .eq("key", VERSION_KEY)\
+                .execute()
+            return _parse_version(response.data[0]["value"]) if response.data else 0
+        except Exception as e:
+            logger.error(f"Config version check error: {e}")
+            return None
+
+
+config_service = ConfigService(
+    ttl_seconds=settings.config_cache_ttl_seconds,
+    version_check_seconds=settings.config_version_check_seconds,
+    store=SharedFileStore(settings.shared_cache_dir) if settings.shared_cache_dir else None
+)
+
+
+def get_system_config() -> SystemConfig:
+    """Get the cached system configuration"""
+    return config_service.get()
+
+
+def new_config_version() -> str:
+    """Version value written alongside config updates (milliseconds since epoch)"""
+    return str(int(time.time() * 1000))